@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+'''
+Benchmarks for SAR parsers, over synthetic files from
+:mod:`benchmarks.sargen`.
+
+Every benchmark runs in its own process, so that one doesn't inherit
+memory (or warm caches) of another. Wall time is the best of
+``--repeat`` runs, peak memory is measured on a separate run with
+:mod:`tracemalloc` when available, otherwise as growth of the process'
+maximum resident set size (measured before the timing runs).
+
+``Parser stages`` reports time of each parsing stage (``split``,
+``classify``, ``compile``, ``decode``) separately, under ``stages``.
+Throughput is given per row (``rows_per_s``) for benchmarks which parse
+rows, per SAR part (``parts_per_s``) for splitting alone.
+
+Results are written as JSON, to compare runs for regressions::
+
+    $ python benchmarks/run.py --cpus 32 --interval 10 -o before.json
+    $ git checkout my-branch
+    $ python benchmarks/run.py --cpus 32 --interval 10 -o after.json
+'''
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sar import INSTANCE_SECTIONS  # noqa: E402
+from sar import parser as sarparse  # noqa: E402
+from sar import multiparser as sarmulti  # noqa: E402
+from sar.stats import ParseStats  # noqa: E402
+import sargen  # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2
+    tracemalloc = None
+
+
+def count_rows(info):
+    '''
+    Counts rows in ``Dictionary``-style SAR data of one file
+    '''
+    rows = 0
+    for section in info:
+        for full_time in info[section]:
+            if section in INSTANCE_SECTIONS:
+                rows += len(info[section][full_time])
+            else:
+                rows += 1
+    return rows
+
+
+STAGES = ('split', 'classify', 'compile', 'decode')
+"""Parser stages timed by :func:`bench_stages` (see :mod:`sar.stats`)"""
+
+
+def bench_split(filename):
+    # Splitting knows nothing about rows, it's measured in parts
+    parser = sarparse.Parser(filename)
+    return {'parts': len(parser._split_file())}
+
+
+def bench_stages(filename):
+    # Whole parse with every stage timed on its own; classify time is
+    # reported without compile, which runs inside it
+    stats = ParseStats()
+    parser = sarparse.Parser(filename, stats=stats)
+    start = time.time()
+    info = parser._parse_file(parser._read_parts())
+    elapsed = time.time() - start
+
+    timings = stats.timings
+    stages = dict((stage, timings.get(stage, 0.0)) for stage in STAGES)
+    stages['classify'] -= stages['compile']
+
+    return {'rows': count_rows(info), 'seconds': elapsed, 'stages': stages}
+
+
+def bench_load(filename):
+    parser = sarparse.Parser(filename)
+    parser.load_file()
+    return {'rows': count_rows(parser.get_sar_info())}
+
+
+def bench_iter_records(filename):
+    rows = 0
+    for record in sarparse.Parser(filename).iter_records():
+        rows += 1
+    return {'rows': rows}
+
+
+def bench_columnar(filename):
+    tables = sarparse.Parser(filename).get_sar_info(format='columnar')
+    return {'rows': sum(len(tables[section]) for section in tables)}
+
+
+def bench_multi(filename, workers=1):
+    multi = sarmulti.Multiparser(filename, workers=workers)
+    multi.load_file()
+    info = multi.get_sar_info()
+    multi.close()
+    return {'rows': sum(count_rows(info[day]) for day in info)}
+
+
+SINGLE_BENCHMARKS = [
+    ('Parser._split_file', bench_split),
+    ('Parser stages', bench_stages),
+    ('Parser.load_file', bench_load),
+    ('Parser.iter_records', bench_iter_records),
+    ('Parser.get_sar_info(columnar)', bench_columnar),
+]
+
+MULTI_BENCHMARKS = [
+    ('Multiparser.load_file', bench_multi),
+]
+
+
+def _measure(func, args, repeat, queue):
+    '''
+    Runs benchmark in a child process and reports its measurements
+    '''
+    try:
+        # Peak is measured first, before timing runs raise maxrss
+        if tracemalloc is not None:
+            tracemalloc.start()
+            func(*args)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            peak_method = 'tracemalloc'
+        else:
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            func(*args)
+            after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in kilobytes on Linux
+            peak = (after - before) * 1024
+            peak_method = 'maxrss'
+
+        best = None
+
+        for i in range(repeat):
+            start = time.time()
+            result = func(*args)
+            elapsed = time.time() - start
+
+            # Benchmarks timing only a part of their work report it
+            elapsed = result.pop('seconds', elapsed)
+
+            if best is None or elapsed < best['seconds']:
+                best = dict(result, seconds=elapsed)
+
+        best.update({'peak_bytes': peak, 'peak_method': peak_method})
+        queue.put(best)
+
+    except Exception as exc:
+        queue.put({'error': repr(exc)})
+
+
+def measure(name, func, args, size, repeat):
+    '''
+    Measures benchmark in a fresh process
+        :return: ``Dictionary`` with benchmark results
+    '''
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_measure, args=(func, args, repeat, queue)
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+
+    result['name'] = name
+    result['bytes'] = size
+    if result.get('seconds'):
+        result['mb_per_s'] = size / result['seconds'] / (1024.0 * 1024.0)
+        for count in ('rows', 'parts'):
+            if count in result:
+                result[count + '_per_s'] = result[count] / result['seconds']
+
+    return result
+
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Benchmark SAR parsers')
+    argparser.add_argument('--cpus', type=int, default=16)
+    argparser.add_argument('--interval', type=int, default=60,
+                           help='Sampling interval, in seconds')
+    argparser.add_argument('--days', type=int, default=7,
+                           help='Days in the combined file')
+    argparser.add_argument('--ampm', action='store_true',
+                           help='12hr AM/PM timestamps')
+    argparser.add_argument('--restarts', type=int, default=1)
+    argparser.add_argument('--workers', type=int, default=4,
+                           help='Workers for parallel Multiparser run')
+    argparser.add_argument('--repeat', type=int, default=3)
+    argparser.add_argument('-o', '--output', default='-',
+                           help='JSON results file, - for stdout')
+    args = argparser.parse_args(argv)
+
+    generator = sargen.SarGenerator(args.cpus, args.interval, args.ampm,
+                                    args.restarts)
+    start = datetime.date(2013, 11, 20)
+    workdir = tempfile.mkdtemp(prefix='sarbench')
+
+    try:
+        single = os.path.join(workdir, 'sar20')
+        with open(single, 'w') as outfile:
+            outfile.write(generator.day(start))
+
+        combined = os.path.join(workdir, 'sarcombined')
+        with open(combined, 'w') as outfile:
+            outfile.write(generator.days(start, args.days))
+
+        single_size = os.path.getsize(single)
+        combined_size = os.path.getsize(combined)
+
+        results = []
+        for name, func in SINGLE_BENCHMARKS:
+            results.append(
+                measure(name, func, (single,), single_size, args.repeat)
+            )
+        for name, func in MULTI_BENCHMARKS:
+            results.append(
+                measure(name, func, (combined, 1), combined_size, args.repeat)
+            )
+            results.append(measure(
+                '%s(workers=%d)' % (name, args.workers), func,
+                (combined, args.workers), combined_size, args.repeat
+            ))
+
+    finally:
+        shutil.rmtree(workdir)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': vars(args),
+        'results': results,
+    }
+
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as outfile:
+            json.dump(report, outfile, indent=2, sort_keys=True)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
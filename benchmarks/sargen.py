@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+'''
+Deterministic generator of synthetic SAR ASCII output (as written by
+``sar -u -P ALL -r -S -b -w``), for benchmarking the parsers.
+
+Same parameters (and seed) always give the same output, byte for byte.
+
+Usage::
+
+    $ python benchmarks/sargen.py --cpus 128 --interval 1 sar01
+    $ python benchmarks/sargen.py --days 31 --ampm sarcombined
+'''
+
+import argparse
+import datetime
+import random
+import sys
+
+
+CPU_HEADER = ('CPU', '%user', '%nice', '%system', '%iowait', '%steal',
+              '%idle')
+TASK_HEADER = ('proc/s', 'cswch/s')
+IO_HEADER = ('tps', 'rtps', 'wtps', 'bread/s', 'bwrtn/s')
+MEM_HEADER = ('kbmemfree', 'kbmemused', '%memused', 'kbbuffers', 'kbcached',
+              'kbcommit', '%commit')
+SWP_HEADER = ('kbswpfree', 'kbswpused', '%swpused', 'kbswpcad', '%swpcad')
+
+MEM_TOTAL = 64 * 1024 * 1024
+SWP_TOTAL = 8 * 1024 * 1024
+
+
+def format_time(seconds, ampm=False):
+    '''
+    Formats seconds since midnight as sar does
+        :param seconds: Seconds since midnight
+        :type seconds: int.
+        :param ampm: Use 12hr AM/PM notation
+        :type ampm: bool.
+        :return: str.
+    '''
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+
+    if not ampm:
+        return '%02d:%02d:%02d' % (hours, minutes, secs)
+
+    suffix = 'AM' if hours < 12 else 'PM'
+    hours = hours % 12 or 12
+    return '%02d:%02d:%02d %s' % (hours, minutes, secs, suffix)
+
+
+class SarGenerator(object):
+    '''
+    Generator of synthetic SAR files
+        :param cpus: Number of CPUs (rows per CPU sample are cpus + 1)
+        :type cpus: int.
+        :param interval: Sampling interval, in seconds
+        :type interval: int.
+        :param ampm: Use 12hr AM/PM timestamps instead of 24hr ones
+        :type ampm: bool.
+        :param restarts: Number of ``LINUX RESTART`` notices per day
+        :type restarts: int.
+        :param seed: Seed for the values
+        :type seed: int.
+    '''
+
+    def __init__(self, cpus=4, interval=600, ampm=False, restarts=0,
+                 seed=0):
+
+        self.cpus = cpus
+        self.interval = interval
+        self.ampm = ampm
+        self.restarts = restarts
+        self.seed = seed
+
+    def day(self, date):
+        '''
+        Generates output of a single day
+            :param date: Date of the day
+            :type date: :class:`datetime.date`
+            :return: str.
+        '''
+        rnd = random.Random('%s-%s' % (self.seed, date.isoformat()))
+
+        # Day is split into (restarts + 1) runs of sadc
+        bounds = [0]
+        for i in range(1, self.restarts + 1):
+            bounds.append(86400 * i // (self.restarts + 1))
+        bounds.append(86400)
+
+        runs = []
+        for i in range(len(bounds) - 1):
+            times = list(range(bounds[i] + self.interval + 1, bounds[i + 1],
+                               self.interval))
+            runs.append((bounds[i], times))
+
+        out = ['Linux 3.10.0-1160.el7.x86_64 (bench) \t%s \t_x86_64_\t'
+               '(%d CPU)' % (date.isoformat(), self.cpus), '']
+
+        def section(header, rows):
+            for r, (start, times) in enumerate(runs):
+                if r > 0:
+                    out.append('%s       LINUX RESTART' %
+                               format_time(start, self.ampm))
+                    out.append('')
+                out.append(self._line(start + 1, header))
+                for seconds in times:
+                    for row in rows(rnd):
+                        out.append(self._line(seconds, row))
+                out.append('')
+            for row in rows(rnd):
+                out.append(self._line(None, row))
+            out.append('')
+
+        section(CPU_HEADER, self._cpu_rows)
+        section(TASK_HEADER, self._task_rows)
+        section(IO_HEADER, self._io_rows)
+        section(MEM_HEADER, self._mem_rows)
+        section(SWP_HEADER, self._swp_rows)
+
+        return '\n'.join(out)
+
+    def days(self, start, count):
+        '''
+        Generates combined output of consecutive days, as
+        ``cat sar* > sarcombined`` would
+            :param start: Date of the first day
+            :type start: :class:`datetime.date`
+            :param count: Number of days
+            :type count: int.
+            :return: str.
+        '''
+        return ''.join(
+            self.day(start + datetime.timedelta(days=i)) + '\n'
+            for i in range(count)
+        )
+
+    def _line(self, seconds, values):
+        if seconds is None:
+            stamp = 'Average:'
+        else:
+            stamp = format_time(seconds, self.ampm)
+        return '%-11s %s' % (stamp, ' '.join('%9s' % v for v in values))
+
+    def _cpu_rows(self, rnd):
+        rows = []
+        for cpu in ['all'] + [str(i) for i in range(self.cpus)]:
+            usr = rnd.uniform(0, 60)
+            sys_ = rnd.uniform(0, 20)
+            iowait = rnd.uniform(0, 10)
+            rows.append((cpu, '%.2f' % usr, '0.00', '%.2f' % sys_,
+                         '%.2f' % iowait, '0.00',
+                         '%.2f' % (100 - usr - sys_ - iowait)))
+        return rows
+
+    def _task_rows(self, rnd):
+        return [('%.2f' % rnd.uniform(0, 50),
+                 '%.2f' % rnd.uniform(1000, 90000))]
+
+    def _io_rows(self, rnd):
+        rtps = rnd.uniform(0, 500)
+        wtps = rnd.uniform(0, 500)
+        return [('%.2f' % (rtps + wtps), '%.2f' % rtps, '%.2f' % wtps,
+                 '%.2f' % (rtps * 8), '%.2f' % (wtps * 8))]
+
+    def _mem_rows(self, rnd):
+        used = rnd.randint(MEM_TOTAL // 4, MEM_TOTAL - 1024)
+        return [(str(MEM_TOTAL - used), str(used),
+                 '%.2f' % (100.0 * used / MEM_TOTAL),
+                 str(rnd.randint(0, 1024 * 1024)),
+                 str(rnd.randint(0, 16 * 1024 * 1024)),
+                 str(used * 2), '%.2f' % (200.0 * used / MEM_TOTAL))]
+
+    def _swp_rows(self, rnd):
+        used = rnd.randint(0, SWP_TOTAL // 10)
+        return [(str(SWP_TOTAL - used), str(used),
+                 '%.2f' % (100.0 * used / SWP_TOTAL), '0', '0.00')]
+
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        description='Generate synthetic SAR ASCII output'
+    )
+    argparser.add_argument('output', help='File to write to')
+    argparser.add_argument('--cpus', type=int, default=4)
+    argparser.add_argument('--interval', type=int, default=600,
+                           help='Sampling interval, in seconds')
+    argparser.add_argument('--days', type=int, default=1,
+                           help='More than 1 writes a combined file')
+    argparser.add_argument('--ampm', action='store_true',
+                           help='12hr AM/PM timestamps')
+    argparser.add_argument('--restarts', type=int, default=0)
+    argparser.add_argument('--seed', type=int, default=0)
+    argparser.add_argument('--start', default='2013-11-20',
+                           help='Date of the first day (YYYY-MM-DD)')
+    args = argparser.parse_args(argv)
+
+    generator = SarGenerator(args.cpus, args.interval, args.ampm,
+                             args.restarts, args.seed)
+    start = datetime.datetime.strptime(args.start, '%Y-%m-%d').date()
+
+    with open(args.output, 'w') as outfile:
+        outfile.write(generator.days(start, args.days))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,11 @@
 #!/usr/bin/env python
 
+__version__ = '0.2.1'
+"""Version of the SAR parser"""
+
+DATA_FORMAT = 2
+"""Version of parsed data layout, part of parsed data cache keys; bump it
+whenever sections, fields or shape of parsed data change"""
 
 """CPU regexp pattern for detecting SAR section header"""
 PATTERN_CPU = ".*CPU.*(usr|user).*nice.*sys.*"
@@ -71,6 +77,79 @@ FIELD_PAIRS_TASK = {
     'proc': FIELDS_TASK[0], 'cswch': FIELDS_TASK[1]
 }
 
+"""Queue length and load average regexp pattern for SAR section header"""
+PATTERN_LOAD = '.*runq-sz.*plist-sz.*ldavg-1.*'
+
+"""Regexp terms for finding fields in SAR parts for queue length and load"""
+FIELDS_LOAD = [
+    'runq-sz', 'plist-sz', 'ldavg-1$', 'ldavg-5$', 'ldavg-15$', 'blocked'
+]
+
+"""Pair regexp terms with field names in queue length and load output dictionary"""
+FIELD_PAIRS_LOAD = {
+    'runq': FIELDS_LOAD[0], 'plist': FIELDS_LOAD[1], 'ldavg1': FIELDS_LOAD[2],
+    'ldavg5': FIELDS_LOAD[3], 'ldavg15': FIELDS_LOAD[4],
+    'blocked': FIELDS_LOAD[5]
+}
+
+"""Paging regexp pattern for detecting SAR section header"""
+PATTERN_PAGE = '.*pgpgin\/s.*pgpgout\/s.*fault\/s.*'
+
+"""Regexp terms for finding fields in SAR parts for paging"""
+FIELDS_PAGE = [
+    'pgpgin\/s', 'pgpgout\/s', '^fault\/s', 'majflt\/s', 'pgfree\/s',
+    'pgscank\/s', 'pgscand\/s', 'pgsteal\/s', '\%vmeff'
+]
+
+"""Pair regexp terms with field names in paging output dictionary"""
+FIELD_PAIRS_PAGE = {
+    'pgpgin': FIELDS_PAGE[0], 'pgpgout': FIELDS_PAGE[1],
+    'fault': FIELDS_PAGE[2], 'majflt': FIELDS_PAGE[3],
+    'pgfree': FIELDS_PAGE[4], 'pgscank': FIELDS_PAGE[5],
+    'pgscand': FIELDS_PAGE[6], 'pgsteal': FIELDS_PAGE[7],
+    'vmeff': FIELDS_PAGE[8]
+}
+
+"""Network interface regexp pattern for detecting SAR section header"""
+PATTERN_NET = '.*IFACE.*rxpck\/s.*txpck\/s.*'
+
+"""Regexp terms for finding fields in SAR parts for network interfaces"""
+FIELDS_NET = [
+    'rxpck\/s', 'txpck\/s', 'rxkB\/s', 'txkB\/s', 'rxcmp\/s', 'txcmp\/s',
+    'rxmcst\/s', '\%ifutil'
+]
+
+"""Pair regexp terms with field names in network interface output dictionary"""
+FIELD_PAIRS_NET = {
+    'rxpck': FIELDS_NET[0], 'txpck': FIELDS_NET[1], 'rxkb': FIELDS_NET[2],
+    'txkb': FIELDS_NET[3], 'rxcmp': FIELDS_NET[4], 'txcmp': FIELDS_NET[5],
+    'rxmcst': FIELDS_NET[6], 'ifutil': FIELDS_NET[7]
+}
+
+"""Block device regexp pattern for detecting SAR section header"""
+PATTERN_DISK = '.*DEV.*tps.*await.*'
+
+"""Regexp terms for finding fields in SAR parts for block devices, older
+(sectors) and newer (kB) sysstat columns alike"""
+FIELDS_DISK = [
+    '^tps', 'rd_sec\/s', 'wr_sec\/s', '^rkB\/s', '^wkB\/s',
+    '^(avgrq|areq)-sz', '^(avgqu|aqu)-sz', '^await', '^svctm', '\%util'
+]
+
+"""Pair regexp terms with field names in block device output dictionary"""
+FIELD_PAIRS_DISK = {
+    'tps': FIELDS_DISK[0], 'rdsec': FIELDS_DISK[1], 'wrsec': FIELDS_DISK[2],
+    'rkb': FIELDS_DISK[3], 'wkb': FIELDS_DISK[4], 'avgrq': FIELDS_DISK[5],
+    'avgqu': FIELDS_DISK[6], 'await': FIELDS_DISK[7],
+    'svctm': FIELDS_DISK[8], 'util': FIELDS_DISK[9]
+}
+
+"""Fields with integer values, all the others are floats"""
+INT_FIELDS = frozenset([
+    'membuffer', 'memcache', 'memfree', 'memused', 'swapfree', 'swapused',
+    'runq', 'plist', 'blocked'
+])
+
 """Restart time regexp pattern for detecting SAR restart notices"""
 PATTERN_RESTART = '.*LINUX\ RESTART.*'
 
@@ -84,7 +163,8 @@ ALL_PATTERNS = {
     'CPU': {
         'PATTERN': PATTERN_CPU,
         'FIELDS': FIELDS_CPU,
-        'PAIRS': FIELD_PAIRS_CPU
+        'PAIRS': FIELD_PAIRS_CPU,
+        'INSTANCE': True
     },
     'MEM': {
         'PATTERN': PATTERN_MEM,
@@ -106,10 +186,38 @@ ALL_PATTERNS = {
         'FIELDS': FIELDS_TASK,
         'PAIRS': FIELD_PAIRS_TASK
 
+    },
+    'LOAD': {
+        'PATTERN': PATTERN_LOAD,
+        'FIELDS': FIELDS_LOAD,
+        'PAIRS': FIELD_PAIRS_LOAD
+    },
+    'PAGE': {
+        'PATTERN': PATTERN_PAGE,
+        'FIELDS': FIELDS_PAGE,
+        'PAIRS': FIELD_PAIRS_PAGE
+    },
+    'NET': {
+        'PATTERN': PATTERN_NET,
+        'FIELDS': FIELDS_NET,
+        'PAIRS': FIELD_PAIRS_NET,
+        'INSTANCE': True
+    },
+    'DISK': {
+        'PATTERN': PATTERN_DISK,
+        'FIELDS': FIELDS_DISK,
+        'PAIRS': FIELD_PAIRS_DISK,
+        'INSTANCE': True
     }
 }
 
+"""Sections with one row per instance (CPU, interface, device) at each
+time, keyed by the instance name from the column after the time"""
+INSTANCE_SECTIONS = frozenset(
+    name for name in ALL_PATTERNS if ALL_PATTERNS[name].get('INSTANCE')
+)
+
 __all__ = [
     'PATTERN_RESTART', 'PATTERN_MULTISPLIT',
-    'PATTERN_DATE', 'ALL_PATTERNS'
+    'PATTERN_DATE', 'ALL_PATTERNS', 'INT_FIELDS', 'INSTANCE_SECTIONS'
 ]
@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+"""
+:mod:`sar.baseline` is a module containing per-time-of-day baselines over
+a trailing window of days (e.g. mean and median ``iowait`` at 14:05 over
+the past 28 days), to compare a day against.
+
+Values are grouped into time-of-day slots (``5min`` by default) per
+section, instance (CPU, interface, device) and field. Every slot keeps
+running count, sum and sum of squares (for mean and standard deviation)
+and a logarithmic histogram (for quantiles, within ``ACCURACY`` relative
+error). All of them can be both merged and subtracted, so adding a day
+or evicting one that left the window costs the size of that day only,
+nothing is recomputed over the window.
+"""
+
+from sar import INSTANCE_SECTIONS
+from sar.rollup import parse_window
+from sar.table import seconds_to_time, time_to_seconds
+import datetime
+import math
+
+ACCURACY = 0.01
+"""Relative accuracy of quantile estimates"""
+
+ZERO_VALUE = 1e-9
+"""Values up to this (SAR values are never negative) are counted as 0"""
+
+_GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+"""Ratio of histogram bucket bounds"""
+
+_LOG_GAMMA = math.log(_GAMMA)
+"""Logarithm of :data:`_GAMMA`"""
+
+
+def _bucket(value):
+    """
+    Finds histogram bucket of a value
+        :return: int. bucket index, ``None`` for zero
+    """
+    if value <= ZERO_VALUE:
+        return None
+    return int(math.ceil(math.log(value) / _LOG_GAMMA))
+
+
+def _bucket_value(index):
+    """
+    Representative value of a histogram bucket, within ``ACCURACY`` of
+    any value in it
+    """
+    if index is None:
+        return 0.0
+    return 2 * (_GAMMA ** index) / (_GAMMA + 1)
+
+
+def _time_seconds(full_time):
+    """
+    Time of day of a row key, in seconds since midnight
+        :param full_time: ``HH:MM:SS`` or epoch seconds
+    """
+    if isinstance(full_time, (int, long)):
+        return full_time % 86400
+    return time_to_seconds(full_time)
+
+
+class _Summary(object):
+    """
+    Mergeable (and subtractable) statistics of a set of values
+    """
+
+    __slots__ = ('count', 'total', 'squares', 'buckets')
+
+    def __init__(self):
+
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.buckets = {}
+
+    def add(self, value):
+        """
+        Adds single value
+        """
+        self.count += 1
+        self.total += value
+        self.squares += value * value
+        index = _bucket(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other, sign=1):
+        """
+        Adds (``sign`` 1) or subtracts (``sign`` -1) other summary
+        """
+        self.count += sign * other.count
+        self.total += sign * other.total
+        self.squares += sign * other.squares
+        for index, count in other.buckets.items():
+            count = self.buckets.get(index, 0) + sign * count
+            if count:
+                self.buckets[index] = count
+            else:
+                del self.buckets[index]
+
+    def mean(self):
+        """
+        Arithmetic mean of the values
+        """
+        return self.total / self.count
+
+    def stddev(self):
+        """
+        Sample standard deviation of the values
+        """
+        if self.count < 2:
+            return 0.0
+        variance = (self.squares - self.total * self.total / self.count) / \
+            (self.count - 1)
+        # Subtracting evicted days may leave rounding noise below zero
+        return math.sqrt(max(variance, 0.0))
+
+    def quantile(self, q):
+        """
+        Estimates quantile of the values from the histogram
+            :param q: Quantile, between 0 and 1 (0.5 for median)
+            :type q: float.
+        """
+        rank = q * (self.count - 1)
+        seen = 0
+        ordered = sorted(index for index in self.buckets
+                         if index is not None)
+        if None in self.buckets:
+            ordered.insert(0, None)
+        for index in ordered:
+            seen += self.buckets[index]
+            if seen > rank:
+                return _bucket_value(index)
+        return _bucket_value(ordered[-1])
+
+
+class Baseline(object):
+    """
+    Per-time-of-day baseline over a trailing window of days. Days are
+    added as they get parsed (see :meth:`update`); days which fall out of
+    the window behind the newest one are evicted.
+        :param window_days: Number of days in the window
+        :type window_days: int.
+        :param slot: Size of time-of-day slots (seconds, or ``5min``, \\
+            ``1h``, ...)
+        :param sections: Names of sections to keep baseline of, all if \\
+            ``None``
+        :type sections: list.
+        :param fields: Section name => names of fields to keep baseline \\
+            of; sections not in it get all fields
+        :type fields: dict.
+    """
+
+    def __init__(self, window_days=28, slot='5min', sections=None,
+                 fields=None):
+
+        self.window_days = window_days
+        """Number of days in the window"""
+        self.slot = parse_window(slot)
+        """Size of time-of-day slots, in seconds"""
+        self.__sections = sections
+        """Names of sections to keep, all if ``None``"""
+        self.__fields = fields or {}
+        """Section name => names of fields to keep"""
+
+        self.__days = {}
+        """Date => (section, instance, field, slot) => day's summary"""
+        self.__totals = {}
+        """(section, instance, field, slot) => summary over the window"""
+
+    def days(self):
+        """
+        Lists days in the window
+            :return: Sorted ``List`` of dates
+        """
+        return sorted(self.__days)
+
+    def add_day(self, date, sarinfo):
+        """
+        Adds parsed day to the baseline, replacing the same day if it was
+        added before, and evicts days which left the window
+            :param date: Date of the day (``YYYY-MM-DD``)
+            :type date: str.
+            :param sarinfo: ``Dictionary``-style SAR data of the day, with \\
+                ``HH:MM:SS`` or epoch keys
+            :type sarinfo: dict.
+            :return: ``False`` if day is older than the window
+        """
+        newest = max(self.__days) if self.__days else date
+        if date < newest and self.__too_old(date, newest):
+            return False
+
+        if date in self.__days:
+            self.remove_day(date)
+
+        summaries = self.__summarize(sarinfo)
+        for key, summary in summaries.items():
+            try:
+                self.__totals[key].merge(summary)
+            except KeyError:
+                total = self.__totals[key] = _Summary()
+                total.merge(summary)
+        self.__days[date] = summaries
+
+        for olddate in list(self.__days):
+            if self.__too_old(olddate, max(newest, date)):
+                self.remove_day(olddate)
+
+        return True
+
+    def update(self, days):
+        """
+        Adds more days, e.g. from \\
+        :meth:`sar.multiparser.Multiparser.iter_days`
+            :param days: Iterable of (date, ``Dictionary``-style SAR data)
+        """
+        for date, sarinfo in days:
+            self.add_day(date, sarinfo)
+
+    def remove_day(self, date):
+        """
+        Takes day out of the baseline
+            :param date: Date of the day
+            :type date: str.
+        """
+        summaries = self.__days.pop(date, {})
+        for key, summary in summaries.items():
+            total = self.__totals[key]
+            total.merge(summary, -1)
+            if not total.count:
+                del self.__totals[key]
+
+    def stats(self, section, field, full_time, instance=None,
+              quantiles=(0.5,)):
+        """
+        Baseline statistics of a field in the slot of the given time
+            :param section: Name of the section
+            :type section: str.
+            :param field: Name of the field
+            :type field: str.
+            :param full_time: Time of day (``HH:MM:SS`` or epoch seconds)
+            :param instance: CPU id, interface or device for sections \\
+                with instances (``all`` for ``CPU`` if not given)
+            :type instance: str.
+            :param quantiles: Quantiles to estimate
+            :type quantiles: tuple.
+            :return: ``Dictionary`` with ``count``, ``mean``, ``stddev`` \\
+                and ``pNN`` quantiles (``p50`` for median), ``None`` if \\
+                there's no data for the slot
+        """
+        total = self.__totals.get(self.__key(section, instance, field,
+                                             full_time))
+        if total is None:
+            return None
+
+        output = {
+            'count': total.count, 'mean': total.mean(),
+            'stddev': total.stddev()
+        }
+        for q in quantiles:
+            output['p%g' % (q * 100,)] = total.quantile(q)
+
+        return output
+
+    def quantile(self, section, field, full_time, q=0.5, instance=None):
+        """
+        Estimates baseline quantile of a field in the slot of the time
+            :return: float. or ``None`` if there's no data for the slot
+        """
+        total = self.__totals.get(self.__key(section, instance, field,
+                                             full_time))
+        if total is None:
+            return None
+        return total.quantile(q)
+
+    def deviation(self, section, field, full_time, value, instance=None):
+        """
+        Deviation of a value from the baseline of its slot, in standard
+        deviations (z-score)
+            :return: float. or ``None`` if there's no data for the slot, \\
+                or it doesn't vary at all
+        """
+        total = self.__totals.get(self.__key(section, instance, field,
+                                             full_time))
+        if total is None:
+            return None
+
+        stddev = total.stddev()
+        if not stddev:
+            return None
+        return (value - total.mean()) / stddev
+
+    def deviations(self, sarinfo):
+        """
+        Deviations of all values of a day from the baseline
+            :param sarinfo: ``Dictionary``-style SAR data of the day
+            :type sarinfo: dict.
+            :return: ``Dictionary``-style data with z-scores (see \\
+                :meth:`deviation`) instead of values; values without \\
+                baseline are left out
+        """
+        output = {}
+
+        for section, instance, field, full_time, value in \
+                self.__values(sarinfo):
+            zscore = self.deviation(section, field, full_time, value,
+                                    instance)
+            if zscore is None:
+                continue
+            row = output.setdefault(section, {}).setdefault(full_time, {})
+            if instance is not None:
+                row = row.setdefault(instance, {})
+            row[field] = zscore
+
+        return output
+
+    def slot_of(self, full_time):
+        """
+        Start of the slot a time falls into
+            :param full_time: ``HH:MM:SS`` or epoch seconds
+            :return: ``HH:MM:SS`` start of the slot
+        """
+        seconds = _time_seconds(full_time)
+        return seconds_to_time(seconds - seconds % self.slot)
+
+    def __too_old(self, date, newest):
+        """
+        Decides whether a day is out of the window ending with newest day
+        """
+        age = (datetime.datetime.strptime(newest, '%Y-%m-%d') -
+               datetime.datetime.strptime(date, '%Y-%m-%d')).days
+        return age >= self.window_days
+
+    def __key(self, section, instance, field, full_time):
+        """
+        Builds key of the running statistics of a slot
+        """
+        if instance is None and section == 'CPU':
+            instance = 'all'
+        return (section, instance, field,
+                _time_seconds(full_time) // self.slot)
+
+    def __values(self, sarinfo):
+        """
+        Flattens ``Dictionary``-style SAR data, keeping only wanted
+        sections and fields
+            :return: generator of (section, instance or ``None``, field, \\
+                time, value)
+        """
+        for section in sarinfo:
+            if self.__sections is not None and \
+                    section not in self.__sections:
+                continue
+
+            wanted = self.__fields.get(section)
+            section_info = sarinfo[section]
+
+            for full_time in section_info:
+                row = section_info[full_time]
+
+                if section in INSTANCE_SECTIONS:
+                    rows = row.items()
+                else:
+                    rows = ((None, row),)
+
+                for instance, values in rows:
+                    for field, value in values.items():
+                        if wanted is None or field in wanted:
+                            yield (section, instance, field, full_time,
+                                   value)
+
+    def __summarize(self, sarinfo):
+        """
+        Summarizes one day's values per slot
+            :return: (section, instance, field, slot) => :class:`_Summary`
+        """
+        summaries = {}
+
+        for section, instance, field, full_time, value in \
+                self.__values(sarinfo):
+            key = (section, instance, field,
+                   _time_seconds(full_time) // self.slot)
+            try:
+                summary = summaries[key]
+            except KeyError:
+                summary = summaries[key] = _Summary()
+            summary.add(value)
+
+        return summaries
@@ -0,0 +1,408 @@
+#!/usr/bin/env python
+"""
+:mod:`sar.binary` is a module containing class for reading binary SAR data
+files (``saDD``, as written by ``sadc``) directly, without running them
+through ``sar`` into ASCII output first.
+
+Reads datafile format of current sysstat versions (format magic
+``0x2175``, sysstat 11.7.1 and newer, including 12.x). Sizes of file
+structures are taken from the file itself, so additions to them in
+future versions are skipped over. Files written on machines of other
+endianness are read as well.
+
+Values are computed from the raw counters the same way ``sar`` does it
+for ``-u``, ``-w``, ``-b``, ``-r`` and ``-S``, so data comes in the same
+structure :meth:`sar.parser.Parser.get_sar_info` returns.
+"""
+
+import mmap
+import os
+import struct
+import traceback
+
+SYSSTAT_MAGIC = 0xd596
+"""Magic number at the beginning of every sysstat datafile"""
+
+FORMAT_MAGIC = 0x2175
+"""Datafile format magic number this module understands"""
+
+FILE_MAGIC_SIZE = 76
+"""Size of file_magic structure (version info, header description)"""
+
+MAX_COMMENT_LEN = 64
+"""Size of the comment following R_COMMENT records"""
+
+R_STATS = 1
+R_RESTART = 2
+R_LAST_STATS = 3
+R_COMMENT = 4
+"""Record types"""
+
+A_CPU = 1
+A_PCSW = 2
+A_IO = 6
+A_MEMORY = 7
+"""Activity identifiers of activities which get decoded"""
+
+
+class BinaryParser(object):
+    """
+    Reader for binary SAR data files (``saDD``).
+        :param filename: Name of the SAR data file
+        :type filename: str.
+    """
+
+    def __init__(self, filename=''):
+
+        self._sarinfo = {}
+        """Hash with SAR info"""
+        self.__file_date = ''
+        """String which contains date of SAR file"""
+        self.__restart_times = []
+        """List with box restart times"""
+        self.__filename = filename
+        """SAR data filename to be parsed"""
+
+        self.__endian = '<'
+        """``struct`` byte order of the file"""
+        self.__sizeof_long = 8
+        """Size of C ``long`` on the machine which wrote the file"""
+        self.__activities = []
+        """List of activities (id, has_nr, nr_ini, nr2, size, ull_nr)"""
+
+    def load_file(self):
+        """
+        Loads SAR binary data file (saDD).
+            :return: ``True`` if loading and parsing of file went fine, \\
+            ``False`` if it failed (at any point)
+        """
+
+        if not (self.__filename and os.access(self.__filename, os.R_OK)):
+            return False
+
+        try:
+            fhandle = os.open(self.__filename, os.O_RDONLY)
+        except OSError:
+            print(("Couldn't open file %s" % self.__filename))
+            return False
+
+        try:
+            try:
+                sarmap = mmap.mmap(fhandle, length=0, prot=mmap.PROT_READ)
+            except (TypeError, IndexError, ValueError, EnvironmentError):
+                traceback.print_exc()
+                return False
+
+            try:
+                usage = self.__read(sarmap)
+            except struct.error:
+                print(("Truncated or corrupted SAR data file %s" %
+                       self.__filename))
+                traceback.print_exc()
+                usage = False
+            finally:
+                sarmap.close()
+
+        finally:
+            os.close(fhandle)
+
+        if not usage or 'CPU' not in usage:
+            return False
+
+        self._sarinfo = usage
+        return True
+
+    def get_filedate(self):
+        """
+        Returns file date of SAR file
+            :return: ISO format (YYYY-MM-DD) of a SAR file
+        """
+        if self.__file_date == '':
+            self.load_file()
+
+        return self.__file_date
+
+    def get_sar_info(self):
+        """
+        Returns parsed sar info
+            :return: ``Dictionary``-style list of SAR data
+        """
+        if 'CPU' not in self._sarinfo and not self.load_file():
+            return False
+
+        return self._sarinfo
+
+    def __read(self, sarmap):
+        """
+        Reads file headers and all records out of mapped data file
+            :param sarmap: Mapped SAR data file
+            :type sarmap: mmap.
+            :return: ``Dictionary``-style SAR data, ``False`` if file \\
+                format isn't supported
+        """
+
+        if sarmap.size() < FILE_MAGIC_SIZE:
+            return False
+
+        magic = struct.unpack_from('<H', sarmap, 0)[0]
+        if magic == SYSSTAT_MAGIC:
+            self.__endian = '<'
+        elif magic == ((SYSSTAT_MAGIC >> 8) | (SYSSTAT_MAGIC << 8)) & 0xffff:
+            self.__endian = '>'
+        else:
+            print(("%s is not a sysstat data file" % self.__filename))
+            return False
+
+        endian = self.__endian
+
+        format_magic = struct.unpack_from(endian + 'H', sarmap, 2)[0]
+        if format_magic != FORMAT_MAGIC:
+            print(("Unsupported sysstat data file format 0x%04x" %
+                   format_magic))
+            return False
+
+        # file_magic: header_size, upgraded, hdr_types_nr[3]
+        header_size = struct.unpack_from(endian + 'I', sarmap, 8)[0]
+
+        # file_header
+        pos = FILE_MAGIC_SIZE
+        (cpu_nr, act_nr, year) = struct.unpack_from(endian + 'IIi', sarmap,
+                                                    pos + 16)
+        (act_size, rec_size, extra_next) = struct.unpack_from(
+            endian + 'III', sarmap, pos + 52
+        )
+        (day, month, sizeof_long) = struct.unpack_from(
+            endian + 'BBb', sarmap, pos + 64
+        )
+
+        self.__sizeof_long = sizeof_long
+        self.__file_date = '%04d-%02d-%02d' % (year + 1900, month + 1, day)
+        pos += header_size
+
+        if extra_next:
+            pos = self.__skip_extra(sarmap, pos)
+
+        # file_activity list
+        self.__activities = []
+        for i in range(act_nr):
+            (act_id, act_magic, nr_ini, nr2, has_nr, size,
+             ull_nr, ul_nr, u_nr) = struct.unpack_from(
+                 endian + 'IIiiiiIII', sarmap, pos
+            )
+            self.__activities.append((act_id, has_nr, nr_ini, nr2, size,
+                                      ull_nr))
+            pos += act_size
+
+        usage = {'CPU': {}, 'TASK': {}, 'IO': {}, 'MEM': {}, 'SWP': {}}
+        previous = None
+        filesize = sarmap.size()
+
+        while pos + rec_size <= filesize:
+
+            (uptime_cs, ust_time, rec_extra_next, record_type, hour, minute,
+             second) = struct.unpack_from(endian + 'QQIBBBB', sarmap, pos)
+            pos += rec_size
+
+            if rec_extra_next:
+                pos = self.__skip_extra(sarmap, pos)
+
+            full_time = '%02d:%02d:%02d' % (hour, minute, second)
+
+            if record_type == R_RESTART:
+                # New number of CPUs (including ``all``) follows restart
+                # notice; records from here on are sized for it
+                cpu_nr = struct.unpack_from(endian + 'I', sarmap, pos)[0]
+                pos += 4
+                self.__set_cpu_nr(cpu_nr)
+                self.__restart_times.append(full_time)
+                previous = None
+
+            elif record_type == R_COMMENT:
+                pos += MAX_COMMENT_LEN
+
+            elif record_type in (R_STATS, R_LAST_STATS):
+                current, pos = self.__read_stats(sarmap, pos)
+                current['uptime'] = uptime_cs
+
+                if previous is not None:
+                    self.__compute(usage, full_time, previous, current)
+
+                previous = current
+
+            else:
+                print(("Unknown record type %d in %s" %
+                       (record_type, self.__filename)))
+                break
+
+        # Sections without data in the file are left out, as in ASCII
+        return dict(
+            (section, usage[section]) for section in usage if usage[section]
+        )
+
+    def __set_cpu_nr(self, cpu_nr):
+        """
+        Updates number of ``CPU`` activity items after a restart of the
+        box with different number of CPUs
+            :param cpu_nr: Number of CPUs, ``all`` included
+            :type cpu_nr: int.
+        """
+        self.__activities = [
+            (act_id, has_nr, cpu_nr if act_id == A_CPU else nr_ini, nr2,
+             size, ull_nr)
+            for act_id, has_nr, nr_ini, nr2, size, ull_nr
+            in self.__activities
+        ]
+
+    def __skip_extra(self, sarmap, pos):
+        """
+        Skips chain of extra structures
+            :return: Position behind the extra structures
+        """
+        extra_next = 1
+        while extra_next:
+            (extra_nr, extra_size, extra_next) = struct.unpack_from(
+                self.__endian + 'III', sarmap, pos
+            )
+            pos += 24 + extra_nr * extra_size
+        return pos
+
+    def __read_stats(self, sarmap, pos):
+        """
+        Reads raw counters of one statistics record
+            :return: ``Tuple`` of (activity id => list of counter tuples, \\
+                position behind the record)
+        """
+        endian = self.__endian
+        current = {}
+
+        for act_id, has_nr, nr_ini, nr2, size, ull_nr in self.__activities:
+
+            nr = nr_ini
+            if has_nr:
+                nr = struct.unpack_from(endian + 'i', sarmap, pos)[0]
+                pos += 4
+
+            count = nr * nr2
+
+            if act_id in (A_CPU, A_IO, A_MEMORY):
+                # Structures of unsigned long long counters only
+                ull_fmt = endian + ('Q' * ull_nr)
+                current[act_id] = [
+                    struct.unpack_from(ull_fmt, sarmap, pos + i * size)
+                    for i in range(count)
+                ]
+
+            elif act_id == A_PCSW:
+                # unsigned long long context_switch, unsigned long processes
+                pcsw_fmt = endian + ('QQ' if self.__sizeof_long == 8
+                                     else 'QI')
+                current[act_id] = [
+                    struct.unpack_from(pcsw_fmt, sarmap, pos + i * size)
+                    for i in range(count)
+                ]
+
+            pos += count * size
+
+        return (current, pos)
+
+    def __compute(self, usage, full_time, previous, current):
+        """
+        Computes values shown by ``sar`` out of two consecutive samples
+        and stores them into SAR data
+        """
+        # Interval in hundredths of a second
+        itv = current['uptime'] - previous['uptime']
+        if itv <= 0:
+            return
+
+        if A_CPU in current and A_CPU in previous:
+            cpus = {}
+            prev_cpus = previous[A_CPU]
+            curr_cpus = current[A_CPU]
+
+            for i in range(min(len(prev_cpus), len(curr_cpus))):
+                values = _cpu_values(prev_cpus[i], curr_cpus[i])
+                if values:
+                    cpus['all' if i == 0 else str(i - 1)] = values
+
+            if cpus:
+                usage['CPU'][full_time] = cpus
+
+        if A_PCSW in current and A_PCSW in previous:
+            prev_pcsw = previous[A_PCSW][0]
+            curr_pcsw = current[A_PCSW][0]
+            usage['TASK'][full_time] = {
+                'proc': _rate(prev_pcsw[1], curr_pcsw[1], itv),
+                'cswch': _rate(prev_pcsw[0], curr_pcsw[0], itv)
+            }
+
+        if A_IO in current and A_IO in previous:
+            prev_io = previous[A_IO][0]
+            curr_io = current[A_IO][0]
+            usage['IO'][full_time] = {
+                'tps': _rate(prev_io[0], curr_io[0], itv),
+                'rtps': _rate(prev_io[1], curr_io[1], itv),
+                'wtps': _rate(prev_io[2], curr_io[2], itv),
+                'bread': _rate(prev_io[3], curr_io[3], itv),
+                'bwrite': _rate(prev_io[4], curr_io[4], itv)
+            }
+
+        if A_MEMORY in current:
+            # frmkb, bufkb, camkb, tlmkb, frskb, tlskb, caskb, comkb,
+            # activekb, inactkb, dirtykb, anonpgkb, slabkb, ...
+            mem = current[A_MEMORY][0]
+            memused = mem[3] - mem[0] - mem[1] - mem[2] - mem[12]
+            usage['MEM'][full_time] = {
+                'memfree': int(mem[0]),
+                'memused': int(memused),
+                'memusedpercent': _percent(memused, mem[3]),
+                'membuffer': int(mem[1]),
+                'memcache': int(mem[2])
+            }
+            usage['SWP'][full_time] = {
+                'swapfree': int(mem[4]),
+                'swapused': int(mem[5] - mem[4]),
+                'swapusedpercent': _percent(mem[5] - mem[4], mem[5])
+            }
+
+
+def _rate(previous, current, itv):
+    """
+    Per-second rate of a counter, itv being in hundredths of a second
+    """
+    return round(float(current - previous) / itv * 100, 2)
+
+
+def _percent(part, total):
+    """
+    Percentage, rounded the way ``sar`` prints it
+    """
+    if not total:
+        return 0.0
+    return round(100.0 * part / total, 2)
+
+
+def _cpu_values(prev, curr):
+    """
+    Computes ``sar -u`` percentages out of two samples of CPU counters
+    (user, nice, sys, idle, iowait, steal, hardirq, softirq, guest,
+    guest_nice)
+        :return: ``Dictionary`` of CPU values, ``None`` for offline CPU
+    """
+    deltas = [max(curr[i] - prev[i], 0) for i in range(len(curr))]
+
+    # user and nice already include guest and guest_nice
+    total = sum(deltas[0:8])
+    if total == 0:
+        return None
+
+    guest = deltas[8] if len(deltas) > 8 else 0
+    guest_nice = deltas[9] if len(deltas) > 9 else 0
+
+    return {
+        'usr': _percent(max(deltas[0] - guest, 0), total),
+        'nice': _percent(max(deltas[1] - guest_nice, 0), total),
+        'sys': _percent(deltas[2] + deltas[6] + deltas[7], total),
+        'iowait': _percent(deltas[4], total),
+        'idle': _percent(deltas[3], total)
+    }
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""
+:mod:`sar.cache` is a module containing on-disk cache for parsed SAR data,
+so the same (unchanged) SAR file doesn't get parsed over and over again.
+
+Entries are keyed on file path, size, modification time and parsed data
+format (:data:`sar.DATA_FORMAT`), so neither a changed file nor data
+parsed into an older layout is ever served from the cache. Parsed data is
+stored with :mod:`marshal`, which is both compact and fastest to load for
+plain dictionaries of strings and numbers.
+"""
+
+import sar
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+import traceback
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+"""Default size limit of the cache directory, in bytes"""
+
+CACHE_SUFFIX = '.sarcache'
+"""Suffix of cache entry files"""
+
+
+class Cache(object):
+    """
+    On-disk cache of parsed SAR data with least-recently-used eviction.
+        :param directory: Directory to keep cache entries in
+        :type directory: str.
+        :param max_size: Size limit for all entries together, in bytes
+        :type max_size: int.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+
+        self.__directory = directory
+        """Directory with cache entries"""
+        self.__max_size = max_size
+        """Size limit of the cache, in bytes"""
+
+    def get(self, filename, kind='parser'):
+        """
+        Fetches parsed data for the file, if file didn't change since
+        it was stored.
+            :param filename: Name of the parsed SAR file
+            :type filename: str.
+            :param kind: What parsed the file (``parser``, ``multiparser``)
+            :type kind: str.
+            :return: Parsed data, ``None`` if not in cache
+        """
+        entry = self.__entry_name(filename, kind)
+
+        if entry is None or not os.access(entry, os.R_OK):
+            return None
+
+        try:
+            with open(entry, 'rb') as entry_file:
+                data = marshal.load(entry_file)
+        except (EnvironmentError, EOFError, ValueError, TypeError):
+            # Broken entry, will get overwritten on next put()
+            return None
+
+        # Hit refreshes entry's place in the LRU order
+        try:
+            os.utime(entry, None)
+        except OSError:
+            pass
+
+        return data
+
+    def put(self, filename, data, kind='parser'):
+        """
+        Stores parsed data for the file, evicting least recently used
+        entries if cache grows over its size limit.
+            :param filename: Name of the parsed SAR file
+            :type filename: str.
+            :param data: Parsed SAR data
+            :type data: dict.
+            :param kind: What parsed the file (``parser``, ``multiparser``)
+            :type kind: str.
+            :return: ``True`` if data was stored
+        """
+        entry = self.__entry_name(filename, kind)
+
+        if entry is None:
+            return False
+
+        try:
+            if not os.path.isdir(self.__directory):
+                os.makedirs(self.__directory)
+
+            # Write to temporary file first, so readers never see
+            # partially written entries
+            fhandle, tempname = tempfile.mkstemp(
+                dir=self.__directory, suffix='.tmp'
+            )
+        except EnvironmentError:
+            traceback.print_exc()
+            return False
+
+        try:
+            with os.fdopen(fhandle, 'wb') as entry_file:
+                marshal.dump(data, entry_file)
+            os.rename(tempname, entry)
+
+        except (EnvironmentError, ValueError):
+            traceback.print_exc()
+            # Don't leave partially written entry behind
+            try:
+                os.unlink(tempname)
+            except OSError:
+                pass
+            return False
+
+        self.__evict()
+        return True
+
+    def clear(self):
+        """
+        Removes all entries from the cache
+        """
+        for entry, entry_stat in self.__entries():
+            try:
+                os.remove(entry)
+            except OSError:
+                pass
+
+    def __entry_name(self, filename, kind):
+        """
+        Builds cache entry file name for the current state of a SAR file
+            :param filename: Name of the parsed SAR file
+            :type filename: str.
+            :param kind: What parsed the file
+            :type kind: str.
+            :return: Path of the cache entry, ``None`` if file is unreadable
+        """
+        try:
+            filestat = os.stat(filename)
+        except OSError:
+            return None
+
+        # marshal format differs between Python versions, so it's a part
+        # of the key as well
+        key = '%s|%s|%d|%r|%d|%d.%d' % (
+            kind, os.path.abspath(filename), filestat.st_size,
+            filestat.st_mtime, sar.DATA_FORMAT,
+            sys.version_info[0], sys.version_info[1]
+        )
+
+        return os.path.join(
+            self.__directory, hashlib.sha1(key).hexdigest() + CACHE_SUFFIX
+        )
+
+    def __entries(self):
+        """
+        Lists cache entries
+            :return: ``List`` of (path, stat) for all entries in the cache
+        """
+        entries = []
+
+        try:
+            names = os.listdir(self.__directory)
+        except OSError:
+            return entries
+
+        for name in names:
+            if name.endswith(CACHE_SUFFIX):
+                entry = os.path.join(self.__directory, name)
+                try:
+                    entries.append((entry, os.stat(entry)))
+                except OSError:
+                    pass
+
+        return entries
+
+    def __evict(self):
+        """
+        Removes least recently used entries until cache fits its limit
+        """
+        entries = self.__entries()
+        total = sum(entry_stat.st_size for entry, entry_stat in entries)
+
+        if total <= self.__max_size:
+            return
+
+        entries.sort(key=lambda item: item[1].st_mtime)
+
+        for entry, entry_stat in entries:
+            if total <= self.__max_size:
+                break
+            try:
+                os.remove(entry)
+                total -= entry_stat.st_size
+            except OSError:
+                pass
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+:mod:`sar.compressed` is a module for reading compressed (rotated) SAR
+files directly, without decompressing them to disk first.
+
+Codec is detected from magic bytes at the start of the file, not from its
+name. Data is decompressed in fixed-size blocks as it's consumed, so the
+whole decompressed file is never held in memory.
+
+.. NOTE::
+   ``xz`` files need :mod:`lzma` (Python 3, or ``backports.lzma``).
+"""
+
+from sar import stream as sarstream
+import bz2
+import gzip
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+BLOCK_SIZE = 256 * 1024
+"""Size of decompressed blocks fed to the chunk splitter, in bytes"""
+
+MAGIC = (
+    ('gzip', '\x1f\x8b'),
+    ('bz2', 'BZh'),
+    ('xz', '\xfd7zXZ\x00'),
+)
+"""Codec names with magic bytes their files start with"""
+
+
+def detect_codec(filename):
+    """
+    Detects compression of a file from its magic bytes
+        :param filename: Name of the file
+        :type filename: str.
+        :return: ``gzip``, ``bz2``, ``xz`` or ``None`` for plain files \
+            (and files which can't be read)
+    """
+    try:
+        with open(filename, 'rb') as sar_file:
+            head = sar_file.read(6)
+    except (IOError, OSError):
+        return None
+
+    for codec, magic in MAGIC:
+        if head.startswith(magic):
+            return codec
+
+    return None
+
+
+def open_file(filename, codec=None):
+    """
+    Opens SAR file for reading, decompressing it on the fly if needed
+        :param filename: Name of the file
+        :type filename: str.
+        :param codec: Compression of the file, detected if ``None``
+        :type codec: str.
+        :return: File-like object with decompressed content
+        :raises IOError: If the codec isn't available
+    """
+    if codec is None:
+        codec = detect_codec(filename)
+
+    if codec == 'gzip':
+        return gzip.GzipFile(filename, 'rb')
+    if codec == 'bz2':
+        return bz2.BZ2File(filename, 'rb')
+    if codec == 'xz':
+        if lzma is None:
+            raise IOError("No lzma module to read xz file %s" % (filename,))
+        return lzma.LZMAFile(filename, 'rb')
+
+    return open(filename, 'rb')
+
+
+def iter_chunks(filename, codec=None, block_size=BLOCK_SIZE):
+    """
+    Splits (decompressed) SAR file into chunks separated by empty lines,
+    reading it block by block (see :func:`sar.stream.iter_chunks`).
+        :param filename: Name of the file
+        :type filename: str.
+        :param codec: Compression of the file, detected if ``None``
+        :type codec: str.
+        :param block_size: Size of decompressed blocks to read
+        :type block_size: int.
+        :return: generator of stripped SAR file chunks
+    """
+    sar_file = open_file(filename, codec)
+
+    try:
+        for chunk in sarstream.iter_chunks(sar_file, block_size):
+            yield chunk
+
+    finally:
+        sar_file.close()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+"""
+:mod:`sar.fleet` is a module for ingesting SAR files of many hosts, laid
+out as ``<root>/<host>/sarXX`` (for example ``/var/log/sa`` directories
+collected from the whole fleet), across a pool of worker processes.
+
+Results are handed out as soon as each file is parsed, and no more than
+a fixed number of parsed files is held at any time. A file which fails
+to parse doesn't abort the batch; its error is recorded instead.
+"""
+
+import sar.parser as sarparse
+import sar.binary as sarbinary
+from collections import namedtuple
+import glob
+import multiprocessing
+import multiprocessing.queues
+import os
+import re
+import sys
+import time
+import traceback
+from StringIO import StringIO
+
+ASCII_FILE_RE = re.compile(r'^sar\d\d(\.(gz|bz2|xz))?$')
+"""Name pattern of SAR ASCII files (``sarDD``, possibly compressed)"""
+
+BINARY_FILE_RE = re.compile(r'^sa\d\d$')
+"""Name pattern of SAR binary data files (``saDD``)"""
+
+DEFAULT_TIMEOUT = 600
+"""Default number of seconds to wait for one file to be parsed"""
+
+POLL_INTERVAL = 0.1
+"""Seconds to wait for the oldest file before checking the others"""
+
+_started = None
+"""Queue workers report (path, time) to as they start parsing a file"""
+
+IngestError = namedtuple('IngestError', ['host', 'path', 'message'])
+"""Error of one file: host, file path and what went wrong"""
+
+
+def _host_of(path):
+    """
+    Host of a SAR file is the name of the directory it's in
+    """
+    return os.path.basename(os.path.dirname(os.path.abspath(path)))
+
+
+def _init_worker(started):
+    """
+    Pool worker initializer
+        :param started: Queue to report files to as their parsing starts
+        :type started: ``multiprocessing.queues.SimpleQueue``
+    """
+    global _started
+    _started = started
+
+
+def _ingest_file(path):
+    """
+    Pool worker: parses single SAR file. Never raises; anything printed
+    by the parser while failing ends up in the error message.
+        :param path: Path of the SAR file
+        :type path: str.
+        :return: ``Tuple`` (host, date, result, ``None``) on success, \\
+            (host, path, ``None``, error message) on failure
+    """
+    if _started is not None:
+        # Written straight to the pipe, so it gets there even if the
+        # worker dies right after
+        _started.put((path, time.time()))
+
+    host = _host_of(path)
+    captured = StringIO()
+    old_stdout, old_stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = captured
+
+    try:
+        try:
+            if BINARY_FILE_RE.match(os.path.basename(path)):
+                parser = sarbinary.BinaryParser(path)
+            else:
+                parser = sarparse.Parser(path)
+
+            result = parser.get_sar_info()
+            if not result:
+                message = captured.getvalue().strip() or 'Parsing failed'
+                return (host, path, None, message)
+
+            return (host, parser.get_filedate(), result, None)
+
+        except Exception:
+            traceback.print_exc()
+            return (host, path, None, captured.getvalue().strip())
+
+    finally:
+        sys.stdout, sys.stderr = old_stdout, old_stderr
+
+
+class Fleet(object):
+    """
+    Parallel ingestion of SAR files of many hosts.
+        :param source: Root directory (searched recursively), glob \\
+            pattern or list of files
+        :type source: str. or list.
+        :param workers: Number of worker processes
+        :type workers: int.
+        :param max_pending: Most files being parsed or waiting to be \\
+            consumed at any time (bounds memory), twice the workers if \\
+            ``None``
+        :type max_pending: int.
+        :param binary: Include binary ``saDD`` files
+        :type binary: bool.
+        :param timeout: Seconds to wait for a file since a worker started \\
+            parsing it (e.g. when the worker died) before it's recorded \\
+            as failed, ``None`` to wait forever; time files spend queued \\
+            doesn't count
+        :type timeout: int.
+    """
+
+    def __init__(self, source, workers=4, max_pending=None, binary=False,
+                 timeout=DEFAULT_TIMEOUT):
+
+        self.__source = source
+        """Directory, glob pattern or list of files to ingest"""
+        self.__workers = max(1, workers)
+        """Number of worker processes"""
+        self.__max_pending = max_pending or (2 * self.__workers)
+        """Most parsed files held at once"""
+        self.__binary = binary
+        """Whether binary saDD files get ingested too"""
+        self.__timeout = timeout
+        """Seconds to wait for a single file, ``None`` for no limit"""
+
+        self.errors = []
+        """List of :data:`IngestError` for files which failed"""
+
+    def files(self):
+        """
+        Lists SAR files to ingest
+            :return: ``List`` of file paths, sorted
+        """
+        source = self.__source
+
+        if isinstance(source, (list, tuple)):
+            return list(source)
+
+        if os.path.isdir(source):
+            found = []
+            for dirpath, dirnames, filenames in os.walk(source):
+                for filename in filenames:
+                    if self.__wanted(filename):
+                        found.append(os.path.join(dirpath, filename))
+            return sorted(found)
+
+        return sorted(path for path in glob.glob(source)
+                      if os.path.isfile(path))
+
+    def ingest(self):
+        """
+        Parses all files, yielding results as files get parsed (not in
+        order). Failed files are recorded in :attr:`errors`.
+            :return: generator of ``Tuple`` (host, date, result)
+        """
+        self.errors = []
+        started = multiprocessing.queues.SimpleQueue()
+        pool = multiprocessing.Pool(self.__workers, _init_worker, (started,))
+        pending = []
+
+        try:
+            for path in self.files():
+                while len(pending) >= self.__max_pending:
+                    outcome = self.__next_outcome(pending, started)
+                    if self.__record(outcome):
+                        yield outcome[:3]
+
+                pending.append([path, None,
+                                pool.apply_async(_ingest_file, (path,))])
+
+            while pending:
+                outcome = self.__next_outcome(pending, started)
+                if self.__record(outcome):
+                    yield outcome[:3]
+
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def __next_outcome(self, pending, started):
+        """
+        Waits for any of the files being parsed to finish. Worker failing
+        (raising, or its result not getting back) and file taking longer
+        than the timeout since a worker started it end up as a failed
+        outcome, so no file is waited for forever.
+            :param pending: ``List`` of [path, time a worker started it \\
+                (``None`` while queued), ``AsyncResult``], oldest first; \\
+                finished file is removed
+            :param started: Queue workers report started files to
+            :type started: ``multiprocessing.queues.SimpleQueue``
+            :return: ``Tuple`` as from :func:`_ingest_file`
+        """
+        while True:
+            while not started.empty():
+                path, start = started.get()
+                for entry in pending:
+                    if entry[0] == path and entry[1] is None:
+                        entry[1] = start
+                        break
+
+            for i in range(len(pending)):
+                path, start, result = pending[i]
+                if result.ready():
+                    del pending[i]
+                    try:
+                        return result.get()
+                    except Exception as exc:
+                        return (_host_of(path), path, None,
+                                'Worker failed: %r' % (exc,))
+
+            if self.__timeout is not None:
+                now = time.time()
+                for i in range(len(pending)):
+                    path, start, result = pending[i]
+                    if start is not None and now - start > self.__timeout:
+                        del pending[i]
+                        return (_host_of(path), path, None,
+                                'No result in %s seconds' % (self.__timeout,))
+
+            pending[0][2].wait(POLL_INTERVAL)
+
+    def __wanted(self, filename):
+        """
+        Decides whether a file in source directory is a SAR file to ingest
+        """
+        if ASCII_FILE_RE.match(filename):
+            return True
+        return bool(self.__binary and BINARY_FILE_RE.match(filename))
+
+    def __record(self, outcome):
+        """
+        Records failed outcome in errors
+            :return: ``True`` if outcome is a success
+        """
+        host, date_or_path, result, message = outcome
+        if message is not None:
+            self.errors.append(IngestError(host, date_or_path, message))
+            return False
+        return True
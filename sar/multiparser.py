@@ -7,37 +7,195 @@ files where multiple files are merged into one huge file.
 .. WARNING::
    Parses SAR ASCII output only, not binary files!
 
-.. WARNING::
-   Parses SAR ASCII files only, **not** ``SAR -A`` output! \
-   (24hr output compared to AM/PM output).
-   Following versions might support ``SAR -A`` parsing.
+.. NOTE::
+   Full ``sar -A`` output is parsed in one pass, into all sections known
+   to ``sar.ALL_PATTERNS``; sections it doesn't know are skipped.
 
 '''
 
 import sar.parser as sarparse
-from sar import PATTERN_MULTISPLIT
+from sar import PATTERN_MULTISPLIT, INSTANCE_SECTIONS
+from sar.table import SarTable, date_to_ordinal, time_to_seconds
+from sar import rollup as sarrollup
+from sar import baseline as sarbaseline
+from sar.stats import ParseStats
+from sar import compressed
+from sar import store as sarstore
+import json
 import mmap
+import multiprocessing
 import os
 import traceback
 from types import StringType
 
 
+def _parse_chunk(chunk, cpus=None, sections=None, fields=None, stats=None,
+                 timestamps='time'):
+    '''
+    Parses one day (one whole SAR file) out of the combo file
+        :param chunk: Content of a single SAR file from the combo, as \
+            ``str`` or a view of the mapped combo file (it's not copied)
+        :param cpus: CPU ids to keep from ``CPU`` section, all if ``None``
+        :param sections: Names of sections to parse, all if ``None``
+        :param fields: Section name => names of fields to decode
+        :param stats: Collects stage timings and counters, if given
+        :type stats: :class:`sar.stats.ParseStats`
+        :param timestamps: ``time`` or ``epoch`` row keys
+        :type timestamps: str.
+        :return: ``Dictionary``-style SAR data, as from \
+            :class:`sar.parser.Parser`
+    '''
+    parser = sarparse.Parser(cpus=cpus, stats=stats)
+    return parser._parse_file(parser._read_parts(chunk), sections, fields,
+                              timestamps)
+
+
+def _parse_range(job):
+    '''
+    Pool worker: maps the combo file and parses one day out of it, so that
+    only the byte range (not the day's content) is sent to the worker.
+        :param job: ``Tuple`` of (filename, start, end, cpus, sections, \
+            fields, with_stats, timestamps) of the day chunk
+        :type job: tuple.
+        :return: ``Tuple`` of (date, ``Dictionary``-style SAR data, \
+            stats as plain data or ``None``)
+    '''
+    (filename, start, end, cpus, sections, fields, with_stats,
+     timestamps) = job
+
+    # Hooks can't be sent to other processes; plain stats are sent back
+    # and merged by the parent
+    stats = None
+    if (with_stats):
+        stats = ParseStats()
+
+    fhandle = os.open(filename, os.O_RDONLY)
+    try:
+        sarmap = mmap.mmap(fhandle, length=0, prot=mmap.PROT_READ)
+        try:
+            if (not end):
+                end = sarmap.size()
+            eolpos = sarmap.find('\n', start, end)
+            partdate = _get_part_date(
+                sarmap[start:(eolpos if eolpos > -1 else end)]
+            )
+
+            # Day is parsed straight from the mapping, which has to stay
+            # open until then
+            info = _parse_chunk(
+                buffer(sarmap, start, end - start), cpus, sections, fields,
+                stats, timestamps
+            )
+        finally:
+            sarmap.close()
+    finally:
+        os.close(fhandle)
+
+    return (partdate, info,
+            stats.as_dict() if stats is not None else None)
+
+
+def _get_part_date(part=''):
+    '''
+    Retrieves date of the combo part from the file
+        :param part: Part of the combo file (parsed out whole SAR file
+            from the combo
+        :type part: str.
+        :return: string containing date in ISO format (YYY-MM-DD)
+    '''
+    if (type(part) is not StringType):
+        # We can cope with strings only
+        return False
+
+    firstline = part.split("\n")[0]
+
+    info = firstline.split()
+    datevalue = ''
+
+    try:
+        datevalue = info[3]
+
+    except IndexError:
+        datevalue = False
+
+    except:
+        traceback.print_exc()
+        datevalue = False
+
+    return(datevalue)
+
+
 class Multiparser(object):
     '''
     Multifile parser for SAR files. Derives from SAR Parser class
         :param filename: Name of the SAR output file, with combined data
         :type filename: str.
+        :param workers: Number of processes to parse days with, days are \
+            parsed one after another in this process if 1
+        :type workers: int.
+        :param index: Keep day offsets in a sidecar index file, so an \
+            unchanged file is not rescanned. ``True`` stores it next to \
+            the SAR file (``<filename>.idx``), a string names the index file
+        :type index: bool. or str.
+        :param cache: Cache to keep parsed data in, between runs
+        :type cache: :class:`sar.cache.Cache`
+        :param cpus: CPU ids to keep from ``CPU`` section, as collection \
+            (e.g. ``['all']``) or predicate taking CPU id string; \
+            predicates can't be used with more workers
+        :param stats: Collects stage timings and counters of parsing; \
+            with more workers, hooks see worker counters only once their \
+            day is parsed
+        :type stats: :class:`sar.stats.ParseStats`
+
+    Combo file can be compressed with ``gzip``, ``bz2`` or ``xz``; it's
+    then read as a stream, one day at a time, in this process only and
+    without the sidecar index.
     '''
 
-    def __init__(self, combo_filename=''):
+    def __init__(self, combo_filename='', workers=1, index=False, cache=None,
+                 cpus=None, stats=None):
 
         self.__sarinfos = {}
         '''Dictionary for multiple dictionaries from
            :class:`com.nimium.sys.util.sar.parser.Parser`'''
         self.__splitpointers = []
         '''List of pointers inside combo file where each file starts'''
+        self.__splitdates = []
+        '''List of dates of the files starting at each split pointer'''
+        self.__range_indexes = {}
+        '''Date => time range index of that day'''
         self.__filename = combo_filename
         '''SAR output filename to be parsed'''
+        self.__workers = workers
+        '''Number of worker processes for parsing days'''
+        self.__index_filename = None
+        '''Sidecar file holding day offsets, ``None`` if not used'''
+        if (index is True and combo_filename):
+            self.__index_filename = ('%s.idx' % (combo_filename,))
+        elif (index):
+            self.__index_filename = index
+
+        self.__cache = cache
+        '''On-disk cache of parsed data, ``None`` if not used'''
+        self.__cache_kind = sarparse._cache_kind('multiparser', cpus)
+        '''Kind of cache entries, ``None`` if data can't be cached'''
+        self.__cpus = cpus
+        '''CPU ids to keep from ``CPU`` section, all if ``None``'''
+        self.__stats = stats
+        '''Stage timings and counters, ``None`` if not collected'''
+
+        self.__codec = None
+        '''Compression of the combo file, ``''`` if plain'''
+        if (combo_filename):
+            self.__codec = compressed.detect_codec(combo_filename) or ''
+
+        self.__store = None
+        '''Store file data was loaded from, kept open while in use'''
+
+        self.__fhandle = None
+        '''Descriptor of the open combo file'''
+        self.__sarmap = None
+        '''Read-only mapping of the combo file, kept for object lifetime'''
 
         return None
 
@@ -47,163 +205,766 @@ class Multiparser(object):
             :return: ``True`` if loading and parsing of file went fine, \
             ``False`` if it failed (at any point)
         '''
-        daychunks = self.__split_file()
+        # Combo file may have changed since it was split
+        self.__invalidate()
 
-        if (daychunks):
+        use_cache = (self.__cache is not None and self.__filename and
+                     self.__cache_kind is not None)
 
-            maxcount = len(self.__splitpointers)
-            for i in range(maxcount):
-                start = self.__splitpointers[i]
-                end = None
-                if (i < (maxcount - 1)):
-                    end = self.__splitpointers[i + 1]
+        if (use_cache):
+            cached = self.__cache.get(self.__filename, self.__cache_kind)
+            if (self.__stats is not None):
+                self.__stats.count('cache_hits' if cached else 'cache_misses')
+            if (cached):
+                self.__sarinfos = cached
+                return(True)
 
-                chunk = self.__get_chunk(start, end)
+        sarinfos = self.__parse_days()
 
-                parser = sarparse.Parser()
-                cpu_usage, mem_usage, swp_usage, io_usage = \
-                    parser._parse_file(parser._split_file(chunk))
+        if (sarinfos is False):
+            return(False)
 
-                self.__sarinfos[self.__get_part_date(chunk)] = {
-                    "cpu": cpu_usage,
-                    "mem": mem_usage,
-                    "swap": swp_usage,
-                    "io": io_usage
-                }
-                del(cpu_usage)
-                del(mem_usage)
-                del(swp_usage)
-                del(io_usage)
-                del(parser)
+        self.__sarinfos = sarinfos
 
-            return(True)
+        if (use_cache):
+            self.__cache.put(
+                self.__filename, self.__sarinfos, self.__cache_kind
+            )
 
-    def get_sar_info(self):
+        return(True)
+
+    def get_sar_info(self, format='dict', sections=None, fields=None,
+                     timestamps='time'):
         '''
         Returns parsed sar info
+            :param format: ``dict`` for ``Dictionary``-style data, \
+                ``columnar`` for date => section name => \
+                :class:`sar.table.SarTable` columns
+            :type format: str.
+            :param sections: Names of sections to return, all if ``None``; \
+                if file isn't loaded yet, other sections are not parsed
+            :type sections: list.
+            :param fields: Section name => names of fields to return \
+                (e.g. ``{'MEM': ['memused']}``)
+            :type fields: dict.
+            :param timestamps: ``epoch`` to get days merged into one \
+                ``Dictionary``-style SAR data (section => epoch seconds \
+                => row, see :meth:`sar.parser.Parser.get_sar_info`), \
+                parsed on every call
+            :type timestamps: str.
             :return: ``Dictionary``-style list of SAR data
         '''
-        return self.__sarinfos
+        if (timestamps == 'epoch'):
+            sarinfos = self.__parse_days(sections, fields, timestamps)
+            if (sarinfos is False):
+                return False
+
+            # Epoch keys don't clash between days, so days just merge
+            merged = {}
+            for partdate in sorted(sarinfos):
+                for section, rows in sarinfos[partdate].items():
+                    sectionrows = merged.setdefault(section, {})
+                    for full_time, row in rows.items():
+                        if (section in INSTANCE_SECTIONS and
+                                full_time in sectionrows):
+                            sectionrows[full_time].update(row)
+                        else:
+                            sectionrows[full_time] = row
+            return merged
+
+        if (not self.__sarinfos and self.__cache is not None):
+            # With cache configured, loading is cheap enough to do lazily
+            self.load_file()
+
+        sarinfos = self.__sarinfos
+
+        if (sections is not None or fields):
+            if (sarinfos):
+                sarinfos = dict(
+                    (partdate, sarparse._project(info, sections, fields))
+                    for partdate, info in sarinfos.items()
+                )
+            else:
+                sarinfos = self.__parse_days(sections, fields)
+                if (sarinfos is False):
+                    return False
 
-    def __get_chunk(self, start=0, end=None):
+        if (format == 'columnar'):
+            return dict(
+                (partdate, dict(
+                    (section, SarTable.from_dict(section, info[section]))
+                    for section in info
+                ))
+                for partdate, info in sarinfos.items()
+            )
+
+        return sarinfos
+
+    def __parse_days(self, sections=None, fields=None, timestamps='time'):
         '''
-        Gets chunk from the sar combo file, from start to end
-            :param start: where to start a pulled chunk
-            :type start: int.
-            :param end: where to end a pulled chunk
-            :type end: int.
-            :return: str.
+        Parses all days of the combo file, in a pool of workers if
+        configured so
+            :param sections: Names of sections to parse, all if ``None``
+            :type sections: list.
+            :param fields: Section name => names of fields to decode
+            :type fields: dict.
+            :param timestamps: ``time`` or ``epoch`` row keys
+            :type timestamps: str.
+            :return: ``Dictionary`` of date => ``Dictionary``-style SAR \
+                data, ``False`` on failure
         '''
-        piece = False
+        stats = self.__stats
 
-        if (self.__filename and os.access(self.__filename, os.R_OK)):
+        if (self.__codec):
+            return self.__parse_stream(sections, fields, timestamps)
 
-            fhandle = None
+        if (stats is not None):
+            stats.start('split_days')
+        split = self.__split_file()
+        if (stats is not None):
+            stats.stop('split_days')
 
+        if (not split):
+            return False
+
+        if (stats is not None):
+            stats.start('parse_days')
+
+        sarinfos = {}
+        ranges = []
+        maxcount = len(self.__splitpointers)
+        for i in range(maxcount):
+            start = self.__splitpointers[i]
+            end = None
+            if (i < (maxcount - 1)):
+                end = self.__splitpointers[i + 1]
+            ranges.append((start, end))
+
+        if (self.__workers > 1 and maxcount > 1):
+            pool = multiprocessing.Pool(min(self.__workers, maxcount))
             try:
-                fhandle = os.open(self.__filename, os.O_RDONLY)
-            except OSError:
-                print(("Couldn't open file %s" % (self.__filename)))
-                fhandle = None
-
-            if (fhandle):
-
-                try:
-                    sarmap = mmap.mmap(fhandle, length=0, prot=mmap.PROT_READ)
-                except (TypeError, IndexError):
-                    os.close(fhandle)
-                    traceback.print_exc()
-                    #sys.exit(-1)
+                # Pool.map() keeps the order of the days in the file
+                results = pool.map(_parse_range, [
+                    (self.__filename, start, end, self.__cpus, sections,
+                     fields, stats is not None, timestamps)
+                    for start, end in ranges
+                ])
+            finally:
+                pool.close()
+                pool.join()
+
+            for partdate, info, daystats in results:
+                sarinfos[partdate] = info
+                if (daystats is not None):
+                    stats.merge(daystats)
+            del(results)
+
+        else:
+            for i in range(maxcount):
+                start, end = ranges[i]
+                chunk = self.__get_chunk(start, end)
+                sarinfos[self.__splitdates[i]] = _parse_chunk(
+                    chunk, self.__cpus, sections, fields, stats,
+                    timestamps
+                )
+                del(chunk)
+
+        if (stats is not None):
+            stats.stop('parse_days')
+
+        return sarinfos
+
+    def __parse_stream(self, sections=None, fields=None, timestamps='time'):
+        '''
+        Parses all days of the compressed combo file, as they get
+        decompressed
+            :param sections: Names of sections to parse, all if ``None``
+            :type sections: list.
+            :param fields: Section name => names of fields to decode
+            :type fields: dict.
+            :param timestamps: ``time`` or ``epoch`` row keys
+            :type timestamps: str.
+            :return: ``Dictionary`` of date => ``Dictionary``-style SAR \
+                data, ``False`` on failure
+        '''
+        stats = self.__stats
+
+        if (stats is not None):
+            stats.start('parse_days')
+
+        sarinfos = {}
+        for partdate, chunk in self.__iter_days():
+            sarinfos[partdate] = _parse_chunk(
+                chunk, self.__cpus, sections, fields, stats, timestamps
+            )
+
+        if (stats is not None):
+            stats.stop('parse_days')
+
+        if (not sarinfos):
+            return False
+
+        return sarinfos
+
+    def __iter_days(self):
+        '''
+        Decompresses the combo file line by line, holding only the day
+        being read in memory
+            :return: generator of (date, content of that day's SAR file)
+        '''
+        if (not (self.__filename and os.access(self.__filename, os.R_OK))):
+            return
+
+        try:
+            sar_file = compressed.open_file(self.__filename, self.__codec)
+        except (IOError, OSError):
+            print(("Couldn't open file %s" % (self.__filename)))
+            return
+
+        try:
+            lines = None
+            for line in sar_file:
+                sfpos = line.find(PATTERN_MULTISPLIT)
+                if (sfpos > -1):
+                    if (lines):
+                        chunk = ''.join(lines)
+                        yield (_get_part_date(chunk), chunk)
+                    lines = [line[sfpos:]]
+                elif (lines is not None):
+                    lines.append(line)
+
+            if (lines):
+                chunk = ''.join(lines)
+                yield (_get_part_date(chunk), chunk)
+
+        finally:
+            sar_file.close()
+
+    def save(self, path):
+        '''
+        Saves parsed sar info of all days into a compact binary store
+        file (see :mod:`sar.store`), parsing the file first if needed
+            :param path: Name of the store file
+            :type path: str.
+            :return: ``True`` if the store was written
+        '''
+        if (not self.__sarinfos and not self.load_file()):
+            return False
+
+        return sarstore.write(path, self.__sarinfos)
+
+    def load(self, path):
+        '''
+        Loads sar info of all days from a store file written by
+        :meth:`save` instead of parsing. Only the header is read here,
+        sections of a day are read when they are first accessed.
+            :param path: Name of the store file
+            :type path: str.
+            :return: ``True`` if loading went fine, ``False`` if it failed
+        '''
+        try:
+            store = sarstore.SarStore(path)
+        except (EnvironmentError, ValueError):
+            traceback.print_exc()
+            return(False)
+
+        if (self.__store is not None):
+            self.__store.close()
+        self.__store = store
+
+        self.__sarinfos = dict(
+            (str(partdate), store.sar_info(partdate))
+            for partdate in store.dates()
+        )
+
+        return(True)
+
+    def rollup(self, window='5min', aggs=('min', 'max', 'mean', 'p95')):
+        '''
+        Rolls parsed sar info of all days up into time windows, windows
+        spanning across midnight included
+            :param window: Window size (seconds, or ``5min``, ``1h``, ...)
+            :param aggs: Aggregates to compute per window
+            :type aggs: tuple.
+            :return: Date => rolled up ``Dictionary``-style SAR data \
+                (see :mod:`sar.rollup`), ``False`` if file couldn't be \
+                loaded
+        '''
+        if (not self.__sarinfos and not self.load_file()):
+            return(False)
+
+        return sarrollup.rollup_days(self.__sarinfos, window, aggs)
+
+    def iter_days(self, sections=None, fields=None, prefetch=False,
+                  timestamps='time'):
+        '''
+        Parses the combo file one day at a time, in file order. Parsed
+        days are not kept, so memory use stays at about one day (two with
+        prefetch) however many days the file holds.
+            :param sections: Names of sections to parse, all if ``None``
+            :type sections: list.
+            :param fields: Section name => names of fields to decode
+            :type fields: dict.
+            :param prefetch: Parse next day in a worker process while the \
+                current one is being consumed
+            :type prefetch: bool.
+            :param timestamps: ``time`` or ``epoch`` row keys
+            :type timestamps: str.
+            :return: generator of (date, ``Dictionary``-style SAR data)
+        '''
+        stats = self.__stats
+
+        if (self.__codec):
+            days = self.__iter_days()
+        else:
+            if (not self.__splitpointers and not self.__split_file()):
+                return
+            maxcount = len(self.__splitpointers)
+            days = (
+                (self.__splitdates[i], (
+                    self.__splitpointers[i],
+                    self.__splitpointers[i + 1] if i < (maxcount - 1)
+                    else None
+                ))
+                for i in range(maxcount)
+            )
+
+        if (not prefetch):
+            for partdate, chunk in days:
+                if (not self.__codec):
+                    chunk = self.__get_chunk(*chunk)
+                info = _parse_chunk(
+                    chunk, self.__cpus, sections, fields, stats, timestamps
+                )
+                del(chunk)
+                yield (partdate, info)
+                del(info)
+            return
+
+        pool = multiprocessing.Pool(1)
+        try:
+            pending = None
+
+            for partdate, chunk in days:
+                if (self.__codec):
+                    # Stream can't be reopened at an offset, so the day's
+                    # content itself is sent
+                    result = pool.apply_async(_parse_chunk, (
+                        chunk, self.__cpus, sections, fields, None,
+                        timestamps
+                    ))
+                else:
+                    start, end = chunk
+                    result = pool.apply_async(_parse_range, ((
+                        self.__filename, start, end, self.__cpus, sections,
+                        fields, stats is not None, timestamps
+                    ),))
+                del(chunk)
+
+                if (pending is not None):
+                    yield self.__collect(*pending)
+                pending = (partdate, result)
+
+            if (pending is not None):
+                yield self.__collect(*pending)
+
+        finally:
+            # Consumer might stop early, with a day still being parsed
+            pool.terminate()
+            pool.join()
+
+    def __collect(self, partdate, result):
+        '''
+        Waits for a day prefetched by :meth:`iter_days`
+            :return: ``Tuple`` of (date, ``Dictionary``-style SAR data)
+        '''
+        info = result.get()
+
+        if (not self.__codec):
+            partdate, info, daystats = info
+            if (daystats is not None):
+                self.__stats.merge(daystats)
+
+        return (partdate, info)
+
+    def baseline(self, window_days=28, slot='5min', sections=None,
+                 fields=None, prefetch=False):
+        '''
+        Builds per-time-of-day baseline of the last days in the combo
+        file, parsing it one day at a time (see :meth:`iter_days`)
+            :param window_days: Number of days in the baseline window
+            :type window_days: int.
+            :param slot: Size of time-of-day slots (seconds, or ``5min``, \
+                ``1h``, ...)
+            :param sections: Names of sections to parse, all if ``None``
+            :type sections: list.
+            :param fields: Section name => names of fields to decode
+            :type fields: dict.
+            :param prefetch: Parse next day in a worker process
+            :type prefetch: bool.
+            :return: :class:`sar.baseline.Baseline`, which can be updated \
+                with more days later
+        '''
+        baseline = sarbaseline.Baseline(window_days, slot, sections, fields)
+        baseline.update(self.iter_days(sections, fields, prefetch))
+        return baseline
+
+    def get_day(self, day):
+        '''
+        Parses single day out of the combo file, without parsing (or,
+        with the sidecar index, even reading) the rest of it
+            :param day: Date of the day in ISO format (YYYY-MM-DD)
+            :type day: str.
+            :return: ``Dictionary``-style SAR data for the day, ``False`` \
+                if day is not in the file
+        '''
+        if (self.__codec):
+            for partdate, chunk in self.__iter_days():
+                if (partdate == day):
+                    self.__sarinfos[day] = _parse_chunk(
+                        chunk, self.__cpus, stats=self.__stats
+                    )
+                    return self.__sarinfos[day]
+            return False
+
+        if (not self.__splitpointers and not self.__split_file()):
+            return False
+
+        try:
+            i = self.__splitdates.index(day)
+        except ValueError:
+            return False
+
+        end = None
+        if (i < (len(self.__splitpointers) - 1)):
+            end = self.__splitpointers[i + 1]
+
+        chunk = self.__get_chunk(self.__splitpointers[i], end)
+        if (chunk is False):
+            return False
+
+        self.__sarinfos[day] = _parse_chunk(
+            chunk, self.__cpus, stats=self.__stats
+        )
+        return self.__sarinfos[day]
+
+    def get_range(self, start, end, sections=None):
+        '''
+        Parses only data between two points in time, possibly spanning
+        more days. Only days within the range are touched, and within
+        them only lines of the range are parsed (see
+        :meth:`sar.parser.Parser.get_range`).
+            :param start: Start of the range, ``YYYY-MM-DD HH:MM:SS``, \
+                inclusive
+            :type start: str.
+            :param end: End of the range, ``YYYY-MM-DD HH:MM:SS``, inclusive
+            :type end: str.
+            :param sections: Names of sections to return, all if ``None``
+            :type sections: list.
+            :return: ``Dictionary`` of date => ``Dictionary``-style SAR \
+                data within the range, ``False`` on failure
+        '''
+        start_day, start_time = start.split()
+        end_day, end_time = end.split()
+
+        # Days are compared as ordinals, dates in the file may be in
+        # US locale format (MM/DD/YYYY)
+        first = date_to_ordinal(start_day)
+        last = date_to_ordinal(end_day)
+        if (first is None or last is None):
+            print(("Couldn't parse dates of range %s - %s" % (start, end)))
+            return False
+
+        if (self.__codec):
+            return self.__filter_range(first, start_time, last, end_time,
+                                       sections)
+
+        if (not self.__splitpointers and not self.__split_file()):
+            return False
+
+        output = {}
+        new_indexes = False
+        maxcount = len(self.__splitpointers)
+
+        for i in range(maxcount):
+            partdate = self.__splitdates[i]
+            day = date_to_ordinal(partdate)
+            if (day is None or day < first or day > last):
+                continue
+
+            parser = sarparse.Parser(self.__filename, cpus=self.__cpus)
+
+            index = self.__range_indexes.get(partdate)
+            if (index is None):
+                end_offset = None
+                if (i < (maxcount - 1)):
+                    end_offset = self.__splitpointers[i + 1]
+                index = parser._build_range_index(
+                    self.__splitpointers[i], end_offset
+                )
+                if (index is False):
                     return False
+                self.__range_indexes[partdate] = index
+                new_indexes = True
+
+            info = parser._query_range(
+                index,
+                start_time if day == first else 0,
+                end_time if day == last else 86399,
+                sections
+            )
+            if (info):
+                output[partdate] = info
+
+        if (new_indexes):
+            self.__save_index()
+
+        return output
+
+    def __filter_range(self, first, start_time, last, end_time,
+                       sections=None):
+        '''
+        Parses days of the compressed combo file within the range and
+        keeps only rows of the range
+            :param first: Ordinal of the first day of the range
+            :type first: int.
+            :param last: Ordinal of the last day of the range
+            :type last: int.
+            :return: ``Dictionary`` of date => ``Dictionary``-style SAR \
+                data within the range
+        '''
+        output = {}
+
+        for partdate, chunk in self.__iter_days():
+            day = date_to_ordinal(partdate)
+            if (day is None or day < first or day > last):
+                continue
 
-                if (not end):
-                    end = sarmap.size()
+            low = sarparse._to_seconds(start_time if day == first else 0)
+            high = sarparse._to_seconds(end_time if day == last else 86399)
 
-                try:
-                    sarmap.seek(start)
-                    piece = sarmap.read(end - start)
-                except:
-                    traceback.print_exc()
+            info = {}
+            for section, rows in _parse_chunk(
+                    chunk, self.__cpus, sections).items():
+                rows = dict(
+                    (full_time, row) for full_time, row in rows.items()
+                    if low <= time_to_seconds(full_time) <= high
+                )
+                if (rows):
+                    info[section] = rows
 
-            os.close(fhandle)
+            if (info):
+                output[partdate] = info
+
+        return output
+
+    def close(self):
+        '''
+        Releases mapping and descriptor of the combo file (and of the
+        store file data was loaded from)
+        '''
+        if (self.__store is not None):
+            self.__store.close()
+            self.__store = None
+
+        if (self.__sarmap is not None):
+            self.__sarmap.close()
+            self.__sarmap = None
+
+        if (self.__fhandle is not None):
+            os.close(self.__fhandle)
+            self.__fhandle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+        return False
+
+    def __get_map(self):
+        '''
+        Maps the combo file on first use and keeps it mapped until
+        :meth:`close`
+            :return: ``mmap`` of the combo file or ``None`` on failure
+        '''
+        if (self.__sarmap is not None):
+            return self.__sarmap
+
+        if (not (self.__filename and os.access(self.__filename, os.R_OK))):
+            return None
+
+        try:
+            self.__fhandle = os.open(self.__filename, os.O_RDONLY)
+        except OSError:
+            print(("Couldn't open file %s" % (self.__filename)))
+            self.__fhandle = None
+            return None
+
+        try:
+            self.__sarmap = mmap.mmap(
+                self.__fhandle, length=0, prot=mmap.PROT_READ
+            )
+        except (TypeError, IndexError, ValueError, EnvironmentError):
+            os.close(self.__fhandle)
+            self.__fhandle = None
+            traceback.print_exc()
+            return None
+
+        return self.__sarmap
+
+    def __invalidate(self):
+        '''
+        Forgets day offsets, time range indexes and mapping of the combo
+        file; they are rebuilt (or reloaded from the sidecar index, if it
+        matches the file) on next use
+        '''
+        self.__splitpointers = []
+        self.__splitdates = []
+        self.__range_indexes = {}
 
-        return(piece)
+        if (self.__sarmap is not None):
+            self.__sarmap.close()
+            self.__sarmap = None
+
+        if (self.__fhandle is not None):
+            os.close(self.__fhandle)
+            self.__fhandle = None
+
+    def __get_chunk(self, start=0, end=None):
+        '''
+        Gets chunk from the sar combo file, from start to end, as a view
+        of the mapped file (no data is copied)
+            :param start: where to start a pulled chunk
+            :type start: int.
+            :param end: where to end a pulled chunk
+            :type end: int.
+            :return: ``buffer`` over the chunk, ``False`` on failure
+        '''
+        sarmap = self.__get_map()
+
+        if (sarmap is None):
+            return False
+
+        if (not end):
+            end = sarmap.size()
+
+        # mmap has no new-style buffer interface in Python 2, so
+        # memoryview() can't be used on it; buffer() is the zero-copy view
+        return buffer(sarmap, start, end - start)
 
     def __split_file(self):
         '''
         Splits combined SAR output file (in ASCII format) in order to
         extract info we need for it, in the format we want.
-            :return: ``List``-style of SAR file sections separated by
-                the type of info they contain (SAR file sections) without
-                parsing what is exactly what at this point
+            :return: ``True`` if day split pointers (and their dates) were \
+                found, either in the sidecar index or by scanning the file
         '''
-        # Filename passed checks through __init__
-        if (self.__filename and os.access(self.__filename, os.R_OK)):
+        if (self.__load_index()):
+            return True
 
-            fhandle = None
+        sarmap = self.__get_map()
 
-            try:
-                fhandle = os.open(self.__filename, os.O_RDONLY)
-            except OSError:
-                print(("Couldn't open file %s" % (self.__filename)))
-                fhandle = None
-
-            if (fhandle):
-
-                try:
-                    sarmap = mmap.mmap(fhandle, length=0, prot=mmap.PROT_READ)
-                except (TypeError, IndexError):
-                    os.close(fhandle)
-                    traceback.print_exc()
-                    #sys.exit(-1)
-                    return False
+        if (sarmap is None):
+            return False
+
+        self.__splitpointers = []
+        self.__splitdates = []
+        self.__range_indexes = {}
 
-            sfpos = sarmap.find(PATTERN_MULTISPLIT, 0)
+        sfpos = sarmap.find(PATTERN_MULTISPLIT, 0)
 
-            while (sfpos > -1):
+        while (sfpos > -1):
 
-                '''Split by day found'''
-                self.__splitpointers.append(sfpos)
+            '''Split by day found'''
+            self.__splitpointers.append(sfpos)
 
-                # Iterate for new position
-                try:
-                    sfpos = sarmap.find(PATTERN_MULTISPLIT, (sfpos + 1))
-                except ValueError:
-                    print("ValueError on mmap.find()")
-                    return True
+            eolpos = sarmap.find('\n', sfpos)
+            if (eolpos < 0):
+                eolpos = sarmap.size()
+            self.__splitdates.append(
+                self.__get_part_date(sarmap[sfpos:eolpos])
+            )
 
-            if (self.__splitpointers):
-                # Not sure if this will work - if empty set
-                # goes back as True here
-                return True
+            # Iterate for new position
+            sfpos = sarmap.find(PATTERN_MULTISPLIT, (sfpos + 1))
+
+        if (self.__splitpointers):
+            self.__save_index()
+            return True
 
         return False
 
-    def __get_part_date(self, part=''):
+    def __file_stamp(self):
         '''
-        Retrieves date of the combo part from the file
-            :param part: Part of the combo file (parsed out whole SAR file
-                from the combo
-            :type part: str.
-            :return: string containing date in ISO format (YYY-MM-DD)
+        Identifies current state of the combo file
+            :return: ``List`` of [size, mtime] of the combo file
+        '''
+        filestat = os.stat(self.__filename)
+        return [filestat.st_size, filestat.st_mtime]
+
+    def __load_index(self):
+        '''
+        Loads day offsets from the sidecar index, if it was written for
+        the combo file as it is now (same size and mtime)
+            :return: ``True`` if offsets were loaded from the index
         '''
-        if (type(part) is not StringType):
-            # We can cope with strings only
+        if (not self.__index_filename or
+                not os.access(self.__index_filename, os.R_OK)):
             return False
 
-        firstline = part.split("\n")[0]
+        try:
+            with open(self.__index_filename, 'r') as idxfile:
+                index = json.load(idxfile)
+
+            if (index['stamp'] != self.__file_stamp()):
+                return False
+
+            self.__splitpointers = [day[0] for day in index['days']]
+            self.__splitdates = [str(day[1]) for day in index['days']]
+            self.__range_indexes = dict(
+                (str(partdate), dict(
+                    (str(section), parts) for section, parts in
+                    index.get('ranges', {})[partdate].items()
+                ))
+                for partdate in index.get('ranges', {})
+            )
+
+        except (EnvironmentError, ValueError, KeyError, IndexError):
+            # Broken index is just rebuilt
+            return False
 
-        info = firstline.split()
-        datevalue = ''
+        return (len(self.__splitpointers) > 0)
 
-        try:
-            datevalue = info[3]
+    def __save_index(self):
+        '''
+        Writes day offsets to the sidecar index
+            :return: ``True`` if the index was written
+        '''
+        if (not self.__index_filename):
+            return False
 
-        except KeyError:
-            datevalue = False
+        try:
+            index = {
+                'stamp': self.__file_stamp(),
+                'days': list(zip(self.__splitpointers, self.__splitdates)),
+                'ranges': self.__range_indexes
+            }
+            with open(self.__index_filename, 'w') as idxfile:
+                json.dump(index, idxfile)
+
+        except EnvironmentError:
+            print(("Couldn't write index file %s" % (self.__index_filename)))
+            return False
 
-        except:
-            traceback.print_exc()
-            datevalue = False
+        return True
 
-        return(datevalue)
+    def __get_part_date(self, part=''):
+        '''
+        Retrieves date of the combo part from the file
+            :param part: Part of the combo file (parsed out whole SAR file
+                from the combo
+            :type part: str.
+            :return: string containing date in ISO format (YYY-MM-DD)
+        '''
+        return _get_part_date(part)
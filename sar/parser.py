@@ -3,29 +3,447 @@
 :mod:`sar.parser` is a module containing class for parsing SAR output files.
 
 .. WARNING::
-   Parses SAR ASCII output only, not binary files!
+   Parses SAR ASCII output only, not binary files! For binary files
+   (``saDD``) see :mod:`sar.binary`.
 """
 
-from sar import PATTERN_RESTART, ALL_PATTERNS
+from sar import PATTERN_RESTART, PATTERN_MULTISPLIT, ALL_PATTERNS, \
+    INT_FIELDS, INSTANCE_SECTIONS
+from sar.table import SarTable, date_to_ordinal, time_to_seconds
+from sar import rollup as sarrollup
+from sar import compressed
+from sar import stream as sarstream
+from sar import store as sarstore
+import types
+import bisect
+import datetime
+import itertools
+import json
+from collections import Mapping
 import mmap
+import operator
 import os
 import re
+import time
 import traceback
 import platform
 
+SECTION_RE = re.compile('|'.join(
+    '(?P<%s>%s)' % (name, ALL_PATTERNS[name]['PATTERN'])
+    for name in ALL_PATTERNS
+))
+"""Single alternation of all section header patterns, named by section"""
+
+RESTART_RE = re.compile(PATTERN_RESTART)
+"""Compiled restart notice pattern"""
+
+
+def _classify_header(first_line):
+    """
+    Finds which SAR section a part belongs to, judging by its header line.
+        :param first_line: First line of the SAR part
+        :type first_line: str.
+        :return: Section name from ``ALL_PATTERNS``, or ``None`` if part \
+            is not a known section
+    """
+    match = SECTION_RE.match(first_line)
+    if match:
+        return match.lastgroup
+    return None
+
+
+COLUMN_RES = dict(
+    (colname, re.compile(colname))
+    for name in ALL_PATTERNS for colname in ALL_PATTERNS[name]['FIELDS']
+)
+"""Compiled column name patterns of all sections"""
+
+_DECODERS = {}
+"""Cache of compiled row decoders, by section and header layout"""
+
+
+def _find_column(column_names, part_first_line):
+    """
+    Finds the column for the column_name in sar type definition,
+    and returns its index.
+        :param column_names: Names of the column we look for (regex) put in
+            the list
+        :param part_first_line: First line of the SAR part
+        :return: ``Dictionary`` of names => position, None for not present
+    """
+    part_parts = part_first_line.split()
+
+    return_dict = dict.fromkeys(column_names)
+
+    counter = 0
+    for piece in part_parts:
+        for colname in column_names:
+            if COLUMN_RES[colname].search(piece):
+                return_dict[colname] = counter
+                break
+        counter += 1
+
+    return return_dict
+
+
+def _item_getter(indexes):
+    """
+    Builds function picking given indexes out of a list, always as tuple
+        :param indexes: List of indexes to pick
+        :type indexes: list.
+        :return: function
+    """
+    if len(indexes) == 1:
+        index = indexes[0]
+        return lambda elems: (elems[index],)
+    return operator.itemgetter(*indexes)
+
+
+class _RowDecoder(object):
+    """
+    Row decoder for one header layout of a SAR section: column positions
+    and value types are resolved once, when header is first seen, so
+    data lines only get split and converted.
+        :param patternsname: Name of the section
+        :type patternsname: str.
+        :param header_line: Header line of the SAR part
+        :type header_line: str.
+        :param wanted: Names of fields to decode, all if ``None``
+        :type wanted: frozenset.
+    """
+
+    __slots__ = ('float_names', 'float_getter', 'int_names', 'int_getter')
+
+    def __init__(self, patternsname, header_line, wanted=None):
+
+        patterns = ALL_PATTERNS[patternsname]
+        fields = _find_column(patterns['FIELDS'], header_line)
+        pairs = patterns['PAIRS']
+
+        float_pairs = []
+        int_pairs = []
+        for sectionname in sorted(pairs):
+            if wanted is not None and sectionname not in wanted:
+                continue
+            index = fields[pairs[sectionname]]
+            if index is None:
+                # Column is not in this sysstat version's output
+                continue
+            if sectionname in INT_FIELDS:
+                int_pairs.append((sectionname, index))
+            else:
+                float_pairs.append((sectionname, index))
+
+        self.float_names = tuple(name for name, index in float_pairs)
+        self.float_getter = _item_getter(
+            [index for name, index in float_pairs]) if float_pairs else None
+        self.int_names = tuple(name for name, index in int_pairs)
+        self.int_getter = _item_getter(
+            [index for name, index in int_pairs]) if int_pairs else None
+
+    def decode(self, elems):
+        """
+        Decodes split data line into field values
+            :param elems: Data line split into columns
+            :type elems: list.
+            :return: ``Dictionary`` of field name => value
+        """
+        if self.float_getter:
+            values = dict(zip(
+                self.float_names, map(float, self.float_getter(elems))
+            ))
+        else:
+            values = {}
+        if self.int_getter:
+            values.update(zip(
+                self.int_names, map(int, self.int_getter(elems))
+            ))
+        return values
+
+
+def _compile_decoder(patternsname, header_line, fields=None):
+    """
+    Gets row decoder for a section header, compiling it on first use.
+    Headers with the same layout share one decoder across files.
+        :param patternsname: Name of the section
+        :type patternsname: str.
+        :param header_line: Header line of the SAR part
+        :type header_line: str.
+        :param fields: Section name => names of fields to decode; \
+            sections not in it (or ``None``) get all fields decoded
+        :type fields: dict.
+        :return: :class:`_RowDecoder`
+    """
+    wanted = None
+    if fields and fields.get(patternsname) is not None:
+        wanted = frozenset(fields[patternsname])
+
+    tokens = header_line.split()
+    # Leading timestamp differs between files, layout doesn't
+    key = (patternsname, header_line[9:11] in ('AM', 'PM'), tuple(tokens[1:]),
+           wanted)
+
+    try:
+        return _DECODERS[key]
+    except KeyError:
+        decoder = _DECODERS[key] = _RowDecoder(
+            patternsname, header_line, wanted
+        )
+        return decoder
+
+
+def _project(sarinfo, sections=None, fields=None):
+    """
+    Picks sections and fields out of already parsed SAR data
+        :param sarinfo: ``Dictionary``-style SAR data
+        :type sarinfo: dict.
+        :param sections: Names of sections to keep, all if ``None``
+        :type sections: list.
+        :param fields: Section name => names of fields to keep; sections \
+            not in it (or ``None``) keep all fields
+        :type fields: dict.
+        :return: ``Dictionary``-style SAR data
+    """
+    output = {}
+
+    for section in sarinfo:
+        if sections is not None and section not in sections:
+            continue
+
+        if not fields or fields.get(section) is None:
+            output[section] = sarinfo[section]
+            continue
+
+        wanted = frozenset(fields[section])
+        section_info = sarinfo[section]
+
+        if section in INSTANCE_SECTIONS:
+            output[section] = dict(
+                (full_time, dict(
+                    (cpuid, dict(
+                        (field, value) for field, value in values.items()
+                        if field in wanted
+                    ))
+                    for cpuid, values in row.items()
+                ))
+                for full_time, row in section_info.items()
+            )
+        else:
+            output[section] = dict(
+                (full_time, dict(
+                    (field, value) for field, value in row.items()
+                    if field in wanted
+                ))
+                for full_time, row in section_info.items()
+            )
+
+    return output
+
+
+INDEX_SAMPLE_LINES = 64
+"""Every how many data lines a time => offset sample goes into range index"""
+
+
+def _merge_record(sarinfo, record):
+    """
+    Merges single record into ``Dictionary``-style SAR data
+        :param sarinfo: SAR data to merge into, updated in place
+        :type sarinfo: dict.
+        :param record: ``Tuple``-style record (section, time, cpuid or \
+            ``None``, values)
+        :type record: tuple.
+    """
+    section, full_time, cpuid, values = record
+    row = sarinfo.setdefault(section, {}).setdefault(full_time, {})
+    if cpuid is not None:
+        row = row.setdefault(cpuid, {})
+    row.update(values)
+
+
+def _line_seconds(part_line):
+    """
+    Reads time of a data line, as seconds since midnight
+        :param part_line: Data line of SAR output
+        :type part_line: str.
+        :return: int. or ``None`` if line has no time (``Average:``)
+    """
+    try:
+        hours = int(part_line[0:2])
+        seconds = int(part_line[3:5]) * 60 + int(part_line[6:8])
+    except ValueError:
+        return None
+
+    ampm = part_line[9:11]
+    if ampm == 'AM':
+        hours = hours % 12
+    elif ampm == 'PM':
+        hours = hours % 12 + 12
+
+    return hours * 3600 + seconds
+
+
+def _to_seconds(value):
+    """
+    Converts ``HH:MM:SS`` time (or seconds) into seconds since midnight
+    """
+    if isinstance(value, str):
+        return time_to_seconds(value)
+    return int(value)
+
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+"""Ordinal of the first day of Unix epoch"""
+
+
+def _day_epoch(date):
+    """
+    Converts date of a SAR file into epoch seconds of its midnight. Times
+    in SAR files are wall-clock times of the host, so they are counted as
+    UTC: a day always has 86400 seconds and timestamps stay stable
+    whatever timezone they're read in.
+        :param date: Date as in SAR file header (``YYYY-MM-DD``, \
+            ``MM/DD/YY`` or ``MM/DD/YYYY``)
+        :type date: str.
+        :return: int. or ``None`` if date can't be parsed
+    """
+    ordinal = date_to_ordinal(date)
+    if ordinal is None:
+        return None
+    return (ordinal - _EPOCH_ORDINAL) * 86400
+
+
+def _cpu_filter(cpus):
+    """
+    Builds CPU id filter for ``CPU`` section rows
+        :param cpus: ``None`` for all CPUs, collection of CPU ids \
+            (e.g. ``['all']``, ``set([0, 1])``) or predicate taking \
+            CPU id string
+        :return: function taking CPU id string, ``None`` for all CPUs
+    """
+    if cpus is None:
+        return None
+    if callable(cpus):
+        return cpus
+    wanted = frozenset(str(cpuid) for cpuid in cpus)
+    return wanted.__contains__
+
+
+def _cache_kind(base, cpus):
+    """
+    Cache entry kind for parsed data of a file, taking CPU filter into
+    account, so filtered data never gets served as complete or vice versa
+        :param base: Kind of parser (``parser``, ``multiparser``)
+        :type base: str.
+        :param cpus: CPU filter, as given to the parser
+        :return: str. or ``None`` if data can't be cached (predicate filter)
+    """
+    if cpus is None:
+        return base
+    if callable(cpus):
+        return None
+    return '%s:cpus=%s' % (base, ','.join(sorted(str(c) for c in cpus)))
+
+
+class LazySarInfo(Mapping):
+    """
+    Read-only mapping of section name => ``Dictionary``-style section
+    data, which decodes a section only when it's first looked up. Parts
+    of the file are sorted into sections up front, so iterating over it
+    (or ``in`` checks) doesn't decode anything.
+        :param parser: Parser the parts come from
+        :type parser: :class:`Parser`
+        :param parts: Section name => list of its parts
+        :type parts: dict.
+        :param timestamps: ``time`` or ``epoch`` row keys, see \
+            :meth:`Parser.get_sar_info`
+        :type timestamps: str.
+    """
+
+    def __init__(self, parser, parts, timestamps='time'):
+
+        self.__parser = parser
+        """Parser which decodes the sections"""
+        self.__parts = parts
+        """Section name => parts not decoded yet"""
+        self.__sections = sorted(parts)
+        """Names of all sections present"""
+        self.__decoded = {}
+        """Section name => decoded section data"""
+        self.__timestamps = timestamps
+        """Kind of row keys of decoded sections"""
+
+    def __getitem__(self, section):
+        try:
+            return self.__decoded[section]
+        except KeyError:
+            parts = self.__parts.pop(section)
+            decoded = self.__decoded[section] = \
+                self.__parser._decode_section(
+                    section, parts, self.__timestamps
+                )
+            return decoded
+
+    def __contains__(self, section):
+        return section in self.__decoded or section in self.__parts
+
+    def __iter__(self):
+        return iter(self.__sections)
+
+    def __len__(self):
+        return len(self.__sections)
+
+    def __repr__(self):
+        return 'LazySarInfo(%r, decoded=%r)' % (
+            self.__sections, sorted(self.__decoded)
+        )
+
+    def decoded(self):
+        """
+        Lists sections which got decoded so far
+            :return: ``List`` of section names
+        """
+        return sorted(self.__decoded)
+
 
 class Parser(object):
     """
-    Parser for sar outputs. Uses SAR interpreter binary and parses out \
-    its output
+    Parser for sar outputs. Parses SAR output file, or output of SAR
+    interpreter binary (or any other stream) as it's read.
         :param filename: Name of the SAR output file
         :type filename: str.
+        :param cache: Cache to keep parsed data in, between runs
+        :type cache: :class:`sar.cache.Cache`
+        :param index: Keep time range index in a sidecar file, so it's \
+            not rebuilt for an unchanged file. ``True`` stores it next to \
+            the SAR file (``<filename>.ridx``), a string names the file
+        :type index: bool. or str.
+        :param cpus: CPU ids to keep from ``CPU`` section, as collection \
+            (e.g. ``['all']``) or predicate taking CPU id string; rows of \
+            other CPUs are skipped before their values get decoded
+
+    File can be compressed with ``gzip``, ``bz2`` or ``xz`` (see
+    :mod:`sar.compressed`); it's then decompressed block by block while
+    being parsed. Incremental :meth:`refresh` needs an uncompressed file.
+
+        :param stats: Collects stage timings and counters of parsing
+        :type stats: :class:`sar.stats.ParseStats`
+        :param stream: Readable pipe or file object with SAR output to \
+            parse instead of a file; it's read once, in fixed-size blocks, \
+            and left open
+        :param command: Command printing SAR output to parse instead of \
+            a file (e.g. ``['sar', '-A', '-f', '/var/log/sa/sa20']``, \
+            ``True`` for :data:`sar.stream.SAR_COMMAND`); it's run every \
+            time data is read
+        :type command: list.
     """
 
-    def __init__(self, filename=''):
+    def __init__(self, filename='', cache=None, index=False, cpus=None,
+                 stats=None, stream=None, command=None):
 
         self._sarinfo = {}
         """Hash with SAR info"""
+        self._sartables = {}
+        """Section name => :class:`sar.table.SarTable` with SAR info"""
         self.__file_date = ''
         """String which contains date of SAR file"""
         self.__restart_times = []
@@ -34,7 +452,43 @@ class Parser(object):
         """SAR output filename to be parsed"""
 
         self.__fields = {}
-        """Map of maps for fields values"""
+        """Map of section name => row decoder for its header"""
+
+        self.__cache = cache
+        """On-disk cache of parsed data, ``None`` if not used"""
+        self.__cache_kind = _cache_kind('parser', cpus)
+        """Kind of cache entries, ``None`` if data can't be cached"""
+
+        self.__cpu_filter = _cpu_filter(cpus)
+        """Function deciding which CPU ids to keep, ``None`` for all"""
+
+        self.__stats = stats
+        """Stage timings and counters, ``None`` if not collected"""
+
+        self.__codec = None
+        """Compression of the file, ``''`` if plain, ``None`` if unknown"""
+
+        self.__store = None
+        """Store file data was loaded from, kept open while in use"""
+
+        self.__stream = stream
+        """Stream with SAR output, ``None`` if not used"""
+        if command is True:
+            command = sarstream.SAR_COMMAND
+        self.__command = command
+        """Command printing SAR output, ``None`` if not used"""
+
+        self.__tail = None
+        """Where :meth:`refresh` stopped reading (offset, file, scan state)"""
+
+        self.__range_index = None
+        """Section start offsets and sampled time offsets of the file"""
+        self.__index_filename = None
+        """Sidecar file holding range index, ``None`` if not used"""
+        if index is True and filename:
+            self.__index_filename = '%s.ridx' % (filename,)
+        elif index:
+            self.__index_filename = index
 
     def load_file(self):
         """
@@ -43,19 +497,36 @@ class Parser(object):
             ``False`` if it failed (at any point)
         """
 
+        use_cache = self.__cache is not None and self.__filename and \
+            self.__cache_kind is not None
+
+        if use_cache:
+            cached = self.__cache.get(self.__filename, self.__cache_kind)
+            if self.__stats is not None:
+                self.__stats.count('cache_hits' if cached else 'cache_misses')
+            if cached:
+                self._sarinfo = cached
+                return True
+
         # We first split file into pieces
-        searchunks = self._split_file()
+        searchunks = self._read_parts()
 
         if searchunks:
 
             # And then we parse pieces into meaningful data
             usage = self._parse_file(searchunks)
 
-            if 'CPU' in usage:
+            if 'CPU' not in usage:
                 return False
 
             self._sarinfo = usage
             del usage
+
+            if use_cache:
+                self.__cache.put(
+                    self.__filename, self._sarinfo, self.__cache_kind
+                )
+
             return True
 
         else:
@@ -72,91 +543,320 @@ class Parser(object):
 
         return self.__file_date
 
-    def get_sar_info(self):
+    def get_sar_info(self, format='dict', sections=None, fields=None,
+                     lazy=False, timestamps='time'):
         """
         Returns parsed sar info
+            :param format: ``dict`` for ``Dictionary``-style data, \
+                ``columnar`` for section name => \
+                :class:`sar.table.SarTable` columns
+            :type format: str.
+            :param sections: Names of sections to return, all if ``None``; \
+                other sections are not parsed at all
+            :type sections: list.
+            :param fields: Section name => names of fields to return \
+                (e.g. ``{'MEM': ['memused']}``); other columns are never \
+                converted. Sections not in it get all fields.
+            :type fields: dict.
+            :param lazy: Return :class:`LazySarInfo`, which decodes each \
+                section only when it's first accessed
+            :type lazy: bool.
+            :param timestamps: ``time`` for ``HH:MM:SS`` row keys, \
+                ``epoch`` for integer epoch seconds with file date applied \
+                (rows after midnight fall into the next day). Epoch data \
+                is parsed on every call, not kept.
+            :type timestamps: str.
             :return: ``Dictionary``-style list of SAR data
         """
 
-        try:
-            test = self._sarinfo["CPU"]
-            del test
+        if format == 'columnar':
+            if (sections is not None or fields) and not self._sartables:
+                return self.__build_tables(sections, fields)
+            tables = self.get_sar_tables()
+            if tables and sections is not None:
+                tables = dict(
+                    (section, tables[section]) for section in tables
+                    if section in sections
+                )
+            return tables
+
+        if timestamps == 'epoch':
+            searchunks = self._read_parts()
+            if not searchunks:
+                return False
+            if lazy:
+                return LazySarInfo(
+                    self, self._classify_parts(searchunks, sections, fields),
+                    timestamps
+                )
+            return self._parse_file(searchunks, sections, fields, timestamps)
+
+        if lazy and not self._sarinfo:
+            searchunks = self._read_parts()
+            if not searchunks:
+                return False
+            return LazySarInfo(
+                self, self._classify_parts(searchunks, sections, fields)
+            )
 
-        except KeyError:
+        if sections is not None or fields:
+            if self._sarinfo:
+                # Everything is parsed already
+                return _project(self._sarinfo, sections, fields)
+
+            searchunks = self._read_parts()
+            if not searchunks:
+                return False
+            return self._parse_file(searchunks, sections, fields)
+
+        # Membership test, so sections loaded from a store aren't read
+        if 'CPU' not in self._sarinfo:
             file_parsed = self.load_file()
             if file_parsed:
                 return self._sarinfo
             else:
                 return False
 
-        except:
-            ### DEBUG
+        return self._sarinfo
+
+    def get_sar_tables(self):
+        """
+        Returns parsed sar info in columnar form. Rows are streamed from
+        the file straight into the columns, without building
+        ``Dictionary``-style data first.
+            :return: ``Dictionary`` of section name => \
+                :class:`sar.table.SarTable`, ``False`` on failure
+        """
+        if not self._sartables:
+            tables = self.__build_tables()
+
+            if not tables or 'CPU' not in tables:
+                return False
+
+            self._sartables = tables
+
+        return self._sartables
+
+    def __build_tables(self, sections=None, fields=None):
+        """
+        Streams records from the file into columnar tables
+            :param sections: Names of sections to read, all if ``None``
+            :type sections: list.
+            :param fields: Section name => names of fields to decode
+            :type fields: dict.
+            :return: ``Dictionary`` of section name => \
+                :class:`sar.table.SarTable`
+        """
+        tables = {}
+
+        for section, full_time, cpuid, values in \
+                self.iter_records(sections, fields):
+            try:
+                table = tables[section]
+            except KeyError:
+                table = tables[section] = SarTable(section)
+            table.append(time_to_seconds(full_time), cpuid, values)
+
+        return tables
+
+    def save(self, path):
+        """
+        Saves parsed sar info into a compact binary store file (see
+        :mod:`sar.store`), parsing the file first if needed
+            :param path: Name of the store file
+            :type path: str.
+            :return: ``True`` if the store was written
+        """
+        if self._sartables:
+            info = self._sartables
+        else:
+            info = self.get_sar_info()
+            if not info:
+                return False
+
+        date = self.__file_date
+        if not date and self.__filename:
+            date = self.get_filedate() or ''
+
+        return sarstore.write(path, {date: info})
+
+    def load(self, path, date=None):
+        """
+        Loads sar info from a store file written by :meth:`save` instead
+        of parsing. Only the header is read here, sections are read from
+        the mapped store file when they are first accessed.
+            :param path: Name of the store file
+            :type path: str.
+            :param date: Day to load, for stores with more days (written \
+                by :meth:`sar.multiparser.Multiparser.save`); first day \
+                if ``None``
+            :type date: str.
+            :return: ``True`` if loading went fine, ``False`` if it failed
+        """
+        try:
+            store = sarstore.SarStore(path)
+        except (EnvironmentError, ValueError):
             traceback.print_exc()
             return False
 
-        return self._sarinfo
+        dates = store.dates()
+        if date is None and dates:
+            date = dates[0]
+        if date not in dates:
+            store.close()
+            return False
+
+        if self.__store is not None:
+            self.__store.close()
+        self.__store = store
+
+        self._sarinfo = store.sar_info(date)
+        self._sartables = store.tables(date)
+        self.__file_date = date
+
+        return True
+
+    def rollup(self, window='5min', aggs=('min', 'max', 'mean', 'p95')):
+        """
+        Rolls parsed sar info up into time windows
+            :param window: Window size (seconds, or ``5min``, ``1h``, ...)
+            :param aggs: Aggregates to compute per window: ``min``, \
+                ``max``, ``mean``, ``sum``, ``count`` and percentiles \
+                (``p95``)
+            :type aggs: tuple.
+            :return: ``Dictionary``-style SAR data keyed by window start, \
+                with aggregates instead of values (see :mod:`sar.rollup`)
+        """
+        if self._sartables:
+            info = self._sartables
+        elif 'CPU' in self._sarinfo:
+            # Already parsed, cheaper to convert than to read file again
+            info = self._sarinfo
+        else:
+            info = self.get_sar_tables()
+            if not info:
+                return False
+
+        return sarrollup.rollup(info, window, aggs)
+
+    def _read_parts(self, data=''):
+        """
+        Splits SAR output or SAR output file with :meth:`_split_file`,
+        recording the stage if stats are collected
+            :param data: Input data instead of file
+            :type data: str.
+            :return: ``List``-style of SAR file sections, ``False`` on \
+                failure
+        """
+        if data == '' and (self.__stream is not None or
+                           self.__command is not None):
+            source = self.__open_source()
+            if source is None:
+                return False
+            return self.__source_parts(source)
+
+        if data == '' and self.__get_codec():
+            # Compressed file is split while being decompressed, which
+            # happens as its parts get consumed
+            if not os.access(self.__filename, os.R_OK):
+                return False
+            if self.__stats is not None:
+                self.__stats.count(
+                    'bytes_read', os.path.getsize(self.__filename)
+                )
+            return compressed.iter_chunks(self.__filename, self.__codec)
+
+        stats = self.__stats
+        if stats is None:
+            return self._split_file(data)
+
+        stats.start('split')
+        searchunks = self._split_file(data)
+        stats.stop('split')
+
+        if searchunks:
+            if data != '':
+                stats.count('bytes_read', len(data))
+            else:
+                stats.count('bytes_read', os.path.getsize(self.__filename))
+            stats.count('chunks', len(searchunks))
+
+        return searchunks
+
+    def __open_source(self):
+        """
+        Opens stream or starts command given instead of a file
+            :return: File-like object with SAR output, ``None`` on failure
+        """
+        if self.__command is None:
+            return self.__stream
+
+        try:
+            return sarstream.CommandStream(self.__command)
+        except OSError:
+            print(("Couldn't run %s" % ' '.join(self.__command)))
+            return None
+
+    def __close_source(self, source):
+        """
+        Finishes command started by :meth:`__open_source`; given stream
+        is left open for its owner
+        """
+        if source is not self.__stream:
+            source.close()
+
+    def __source_parts(self, source):
+        """
+        Splits output read from stream or command into parts as it comes
+            :param source: File-like object from :meth:`__open_source`
+            :return: generator of SAR output parts
+        """
+        try:
+            for chunk in sarstream.iter_chunks(source):
+                yield chunk
+        finally:
+            self.__close_source(source)
 
     def _split_file(self, data=''):
         """
         Splits SAR output or SAR output file (in ASCII format) in order to
         extract info we need for it, in the format we want.
-            :param data: Input data instead of file
-            :type data: str.
+            :param data: Input data instead of file: ``str``, \
+                ``bytearray``, ``buffer``, ``mmap``, ``memoryview`` or any \
+                object with buffer interface. It's split in place, into \
+                :class:`sar.stream.BufferPart` views of it.
             :return: ``List``-style of SAR file sections separated by
                 the type of info they contain (SAR file sections) without
                 parsing what is exactly what at this point
         """
 
-        # Filename passed checks through __init__
-        if ((self.__filename and os.access(self.__filename, os.R_OK))
-                or data != ''):
+        if data is not None and len(data):
+            return sarstream.split_buffer(data) or False
 
-            fhandle = None
+        # Filename passed checks through __init__
+        if self.__filename and os.access(self.__filename, os.R_OK):
 
-            if data == '':
-                try:
-                    fhandle = os.open(self.__filename, os.O_RDONLY)
-                except OSError:
-                    print(("Couldn't open file %s" % self.__filename))
-                    fhandle = None
+            try:
+                fhandle = os.open(self.__filename, os.O_RDONLY)
+            except OSError:
+                print(("Couldn't open file %s" % self.__filename))
+                fhandle = None
 
-            if fhandle or data != '':
+            if fhandle:
 
-                datalength = 0
-                
                 # Dealing with mmap difference on Windows and Linux
-                if platform.system() == 'Windows':
-                    dataprot = mmap.ACCESS_READ
-                else:
-                    dataprot = mmap.PROT_READ
-
-                if data != '':
-                    fhandle = -1
-                    datalength = len(data)
-                    
-                    if platform.system() == 'Windows':    
-                        dataprot = mmap.ACCESS_READ | mmap.ACCESS_WRITE
-                    else:
-                        dataprot = mmap.PROT_READ | mmap.PROT_WRITE                    
-
                 try:
                     if platform.system() == 'Windows':
                         sarmap = mmap.mmap(
-                            fhandle, length=datalength, access=dataprot
+                            fhandle, length=0, access=mmap.ACCESS_READ
                         )
                     else:
                         sarmap = mmap.mmap(
-                            fhandle, length=datalength, prot=dataprot
+                            fhandle, length=0, prot=mmap.PROT_READ
                         )
-                    if data != '':
-
-                        sarmap.write(data)
-                        sarmap.flush()
-                        sarmap.seek(0, os.SEEK_SET)
 
                 except (TypeError, IndexError):
-                    if data == '':
-                        os.close(fhandle)
+                    os.close(fhandle)
                     traceback.print_exc()
                     # sys.exit(-1)
                     return False
@@ -165,17 +865,7 @@ class Parser(object):
                 searchunks = []
                 oldchunkpos = 0
                 dlpos = sarmap.find('\n\n', 0)
-                size = 0
-
-                if data == '':
-                    # We can do mmap.size() only on read-only mmaps
-                    size = sarmap.size()
-                else:
-                    # Otherwise, if data was passed to us,
-                    # we measure its length
-                    len(data)
-
-                # oldchunkpos = dlpos
+                size = sarmap.size()
 
                 while dlpos > -1:  # mmap.find() returns -1 on failure.
 
@@ -202,117 +892,199 @@ class Parser(object):
                     searchunks.append(tempchunk.strip())
 
                 sarmap.close()
-
-            if fhandle != -1:
                 os.close(fhandle)
 
-            if searchunks:
-                return searchunks
-            else:
-                return False
+                if searchunks:
+                    return searchunks
 
         return False
 
-    def _parse_file(self, sar_parts):
+    def _parse_file(self, sar_parts, sections=None, fields=None,
+                    timestamps='time'):
         """
         Parses splitted file to get proper information from split parts.
-            :param sar_parts: Array of SAR file parts
+            :param sar_parts: Array of SAR file parts, or generator of \
+                them (e.g. from a compressed file), whose parts are \
+                decoded as they come
+            :param sections: Names of sections to parse, all if ``None``; \
+                parts of other sections are dropped right after \
+                classification
+            :type sections: list.
+            :param fields: Section name => names of fields to decode
+            :type fields: dict.
+            :param timestamps: ``time`` or ``epoch`` row keys
+            :type timestamps: str.
             :return: ``Dictionary``-style info (but still non-parsed) \
                 from SAR file, split into sections we want to check
         """
-        usage = {}
         output = {}
 
         # If sar_parts is a list
         if type(sar_parts) is list:
-            restart_pattern = re.compile(PATTERN_RESTART)
-
-            """ !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! """
-            """              ********** ATTENTION *******            """
-            """ THERE CAN BE MORE THAN ONE SAME SECTION IN ONE FILE  """
-            """ IF SYSTEM WAS REBOOTED DURING THE DAY                """
-            """ !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! """
 
-            for PATTERNSNAME in ALL_PATTERNS:
-                patterns = ALL_PATTERNS[PATTERNSNAME]
-                rgxpattern = re.compile(patterns['PATTERN'])
-
-                for part in sar_parts:
+            usage = self._classify_parts(sar_parts, sections, fields)
+            del sar_parts
 
-                    if rgxpattern.search(part):
+            # Now we have parts pulled out, do further processing.
+            for PATTERNSNAME in usage:
+                output[PATTERNSNAME] = self._decode_section(
+                    PATTERNSNAME, usage[PATTERNSNAME], timestamps
+                )
+            del usage
 
-                        if PATTERNSNAME in usage:
-                            usage[PATTERNSNAME] += '\n' + part
-                        else:
-                            usage[PATTERNSNAME] = part
-                            try:
-                                first_line = part.split('\n')[0]
-                            except IndexError:
-                                first_line = part
+        elif type(sar_parts) is types.GeneratorType:
+            output = self.__parse_stream(
+                sar_parts, sections, fields, timestamps
+            )
 
-                            self.__fields[PATTERNSNAME] = self.__find_column(patterns['FIELDS'], first_line)
+        return output
 
-                    # Try to match restart time
-                    if restart_pattern.search(part):
-                        pieces = part.split()
-                        self.__restart_times.append(pieces[0])
-                        del pieces
+    def __parse_stream(self, sar_parts, sections=None, fields=None,
+                       timestamps='time'):
+        """
+        Parses SAR file parts one by one as they are produced, so no more
+        than one part is held in memory at a time
+            :param sar_parts: Generator of SAR file parts
+            :param sections: Names of sections to parse, all if ``None``
+            :type sections: list.
+            :param fields: Section name => names of fields to decode
+            :type fields: dict.
+            :param timestamps: ``time`` or ``epoch`` row keys
+            :type timestamps: str.
+            :return: ``Dictionary``-style info from SAR file
+        """
+        output = {}
 
-            del sar_parts
+        for part in sar_parts:
+            usage = self._classify_parts([part], sections, fields)
 
-            # Now we have parts pulled out and combined, do further
-            # processing.
-            for PATTERNSNAME in ALL_PATTERNS:
-                patterns = ALL_PATTERNS[PATTERNSNAME]
-                output[PATTERNSNAME] = self.__split_info(usage[PATTERNSNAME], PATTERNSNAME, patterns)
-            del usage
+            for PATTERNSNAME in usage:
+                decoded = self._decode_section(
+                    PATTERNSNAME, usage[PATTERNSNAME], timestamps
+                )
+                section = output.setdefault(PATTERNSNAME, {})
 
-            return output
+                for full_time, row in decoded.items():
+                    if PATTERNSNAME in INSTANCE_SECTIONS:
+                        timerow = section.setdefault(full_time, {})
+                        for cpuid, values in row.items():
+                            timerow.setdefault(cpuid, {}).update(values)
+                    else:
+                        section.setdefault(full_time, {}).update(row)
 
         return output
 
-    def __find_column(self, column_names, part_first_line):
+    def _classify_parts(self, sar_parts, sections=None, fields=None):
         """
-        Finds the column for the column_name in sar type definition,
-        and returns its index.
-            :param column_names: Names of the column we look for (regex) put in
-                the list
-            :param part_first_line: First line of the SAR part
-            :return: ``Dictionary`` of names => position, None for not present
+        Sorts split file parts by the section they belong to, without
+        decoding them yet.
+            :param sar_parts: Array of SAR file parts
+            :param sections: Names of sections to keep, all if ``None``
+            :type sections: list.
+            :param fields: Section name => names of fields to decode
+            :type fields: dict.
+            :return: ``Dictionary`` of section name => list of its parts
         """
-        part_parts = part_first_line.split()
+        usage = {}
 
-        ### DEBUG
-        # print("Parts: %s" % (part_parts))
+        stats = self.__stats
+        if stats is not None:
+            stats.start('classify')
 
-        return_dict = {}
+        """ !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! """
+        """              ********** ATTENTION *******            """
+        """ THERE CAN BE MORE THAN ONE SAME SECTION IN ONE FILE  """
+        """ IF SYSTEM WAS REBOOTED DURING THE DAY                """
+        """ !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! """
 
-        counter = 0
-        for piece in part_parts:
-            for colname in column_names:
-                pattern_re = re.compile(colname)
-                if pattern_re.search(piece):
-                    return_dict[colname] = counter
-                    break
-            counter += 1
+        # Every part is read once and dispatched by its header line
+        for part in sar_parts:
 
-        # Verify the content of the return dictionary, fill the blanks
-        # with -1s :-)
-        for colver in column_names:
-            try:
-                tempval = return_dict[colver]
-                del tempval
-            except KeyError:
-                return_dict[colver] = None
+            if type(part) is str:
+                first_line = part.split('\n', 1)[0]
+            else:
+                first_line = part.first_line()
+            PATTERNSNAME = _classify_header(first_line)
 
-        return return_dict
+            if PATTERNSNAME:
+
+                if sections is not None and PATTERNSNAME not in sections:
+                    continue
+
+                if PATTERNSNAME in usage:
+                    usage[PATTERNSNAME].append(part)
+                else:
+                    usage[PATTERNSNAME] = [part]
+                    if stats is not None:
+                        stats.start('compile')
+                    self.__fields[PATTERNSNAME] = _compile_decoder(
+                        PATTERNSNAME, first_line, fields
+                    )
+                    if stats is not None:
+                        stats.stop('compile')
+
+            # Try to match restart time
+            elif RESTART_RE.search(first_line):
+                pieces = first_line.split()
+                self.__restart_times.append(pieces[0])
+                del pieces
+
+            # File header, with date of the data (parsed data has no file)
+            elif not self.__file_date and \
+                    first_line.startswith(PATTERN_MULTISPLIT):
+                pieces = first_line.split()
+                if len(pieces) > 3:
+                    self.__file_date = pieces[3]
+                del pieces
+
+        if stats is not None:
+            stats.stop('classify')
+
+        return usage
+
+    def _decode_section(self, patternsname, parts, timestamps='time'):
+        """
+        Decodes all parts of one section
+            :param patternsname: Name of the section
+            :type patternsname: str.
+            :param parts: Parts of the section, from :meth:`_classify_parts`
+            :type parts: list.
+            :param timestamps: ``time`` or ``epoch`` row keys
+            :type timestamps: str.
+            :return: ``Dictionary``-style data of the section
+        """
+        stats = self.__stats
+        if stats is not None:
+            stats.start('decode')
+
+        if parts and type(parts[0]) is not str:
+            # Views of a buffer: lines get copied out one by one
+            info_part = itertools.chain.from_iterable(
+                part.lines() for part in parts
+            )
+        else:
+            info_part = '\n'.join(parts)
+
+        decoded = self.__split_info(
+            info_part, patternsname, ALL_PATTERNS[patternsname], timestamps
+        )
 
-    def __split_info(self, info_part, patternsname, patterns):
+        if stats is not None:
+            stats.stop('decode')
+
+        return decoded
+
+    def __split_info(self, info_part, patternsname, patterns,
+                     timestamps='time'):
         """
         Splits info from SAR parts into logical stuff :-)
-        :param info_part: Part of SAR output we want to split into usable data
+        :param info_part: Part of SAR output we want to split into usable \
+            data, or iterable of its lines
         :param patternsname: ???
         :param patterns: ???
+        :param timestamps: ``time`` for ``HH:MM:SS`` keys, ``epoch`` for \
+            epoch seconds of the file date (``False`` is returned if the \
+            date is unknown)
         :return: ``List``-style info from SAR files, now finally \
             completely parsed into meaningful data for further processing
         """
@@ -325,45 +1097,39 @@ class Parser(object):
 
         pattern_re = re.compile(pattern)
 
-        for part_line in info_part.split('\n'):
-
-            if part_line.strip() != '' and not pattern_re.search(part_line):
-
-                # Take care of AM/PM timestamps in SAR file
-                is_24hr = True
-                is_AM = False
-
-                if part_line[9:11] == 'AM':
-                    is_24hr = False
-                    is_AM = True
-                elif part_line[9:11] == 'PM':
-                    is_24hr = False
-                    is_AM = False
+        day_start = None
+        if timestamps == 'epoch':
+            day_start = _day_epoch(self.get_filedate())
+            if day_start is None:
+                print(("Unknown date of SAR data: %r" % (self.__file_date,)))
+                return False
+            # Rows are in time order; going back in time means midnight
+            previous = -1
 
-                if is_24hr is False:
-                    part_line =  ('%s_%s XX %s' % (part_line[:8], part_line[9:11], part_line[12:]))
+        if type(info_part) is str:
+            info_part = info_part.split('\n')
+        nlines = 0
+        datalines = 0
+        rows = 0
 
-                # Line is not empty, nor it's header.
-                # let's hit the road Jack!
-                elems = part_line.split()
-                full_time = elems[0].strip()
+        for nlines, part_line in enumerate(info_part, 1):
 
-                if full_time != "Average:":
+            if part_line.strip() != '' and not pattern_re.search(part_line):
 
-                    # Convert time to 24hr format if needed
-                    if is_24hr is False:
-                        full_time = full_time[:-3]
+                datalines += 1
+                record = self.__decode_line(
+                    part_line, patternsname, patterns, day_start is not None
+                )
 
-                        # 12 is a bitch in AM/PM notation
-                        if full_time[:2] == '12':
-                            if is_AM is True:
-                                full_time = ('%s:%s' % ('00', full_time[3:]))
-                            is_AM = not is_AM
+                if record:
+                    rows += 1
+                    full_time, cpuid, values = record
 
-                        if is_AM is False and full_time[0:2] != '00':
-                            hours = int(full_time[:2]) + 12
-                            hours = ('%02d' % (hours,))
-                            full_time = ('%s:%s' % (hours, full_time[3:]))
+                    if day_start is not None:
+                        if full_time + 43200 < previous:
+                            day_start += 86400
+                        previous = full_time
+                        full_time += day_start
 
                     try:
                         blah = return_dict[full_time]
@@ -371,37 +1137,566 @@ class Parser(object):
                     except KeyError:
                         return_dict[full_time] = {}
 
-                    fields = self.__fields[patternsname]
-                    pairs = patterns["PAIRS"]
-
-                    for sectionname in pairs.iterkeys():
-
-                        value = elems[fields[pairs[sectionname]]]
-
-                        if sectionname == 'membuffer' or \
-                                sectionname == 'memcache' or \
-                                sectionname == 'memfree' or \
-                                sectionname == 'memused' or \
-                                sectionname == 'swapfree' or \
-                                sectionname == 'swapused':
-                            value = int(value)
-                        else:
-                            value = float(value)
-
-                        if patternsname == 'CPU':
-                            cpuid = elems[(1 if is_24hr is True else 2)]
-                            try:
-                                blah = return_dict[full_time][cpuid]
-                                del blah
-                            except KeyError:
-                                return_dict[full_time][cpuid] = {}
-                            return_dict[full_time][cpuid][sectionname] = \
-                                value
-                        else:
-                            return_dict[full_time][sectionname] = value
+                    if cpuid is not None:
+                        try:
+                            return_dict[full_time][cpuid].update(values)
+                        except KeyError:
+                            return_dict[full_time][cpuid] = values
+                    else:
+                        return_dict[full_time].update(values)
+
+        if self.__stats is not None:
+            self.__stats.count('lines', nlines)
+            self.__stats.count('rows', rows)
+            self.__stats.count('rows.%s' % (patternsname,), rows)
+            self.__stats.count('rows_skipped', datalines - rows)
 
         return return_dict
 
+    def __decode_line(self, part_line, patternsname, patterns,
+                      seconds=False):
+        """
+        Decodes single data line of a SAR section into its values
+            :param part_line: Data line (not a header, nor empty line)
+            :type part_line: str.
+            :param patternsname: Name of the section line belongs to
+            :type patternsname: str.
+            :param patterns: Section definition from ``ALL_PATTERNS``
+            :type patterns: dict.
+            :param seconds: Give time as int. seconds since midnight, read \
+                from fixed offsets of the line, instead of ``HH:MM:SS``
+            :type seconds: bool.
+            :return: ``Tuple`` of (time, cpuid or ``None``, values) or \
+                ``None`` for summary (``Average:``) lines and rows of \
+                filtered out CPUs
+        """
+
+        if seconds:
+            return self.__decode_seconds(part_line, patternsname)
+
+        # Take care of AM/PM timestamps in SAR file
+        is_24hr = True
+        is_AM = False
+
+        if part_line[9:11] == 'AM':
+            is_24hr = False
+            is_AM = True
+        elif part_line[9:11] == 'PM':
+            is_24hr = False
+            is_AM = False
+
+        if is_24hr is False:
+            part_line =  ('%s_%s XX %s' % (part_line[:8], part_line[9:11], part_line[12:]))
+
+        # Line is not empty, nor it's header.
+        # let's hit the road Jack!
+        elems = part_line.split()
+        full_time = elems[0].strip()
+
+        if full_time == "Average:":
+            return None
+
+        # Convert time to 24hr format if needed
+        if is_24hr is False:
+            full_time = full_time[:-3]
+
+            # 12 is a bitch in AM/PM notation
+            if full_time[:2] == '12':
+                if is_AM is True:
+                    full_time = ('%s:%s' % ('00', full_time[3:]))
+                is_AM = not is_AM
+
+            if is_AM is False and full_time[0:2] != '00':
+                hours = int(full_time[:2]) + 12
+                hours = ('%02d' % (hours,))
+                full_time = ('%s:%s' % (hours, full_time[3:]))
+
+        cpuid = None
+        if patternsname in INSTANCE_SECTIONS:
+            cpuid = elems[(1 if is_24hr is True else 2)]
+
+            if self.__cpu_filter is not None and patternsname == 'CPU' \
+                    and not self.__cpu_filter(cpuid):
+                return None
+
+        values = self.__fields[patternsname].decode(elems)
+
+        return (full_time, cpuid, values)
+
+    def __decode_seconds(self, part_line, patternsname):
+        """
+        Decodes data line like :meth:`__decode_line`, with time as
+        seconds since midnight. Time is read with integer arithmetic from
+        fixed offsets (``HH:MM:SS``, optionally followed by ``AM``/``PM``)
+        and the line isn't rewritten: AM/PM marker is a separate token
+        just like in the AM/PM header the row decoder was compiled for.
+            :return: ``Tuple`` of (seconds, cpuid or ``None``, values) \
+                or ``None``
+        """
+        if part_line.startswith('Average'):
+            return None
+
+        hours = int(part_line[0:2])
+        full_time = int(part_line[3:5]) * 60 + int(part_line[6:8])
+
+        ampm = part_line[9:11]
+        if ampm == 'AM':
+            hours %= 12
+        elif ampm == 'PM':
+            hours = hours % 12 + 12
+
+        full_time += hours * 3600
+
+        elems = part_line.split()
+
+        cpuid = None
+        if patternsname in INSTANCE_SECTIONS:
+            cpuid = elems[1 if ampm not in ('AM', 'PM') else 2]
+
+            if self.__cpu_filter is not None and patternsname == 'CPU' \
+                    and not self.__cpu_filter(cpuid):
+                return None
+
+        values = self.__fields[patternsname].decode(elems)
+
+        return (full_time, cpuid, values)
+
+    def iter_records(self, sections=None, fields=None):
+        """
+        Streams SAR data records straight from the file, line by line,
+        without building the whole ``Dictionary``-style SAR data first.
+        Memory use does not depend on the size of the file.
+            :param sections: Names of sections (keys of ``ALL_PATTERNS``) \
+                to yield records for, all of them if ``None``
+            :type sections: list.
+            :param fields: Section name => names of fields to decode
+            :type fields: dict.
+            :return: generator of ``Tuple``-style records \
+                (section, time, cpuid or ``None``, values)
+        """
+
+        if self.__stream is not None or self.__command is not None:
+            sar_file = self.__open_source()
+            if sar_file is None:
+                return
+
+        else:
+            if not (self.__filename and
+                    os.access(self.__filename, os.R_OK)):
+                return
+
+            try:
+                sar_file = compressed.open_file(
+                    self.__filename, self.__get_codec() or None
+                )
+            except (IOError, OSError):
+                print(("Couldn't open file %s" % self.__filename))
+                return
+
+        try:
+            state = {'section': None, 'part_start': True}
+
+            for part_line in sar_file:
+                record = self.__feed_line(part_line, state, sections, fields)
+                if record:
+                    yield record
+
+        finally:
+            if self.__stream is not None or self.__command is not None:
+                self.__close_source(sar_file)
+            else:
+                sar_file.close()
+
+    def refresh(self):
+        """
+        Incrementally parses SAR file which is still being written to
+        (today's ``sarXX``). Only lines appended since the previous call
+        are read and merged into the parsed data, so cost of a call
+        depends on the amount of new data, not on the size of the file.
+        First call parses the whole file. If file got truncated or
+        replaced (rotated), it's parsed from the start again.
+            :return: ``List`` of new ``Tuple``-style records \
+                (section, time, cpuid or ``None``, values), ``False`` \
+                if file can't be read
+        """
+
+        if not (self.__filename and os.access(self.__filename, os.R_OK)):
+            return False
+
+        if self.__get_codec():
+            print(("Can't follow compressed file %s" % self.__filename))
+            return False
+
+        try:
+            sar_file = open(self.__filename, "rb")
+        except (IOError, OSError):
+            print(("Couldn't open file %s" % self.__filename))
+            return False
+
+        try:
+            filestat = os.fstat(sar_file.fileno())
+
+            if self.__tail is None or \
+                    filestat.st_size < self.__tail['offset'] or \
+                    filestat.st_ino != self.__tail['inode']:
+                # Start over
+                self.__tail = {
+                    'offset': 0, 'inode': filestat.st_ino,
+                    'state': {'section': None, 'part_start': True}
+                }
+                self._sarinfo = {}
+
+            sar_file.seek(self.__tail['offset'])
+            records = []
+
+            while True:
+                part_line = sar_file.readline()
+
+                if not part_line.endswith('\n'):
+                    # Nothing more, or line still being written; it's
+                    # picked up on the next call
+                    break
+
+                self.__tail['offset'] += len(part_line)
+                record = self.__feed_line(part_line, self.__tail['state'])
+                if record:
+                    records.append(record)
+
+        finally:
+            sar_file.close()
+
+        for record in records:
+            _merge_record(self._sarinfo, record)
+
+        if records:
+            # Columnar view is rebuilt on next request
+            self._sartables = {}
+
+        return records
+
+    def follow(self, interval=1.0):
+        """
+        Follows SAR file which is being written to, like ``tail -f``
+        does, yielding new records as they are appended to it.
+            :param interval: Seconds to wait between polls
+            :type interval: float.
+            :return: generator of ``Tuple``-style records \
+                (section, time, cpuid or ``None``, values)
+        """
+        while True:
+            records = self.refresh()
+            if records:
+                for record in records:
+                    yield record
+            else:
+                time.sleep(interval)
+
+    def get_range(self, start, end, sections=None):
+        """
+        Parses only data between two times of the day. First call scans
+        the file for section offsets and samples of line times; queries
+        then jump right to the first line of the range and stop after
+        the last one.
+            :param start: Start of the range (``HH:MM:SS`` or seconds \
+                since midnight), inclusive
+            :param end: End of the range, inclusive
+            :param sections: Names of sections to return, all if ``None``
+            :type sections: list.
+            :return: ``Dictionary``-style SAR data within the range, \
+                ``False`` if file can't be read
+        """
+        if self.__get_codec() or self.__stream is not None or \
+                self.__command is not None:
+            # Offsets into a compressed file (or a stream) are useless, so
+            # the range is filtered out of streamed records instead
+            return self.__filter_range(start, end, sections)
+
+        if self.__range_index is None:
+            self.__range_index = self.__load_range_index()
+
+            if self.__range_index is None:
+                self.__range_index = self._build_range_index()
+                if self.__range_index is False:
+                    self.__range_index = None
+                    return False
+                self.__save_range_index()
+
+        return self._query_range(self.__range_index, start, end, sections)
+
+    def __filter_range(self, start, end, sections=None):
+        """
+        Collects data between two times of the day from all records of
+        the file
+            :param start: Start of the range, inclusive
+            :param end: End of the range, inclusive
+            :param sections: Names of sections to return, all if ``None``
+            :type sections: list.
+            :return: ``Dictionary``-style SAR data within the range
+        """
+        start = _to_seconds(start)
+        end = _to_seconds(end)
+        output = {}
+
+        for record in self.iter_records(sections):
+            if start <= time_to_seconds(record[1]) <= end:
+                _merge_record(output, record)
+
+        return output
+
+    def _build_range_index(self, start=0, end=None):
+        """
+        Scans SAR file (or its region) for section starts, sampling time
+        of every ``INDEX_SAMPLE_LINES``-th data line with its offset.
+            :param start: Offset in file where scan starts
+            :type start: int.
+            :param end: Offset in file where scan stops, end of file if \
+                ``None``
+            :type end: int.
+            :return: ``Dictionary`` of section name => list of parts, \
+                each a [header offset, [[seconds, offset], ...]] pair, \
+                ``False`` if file can't be read
+        """
+        if not (self.__filename and os.access(self.__filename, os.R_OK)):
+            return False
+
+        try:
+            sar_file = open(self.__filename, "rb")
+        except (IOError, OSError):
+            print(("Couldn't open file %s" % self.__filename))
+            return False
+
+        index = {}
+
+        try:
+            sar_file.seek(start)
+            offset = start
+            samples = None
+            part_start = True
+            counter = 0
+
+            while end is None or offset < end:
+                part_line = sar_file.readline()
+                if not part_line:
+                    break
+
+                line_offset = offset
+                offset += len(part_line)
+
+                if part_line.strip() == '':
+                    part_start = True
+                    continue
+
+                if part_start:
+                    part_start = False
+                    samples = None
+                    patternsname = _classify_header(part_line)
+                    if patternsname:
+                        samples = []
+                        counter = 0
+                        index.setdefault(patternsname, []).append(
+                            [line_offset, samples]
+                        )
+                    continue
+
+                if samples is not None:
+                    if counter % INDEX_SAMPLE_LINES == 0:
+                        seconds = _line_seconds(part_line)
+                        if seconds is not None:
+                            samples.append([seconds, line_offset])
+                    counter += 1
+
+        finally:
+            sar_file.close()
+
+        return index
+
+    def _query_range(self, index, start, end, sections=None):
+        """
+        Reads data lines between two times, using range index
+            :param index: Range index, from :meth:`_build_range_index`
+            :type index: dict.
+            :param start: Start of the range, inclusive
+            :param end: End of the range, inclusive
+            :param sections: Names of sections to return, all if ``None``
+            :type sections: list.
+            :return: ``Dictionary``-style SAR data within the range
+        """
+        start = _to_seconds(start)
+        end = _to_seconds(end)
+        output = {}
+
+        try:
+            sar_file = open(self.__filename, "rb")
+        except (IOError, OSError):
+            print(("Couldn't open file %s" % self.__filename))
+            return False
+
+        try:
+            for patternsname in index:
+                if sections is not None and patternsname not in sections:
+                    continue
+
+                patterns = ALL_PATTERNS[patternsname]
+
+                for header_offset, samples in index[patternsname]:
+                    if not samples or samples[0][0] > end:
+                        # Part without data, or starting after the range
+                        continue
+
+                    times = [sample[0] for sample in samples]
+                    # Last sample before the start: rows between it and
+                    # the next sample might already be in the range
+                    position = max(bisect.bisect_left(times, start) - 1, 0)
+
+                    sar_file.seek(header_offset)
+                    self.__fields[patternsname] = _compile_decoder(
+                        patternsname, sar_file.readline()
+                    )
+                    sar_file.seek(samples[position][1])
+
+                    while True:
+                        part_line = sar_file.readline()
+                        if part_line.strip() == '':
+                            # End of the part (or of the file)
+                            break
+
+                        seconds = _line_seconds(part_line)
+                        if seconds is None or seconds > end:
+                            break
+                        if seconds < start:
+                            continue
+
+                        record = self.__decode_line(
+                            part_line, patternsname, patterns
+                        )
+                        if record:
+                            _merge_record(output, (patternsname,) + record)
+
+        finally:
+            sar_file.close()
+
+        return output
+
+    def __load_range_index(self):
+        """
+        Loads range index from the sidecar file, if it was written for
+        the SAR file as it is now (same size and mtime)
+            :return: Range index, ``None`` if not available
+        """
+        if not self.__index_filename or \
+                not os.access(self.__index_filename, os.R_OK):
+            return None
+
+        try:
+            filestat = os.stat(self.__filename)
+            with open(self.__index_filename, 'r') as idxfile:
+                stored = json.load(idxfile)
+
+            if stored['stamp'] != [filestat.st_size, filestat.st_mtime]:
+                return None
+
+            return dict(
+                (str(section), parts)
+                for section, parts in stored['sections'].items()
+            )
+
+        except (EnvironmentError, ValueError, KeyError, TypeError):
+            # Broken index is just rebuilt
+            return None
+
+    def __save_range_index(self):
+        """
+        Writes range index to the sidecar file
+            :return: ``True`` if the index was written
+        """
+        if not self.__index_filename:
+            return False
+
+        try:
+            filestat = os.stat(self.__filename)
+            with open(self.__index_filename, 'w') as idxfile:
+                json.dump({
+                    'stamp': [filestat.st_size, filestat.st_mtime],
+                    'sections': self.__range_index
+                }, idxfile)
+
+        except EnvironmentError:
+            print(("Couldn't write index file %s" % self.__index_filename))
+            return False
+
+        return True
+
+    def __feed_line(self, part_line, state, sections=None, fields=None):
+        """
+        Feeds single line of SAR output into scanning state, tracking
+        which section (if any) lines belong to
+            :param part_line: Line of SAR output
+            :type part_line: str.
+            :param state: Scanning state (current section, whether next \
+                line starts a new part), updated in place
+            :type state: dict.
+            :param sections: Names of sections to decode, all if ``None``
+            :type sections: list.
+            :param fields: Section name => names of fields to decode
+            :type fields: dict.
+            :return: ``Tuple``-style record (section, time, cpuid or \
+                ``None``, values) or ``None`` if line is not a data line
+        """
+
+        if part_line.strip() == '':
+            # Empty line separates SAR parts
+            state['part_start'] = True
+            return None
+
+        if state['part_start']:
+            state['part_start'] = False
+            patternsname = _classify_header(part_line)
+            state['section'] = patternsname
+
+            if patternsname:
+                if sections is not None and patternsname not in sections:
+                    state['section'] = None
+                else:
+                    self.__fields[patternsname] = _compile_decoder(
+                        patternsname, part_line, fields
+                    )
+                return None
+
+            if RESTART_RE.search(part_line):
+                self.__restart_times.append(part_line.split()[0])
+                return None
+
+            if not self.__file_date and \
+                    part_line.startswith(PATTERN_MULTISPLIT):
+                pieces = part_line.split()
+                if len(pieces) > 3:
+                    self.__file_date = pieces[3]
+                return None
+
+        patternsname = state['section']
+
+        if patternsname:
+            record = self.__decode_line(
+                part_line, patternsname, ALL_PATTERNS[patternsname]
+            )
+            if record:
+                return (patternsname,) + record
+
+        return None
+
+    def __get_codec(self):
+        """
+        Detects compression of the SAR file, once
+            :return: Codec name (see :mod:`sar.compressed`), ``''`` for \
+                plain file
+        """
+        if self.__codec is None:
+            self.__codec = ''
+            if self.__filename:
+                self.__codec = compressed.detect_codec(self.__filename) or ''
+
+        return self.__codec
+
     def __get_filedate(self):
         """
         Parses (extracts) date of SAR data, from the SAR output file itself.
@@ -412,7 +1707,9 @@ class Parser(object):
 
             # Read first line of the file
             try:
-                sar_file = open(self.__filename, "r")
+                sar_file = compressed.open_file(
+                    self.__filename, self.__get_codec() or None
+                )
 
             except OSError:
                 ### DEBUG
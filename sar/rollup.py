@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+"""
+:mod:`sar.rollup` is a module containing windowed downsampling of parsed
+SAR data (e.g. 5-minute or 1-hour rollups of 1-second samples).
+
+Rolled up data keeps the shape of ``Dictionary``-style SAR data, with
+window start times as keys and, instead of each value, a dictionary of
+aggregates::
+
+    {'CPU': {'14:05:00': {'all': {'usr': {'mean': 3.1, 'p95': 7.9}}}},
+     'MEM': {'14:05:00': {'memused': {'mean': 3022.5, 'p95': 3100}}}}
+"""
+
+from sar import INSTANCE_SECTIONS
+from sar.table import SarTable, date_to_ordinal, seconds_to_time
+from array import array
+import bisect
+import datetime
+import itertools
+import operator
+import re
+
+WINDOW_RE = re.compile(r'^\s*(\d+)\s*(s|sec|m|min|h|hour|d|day)?\s*$')
+"""Window notation: number with optional unit"""
+
+WINDOW_UNITS = {
+    None: 1, 's': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600,
+    'd': 86400, 'day': 86400
+}
+"""Window units, in seconds"""
+
+PERCENTILE_RE = re.compile(r'^p(\d{1,2}(\.\d+)?)$')
+"""Percentile aggregate notation (``p95``, ``p99.9``)"""
+
+
+def parse_window(window):
+    """
+    Converts window notation into seconds
+        :param window: Window, as seconds or as string like ``5min``, \\
+            ``1h``, ``30s``
+        :type window: int. or str.
+        :return: int.
+    """
+    if isinstance(window, (int, float)):
+        seconds = int(window)
+    else:
+        match = WINDOW_RE.match(window)
+        if not match:
+            raise ValueError('Unknown window %r' % (window,))
+        seconds = int(match.group(1)) * WINDOW_UNITS[match.group(2)]
+
+    if seconds <= 0:
+        raise ValueError('Window must be positive, got %r' % (window,))
+
+    return seconds
+
+
+def _aggregator(name):
+    """
+    Builds aggregate function out of its name
+        :param name: ``min``, ``max``, ``mean``, ``sum``, ``count`` or \\
+            percentile (``pNN``)
+        :type name: str.
+        :return: (function taking values and their sum, whether values \\
+            have to be sorted)
+    """
+    if name == 'min':
+        return (lambda values, total: min(values)), False
+    if name == 'max':
+        return (lambda values, total: max(values)), False
+    if name == 'sum':
+        return (lambda values, total: total), False
+    if name == 'count':
+        return (lambda values, total: len(values)), False
+    if name == 'mean':
+        return (lambda values, total: float(total) / len(values)), False
+
+    match = PERCENTILE_RE.match(name)
+    if match:
+        rank = float(match.group(1)) / 100
+
+        def percentile(values, total):
+            # Nearest-rank percentile
+            position = int(rank * len(values) + 0.999999) - 1
+            return values[min(max(position, 0), len(values) - 1)]
+        return percentile, True
+
+    raise ValueError('Unknown aggregate %r' % (name,))
+
+
+def _aggregators(aggs):
+    """
+    Builds aggregate functions
+        :return: ``List`` of (name, function, whether values have to be \\
+            sorted)
+    """
+    return [(name,) + _aggregator(name) for name in aggs]
+
+
+def _aggregate(values, aggregators):
+    """
+    Computes aggregates of one column slice
+        :param values: Values of one field in one window
+        :type values: array.
+        :return: Aggregate name => value, ``None`` if window has no values
+    """
+    total = sum(values)
+    if total != total:
+        # NaN sum means missing values, which are left out
+        values = [value for value in values if value == value]
+        if not values:
+            return None
+        total = sum(values)
+
+    ordered = None
+    output = {}
+    for name, func, needs_order in aggregators:
+        if needs_order:
+            if ordered is None:
+                ordered = sorted(values)
+            output[name] = func(ordered, total)
+        else:
+            output[name] = func(values, total)
+    return output
+
+
+def _spans(times, day_offset, window):
+    """
+    Splits sorted time column into windows, with one bisection per window
+        :param times: Seconds since midnight of the rows
+        :type times: array.
+        :param day_offset: Seconds from the first day's midnight to this \\
+            day's midnight
+        :return: generator of (window start, first row, row after the last)
+    """
+    low = 0
+    count = len(times)
+    while low < count:
+        moment = day_offset + times[low]
+        start = moment - (moment % window)
+        high = bisect.bisect_left(times, start + window - day_offset, low)
+        yield start, low, high
+        low = high
+
+
+def _slice_table(buckets, table, day_offset, window):
+    """
+    Splits one section's columns into windows: time column is split into
+    windows once, then every column is cut into one slice per window
+        :param buckets: Window start => section => cpuid => field => \\
+            ``list`` of column slices, updated in place
+        :param table: Columnar data of the section
+        :type table: :class:`sar.table.SarTable`
+        :param day_offset: Seconds from the first day's midnight to this \\
+            day's midnight
+    """
+    section = table.section
+
+    for cpuid in table.cpuids():
+        times = table.times(cpuid)
+        columns = [(field, table.column(field, cpuid))
+                   for field in table.fields(cpuid)]
+
+        if not all(itertools.imap(operator.le, times,
+                                  itertools.islice(times, 1, None))):
+            # Rows past midnight or out of order, reorder them once
+            order = sorted(range(len(times)), key=times.__getitem__)
+            times = array(times.typecode, [times[i] for i in order])
+            columns = [
+                (field, array(column.typecode, [column[i] for i in order]))
+                for field, column in columns
+            ]
+
+        for start, low, high in _spans(times, day_offset, window):
+            # Window spanning midnight gets slices of both days
+            cpu_bucket = buckets.setdefault(start, {}).setdefault(
+                section, {}
+            ).setdefault(cpuid, {})
+            for field, column in columns:
+                cpu_bucket.setdefault(field, []).append(column[low:high])
+
+
+def _slice_day(buckets, sarinfo, day_offset, window):
+    """
+    Splits one day of SAR data into window buckets
+        :param sarinfo: Section name => :class:`sar.table.SarTable` or \\
+            ``Dictionary``-style section data
+        :type sarinfo: dict.
+    """
+    for section in sarinfo:
+        table = sarinfo[section]
+        if not isinstance(table, SarTable):
+            table = SarTable.from_dict(section, table)
+        _slice_table(buckets, table, day_offset, window)
+
+
+def _rolled(bucket, aggregators):
+    """
+    Computes aggregates of all column slices in one bucket
+        :return: section => (cpuid =>) field => aggregate => value
+    """
+    output = {}
+    for section in bucket:
+        section_output = output[section] = {}
+
+        for cpuid, fields in bucket[section].items():
+            rolled = {}
+            for field, slices in fields.items():
+                if len(slices) == 1:
+                    values = slices[0]
+                else:
+                    values = list(itertools.chain.from_iterable(slices))
+                aggregates = _aggregate(values, aggregators)
+                if aggregates is not None:
+                    rolled[field] = aggregates
+
+            if section in INSTANCE_SECTIONS:
+                if rolled:
+                    section_output[cpuid] = rolled
+            else:
+                section_output.update(rolled)
+
+        if not section_output:
+            del output[section]
+    return output
+
+
+def rollup(sarinfo, window='5min', aggs=('min', 'max', 'mean', 'p95')):
+    """
+    Rolls up single day of SAR data into windows
+        :param sarinfo: Section name => :class:`sar.table.SarTable`, as \\
+            from ``get_sar_info(format='columnar')``, or \\
+            ``Dictionary``-style SAR data (converted to columns first)
+        :type sarinfo: dict.
+        :param window: Window size (seconds, or ``5min``, ``1h``, ...)
+        :param aggs: Aggregates to compute per window: ``min``, ``max``, \\
+            ``mean``, ``sum``, ``count`` and percentiles (``p95``)
+        :type aggs: tuple.
+        :return: ``Dictionary``-style SAR data, keyed by window start, \\
+            with aggregates instead of values
+    """
+    window = parse_window(window)
+    aggregators = _aggregators(aggs)
+
+    buckets = {}
+    _slice_day(buckets, sarinfo, 0, window)
+
+    output = {}
+    for start in buckets:
+        label = seconds_to_time(start)
+        for section, rolled in _rolled(buckets[start], aggregators).items():
+            output.setdefault(section, {})[label] = rolled
+
+    return output
+
+
+def rollup_days(sarinfos, window='5min', aggs=('min', 'max', 'mean', 'p95')):
+    """
+    Rolls up more days of SAR data into windows. Windows are aligned to
+    the first day's midnight and may span across midnight; such window
+    belongs to the day it starts in.
+        :param sarinfos: Date (as in SAR file header, ``YYYY-MM-DD`` or \\
+            ``MM/DD/YYYY``) => SAR data of the day, as taken by \\
+            :func:`rollup`
+        :type sarinfos: dict.
+        :param window: Window size (seconds, or ``5min``, ``1h``, ...)
+        :param aggs: Aggregates to compute per window
+        :type aggs: tuple.
+        :return: Date => rolled up ``Dictionary``-style SAR data; dates \\
+            are given as in ``sarinfos`` (ISO format for days which \\
+            aren't there)
+        :raises ValueError: If a date can't be parsed
+    """
+    window = parse_window(window)
+    aggregators = _aggregators(aggs)
+
+    if not sarinfos:
+        return {}
+
+    # Ordinal of the day => date as given
+    dates = {}
+    for partdate in sarinfos:
+        ordinal = date_to_ordinal(partdate)
+        if ordinal is None:
+            raise ValueError('Unknown date %r' % (partdate,))
+        dates[ordinal] = partdate
+
+    first = min(dates)
+
+    buckets = {}
+    for ordinal in sorted(dates):
+        _slice_day(buckets, sarinfos[dates[ordinal]],
+                   (ordinal - first) * 86400, window)
+
+    output = {}
+    for start in buckets:
+        ordinal = first + start // 86400
+        partdate = dates.get(ordinal)
+        if partdate is None:
+            partdate = datetime.date.fromordinal(ordinal).isoformat()
+        label = seconds_to_time(start % 86400)
+        day_output = output.setdefault(partdate, {})
+        for section, rolled in _rolled(buckets[start], aggregators).items():
+            day_output.setdefault(section, {})[label] = rolled
+
+    return output
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""
+:mod:`sar.stats` is a module containing instrumentation for parsing of SAR
+files: time spent in each parsing stage, counters of processed data and
+hooks to pass both on (to a metrics system, to a profiler).
+
+Parsers only touch it when they are given a :class:`ParseStats`, so
+parsing without one costs no more than a ``None`` check per stage.
+
+Stages recorded by :class:`sar.parser.Parser`:
+
+* ``split`` - reading file and splitting it into parts
+* ``classify`` - sorting parts into sections (includes ``compile``)
+* ``compile`` - finding columns of a section header
+* ``decode`` - decoding rows of sections into values
+
+:class:`sar.multiparser.Multiparser` adds ``split_days`` and
+``parse_days``.
+
+Counters: ``bytes_read``, ``chunks``, ``lines``, ``rows`` (all sections),
+``rows.<SECTION>`` (e.g. ``rows.CPU``), ``rows_skipped`` (``Average:``
+lines, filtered out CPUs), ``cache_hits`` and ``cache_misses``.
+"""
+
+from timeit import default_timer
+
+
+class ParseStats(object):
+    """
+    Per-stage timers and counters of parsing, with optional hooks.
+
+    Hook is a callable taking ``(event, name, value)``, where event is
+    ``start`` (value is ``None``) or ``stop`` (value is seconds spent) for
+    stages, and ``count`` (value is the increment) for counters.
+        :param hooks: Hooks to call on every event
+        :type hooks: list.
+    """
+
+    def __init__(self, hooks=None):
+
+        self.timings = {}
+        """Stage name => seconds spent in it, in total"""
+        self.calls = {}
+        """Stage name => number of times it was run"""
+        self.counters = {}
+        """Counter name => its value"""
+        self.__hooks = list(hooks or [])
+        """Callables notified about every event"""
+        self.__started = {}
+        """Stage name => start times of its runs in progress"""
+
+    def add_hook(self, hook):
+        """
+        Adds hook to be notified about every event
+            :param hook: Callable taking ``(event, name, value)``
+        """
+        self.__hooks.append(hook)
+
+    def start(self, stage):
+        """
+        Marks start of a stage
+            :param stage: Name of the stage
+            :type stage: str.
+        """
+        for hook in self.__hooks:
+            hook('start', stage, None)
+        self.__started.setdefault(stage, []).append(default_timer())
+
+    def stop(self, stage):
+        """
+        Marks end of a stage started by :meth:`start`
+            :param stage: Name of the stage
+            :type stage: str.
+            :return: Seconds spent in this run of the stage
+        """
+        elapsed = default_timer() - self.__started[stage].pop()
+        self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+        for hook in self.__hooks:
+            hook('stop', stage, elapsed)
+        return elapsed
+
+    def count(self, name, value=1):
+        """
+        Increments a counter
+            :param name: Name of the counter
+            :type name: str.
+            :param value: Increment
+            :type value: int.
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+        for hook in self.__hooks:
+            hook('count', name, value)
+
+    def merge(self, other):
+        """
+        Adds timings and counters of another run (e.g. from a worker
+        process) to these. Hooks are notified about merged counters only.
+            :param other: Stats to add, or their :meth:`as_dict`
+            :type other: :class:`ParseStats` or dict.
+        """
+        if isinstance(other, ParseStats):
+            other = other.as_dict()
+
+        for stage, seconds in other['timings'].items():
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        for stage, calls in other['calls'].items():
+            self.calls[stage] = self.calls.get(stage, 0) + calls
+        for name, value in other['counters'].items():
+            self.count(name, value)
+
+    def reset(self):
+        """
+        Clears all timings and counters, hooks are kept
+        """
+        self.timings = {}
+        self.calls = {}
+        self.counters = {}
+
+    def as_dict(self):
+        """
+        Returns timings and counters as plain data, e.g. for a metrics
+        system or to send them between processes
+            :return: ``Dictionary`` with ``timings``, ``calls`` and \
+                ``counters``
+        """
+        return {
+            'timings': dict(self.timings),
+            'calls': dict(self.calls),
+            'counters': dict(self.counters)
+        }
+
+    def __repr__(self):
+        return 'ParseStats(%r)' % (self.as_dict(),)
+
+
+def profile_hook(profiler, stages=None):
+    """
+    Makes a hook which runs a profiler (e.g. ``cProfile.Profile``) only
+    while given stages run, so the profile isn't cluttered by the rest.
+        :param profiler: Profiler with ``enable()`` and ``disable()``
+        :param stages: Names of stages to profile, all if ``None``
+        :type stages: list.
+        :return: Hook for :class:`ParseStats`
+    """
+    active = [0]
+
+    def hook(event, name, value):
+        if event == 'count' or (stages is not None and name not in stages):
+            return
+        if event == 'start':
+            if not active[0]:
+                profiler.enable()
+            active[0] += 1
+        else:
+            active[0] -= 1
+            if not active[0]:
+                profiler.disable()
+
+    return hook
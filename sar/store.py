@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+"""
+:mod:`sar.store` is a module containing compact binary storage for parsed
+SAR data, so it doesn't have to be kept (and reloaded) as JSON.
+
+Layout of a store file:
+
+* magic ``SARSTORE`` and format version (``uint32``),
+* length (``uint32``) and JSON of the header: per day, a shared time
+  axis and per section the schema (fields, their types, CPU ids) with
+  offsets of the columns,
+* columns, each one a raw :mod:`array` (8-byte aligned).
+
+Every day has one time axis (seconds since midnight) shared by all its
+sections; a section whose rows don't cover the whole axis also stores
+indexes of its rows into it. Opening a store reads only its header, the
+file is mapped and a column is read only when its section is accessed,
+so opening a day costs the same for a month of data as for one day.
+"""
+
+from sar.table import SarTable
+from array import array
+from collections import Mapping
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+
+STORE_MAGIC = 'SARSTORE'
+"""Magic bytes at the start of store files"""
+
+STORE_VERSION = 1
+"""Version of the store file layout"""
+
+ALIGNMENT = 8
+"""Columns start at offsets aligned to this many bytes"""
+
+
+def _tables_of(info):
+    """
+    Gets columnar tables for ``Dictionary``-style (or already columnar)
+    SAR data of one day
+        :param info: Section name => section data or :class:`SarTable`
+        :type info: dict.
+        :return: ``Dictionary`` of section name => :class:`SarTable`
+    """
+    tables = {}
+    for section in info:
+        data = info[section]
+        if isinstance(data, SarTable):
+            tables[section] = data
+        else:
+            tables[section] = SarTable.from_dict(section, data)
+    return tables
+
+
+def write(path, days):
+    """
+    Writes parsed SAR data of one or more days into a store file
+        :param path: Name of the store file
+        :type path: str.
+        :param days: Date => section name => ``Dictionary``-style section \
+            data or :class:`sar.table.SarTable`
+        :type days: dict.
+        :return: ``True`` if the store was written
+    """
+    header = {'byteorder': sys.byteorder, 'days': {}}
+    columns = []
+    offset = [0]
+
+    def add_column(column):
+        # Offsets are relative to the end of the header, which isn't
+        # known yet
+        position = offset[0]
+        columns.append(column)
+        size = len(column) * column.itemsize
+        offset[0] += size + (-size % ALIGNMENT)
+        return [column.typecode, column.itemsize, position, len(column)]
+
+    for date in days:
+        tables = _tables_of(days[date])
+
+        axis = set()
+        for table in tables.values():
+            for cpuid in table.cpuids():
+                axis.update(table.times(cpuid))
+        axis = array('l', sorted(axis))
+
+        dayheader = {'axis': add_column(axis), 'sections': {}}
+
+        for section in tables:
+            table = tables[section]
+            groups = []
+
+            for cpuid in sorted(table.cpuids()):
+                times = table.times(cpuid)
+                group = {'cpuid': cpuid, 'rows': None, 'columns': {}}
+
+                if times != axis:
+                    group['rows'] = add_column(array(
+                        'l', [bisect.bisect_left(axis, seconds)
+                              for seconds in times]
+                    ))
+
+                for field in table.fields(cpuid):
+                    group['columns'][field] = add_column(
+                        table.column(field, cpuid)
+                    )
+                groups.append(group)
+
+            dayheader['sections'][section] = groups
+
+        header['days'][date] = dayheader
+
+    headerdata = json.dumps(header)
+    start = 16 + len(headerdata)
+    start += -start % ALIGNMENT
+    header['start'] = start
+
+    # Header length must not change by adding its own start offset
+    headerdata = json.dumps(header)
+    while 16 + len(headerdata) > start:
+        start += ALIGNMENT
+        header['start'] = start
+        headerdata = json.dumps(header)
+
+    tempname = '%s.tmp' % (path,)
+    try:
+        with open(tempname, 'wb') as store_file:
+            store_file.write(STORE_MAGIC)
+            store_file.write(struct.pack('<II', STORE_VERSION,
+                                         len(headerdata)))
+            store_file.write(headerdata)
+            store_file.write('\0' * (start - 16 - len(headerdata)))
+
+            for column in columns:
+                data = column.tostring()
+                store_file.write(data)
+                store_file.write('\0' * (-len(data) % ALIGNMENT))
+
+        os.rename(tempname, path)
+
+    except EnvironmentError:
+        print(("Couldn't write store file %s" % (path,)))
+        return False
+
+    return True
+
+
+class _LazySections(Mapping):
+    """
+    Read-only mapping of section name => value, loaded on first access
+        :param sections: Names of the sections
+        :type sections: list.
+        :param loader: Function loading value of a section by its name
+    """
+
+    def __init__(self, sections, loader):
+
+        self.__sections = sorted(sections)
+        """Names of the sections"""
+        self.__loader = loader
+        """Function loading a section"""
+        self.__loaded = {}
+        """Section name => loaded value"""
+
+    def __getitem__(self, section):
+        try:
+            return self.__loaded[section]
+        except KeyError:
+            if section not in self.__sections:
+                raise
+            value = self.__loaded[section] = self.__loader(section)
+            return value
+
+    def __iter__(self):
+        return iter(self.__sections)
+
+    def __len__(self):
+        return len(self.__sections)
+
+
+class SarStore(object):
+    """
+    Reader of a store file written by :func:`write`. Keeps the file
+    mapped until :meth:`close`.
+        :param path: Name of the store file
+        :type path: str.
+        :raises IOError: If file isn't a readable store
+    """
+
+    def __init__(self, path):
+
+        self.__path = path
+        """Name of the store file"""
+        self.__sarmap = None
+        """Read-only mapping of the store file"""
+
+        with open(path, 'rb') as store_file:
+            prefix = store_file.read(16)
+            if len(prefix) < 16 or prefix[:8] != STORE_MAGIC:
+                raise IOError("Not a SAR store file: %s" % (path,))
+
+            version, headerlength = struct.unpack('<II', prefix[8:])
+            if version != STORE_VERSION:
+                raise IOError("Unsupported SAR store version %d: %s" %
+                              (version, path))
+
+            self.__header = json.loads(store_file.read(headerlength))
+            """Header of the store, with schema and column offsets"""
+
+            if os.fstat(store_file.fileno()).st_size > 0:
+                self.__sarmap = mmap.mmap(
+                    store_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+
+        self.__swap = self.__header['byteorder'] != sys.byteorder
+        """Whether columns were written with the other byte order"""
+
+    def dates(self):
+        """
+        Lists days in the store
+            :return: Sorted ``List`` of dates
+        """
+        return sorted(self.__header['days'])
+
+    def sections(self, date):
+        """
+        Lists sections stored for a day
+            :return: ``List`` of section names
+        """
+        return sorted(self.__header['days'][date]['sections'])
+
+    def table(self, date, section):
+        """
+        Reads one section of a day into a table; only its own columns
+        (and the day's time axis) are read from the file
+            :param date: Date of the day
+            :type date: str.
+            :param section: Name of the section
+            :type section: str.
+            :return: :class:`sar.table.SarTable`
+        """
+        dayheader = self.__header['days'][date]
+        axis = self.__column(dayheader['axis'])
+
+        times = {}
+        columns = {}
+
+        for group in dayheader['sections'][section]:
+            cpuid = group['cpuid']
+            if cpuid is not None:
+                cpuid = str(cpuid)
+
+            if group['rows'] is None:
+                times[cpuid] = array('l', axis)
+            else:
+                times[cpuid] = array('l', [
+                    axis[row] for row in self.__column(group['rows'])
+                ])
+
+            columns[cpuid] = dict(
+                (str(field), self.__column(group['columns'][field]))
+                for field in group['columns']
+            )
+
+        return SarTable.from_columns(str(section), times, columns)
+
+    def tables(self, date):
+        """
+        Returns all sections of a day as tables, each read on first access
+            :return: Mapping of section name => :class:`sar.table.SarTable`
+        """
+        return _LazySections(
+            [str(section) for section in self.sections(date)],
+            lambda section: self.table(date, section)
+        )
+
+    def sar_info(self, date):
+        """
+        Returns ``Dictionary``-style SAR data of a day, each section read
+        on first access
+            :return: Mapping of section name => section data, as from \
+                :meth:`sar.parser.Parser.get_sar_info`
+        """
+        return _LazySections(
+            [str(section) for section in self.sections(date)],
+            lambda section: self.table(date, section).to_dict()
+        )
+
+    def close(self):
+        """
+        Releases mapping of the store file
+        """
+        if self.__sarmap is not None:
+            self.__sarmap.close()
+            self.__sarmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+        return False
+
+    def __column(self, spec):
+        """
+        Reads a column out of the mapped file
+            :param spec: Column spec from the header (typecode, item \
+                size, offset, length)
+            :type spec: list.
+            :return: ``array`` with the column
+        """
+        typecode, itemsize, offset, length = spec
+        column = array(str(typecode))
+
+        if column.itemsize != itemsize:
+            raise IOError("Column of %d-byte items can't be read here: %s" %
+                          (itemsize, self.__path))
+
+        start = self.__header['start'] + offset
+        column.fromstring(self.__sarmap[start:start + length * itemsize])
+        if self.__swap:
+            column.byteswap()
+
+        return column
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+"""
+:mod:`sar.stream` is a module for parsing SAR output that isn't in a
+file: output of a running ``sar`` command, or any readable pipe or file
+object.
+
+Streams are read in fixed-size blocks and split into SAR parts as they
+come, so neither a temporary file nor the whole output is ever needed.
+Output already in memory is split in place, into views of the buffer.
+"""
+
+import os
+import re
+import subprocess
+
+BLOCK_SIZE = 256 * 1024
+"""Size of blocks read from a stream, in bytes"""
+
+SAR_COMMAND = ['sar', '-A']
+"""Default command producing SAR output; ``-f saDD`` picks a data file"""
+
+
+def iter_chunks(stream, block_size=BLOCK_SIZE):
+    """
+    Splits SAR output read from a stream into chunks separated by empty
+    lines, the way :meth:`sar.parser.Parser._split_file` does. Each block
+    is searched once; blocks of an unfinished chunk are kept aside and
+    joined when the chunk ends, so long chunks cost no more than short.
+        :param stream: Readable file-like object (``read(size)``)
+        :param block_size: Size of blocks to read
+        :type block_size: int.
+        :return: generator of stripped SAR output chunks
+    """
+    pieces = []
+
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+
+        start = 0
+        if pieces and block[0] == '\n' and pieces[-1][-1] == '\n':
+            # Empty line split between two blocks
+            pieces[-1] = pieces[-1][:-1]
+            yield ''.join(pieces).strip()
+            pieces = []
+            start = 1
+
+        dlpos = block.find('\n\n', start)
+
+        while dlpos > -1:
+            pieces.append(block[start:dlpos])
+            yield ''.join(pieces).strip()
+            pieces = []
+            start = dlpos + 2
+            dlpos = block.find('\n\n', start)
+
+        if start < len(block):
+            pieces.append(block[start:])
+
+    if pieces:
+        yield ''.join(pieces).strip()
+
+
+class CommandStream(object):
+    """
+    Standard output of a command producing SAR output (``sar`` itself or
+    a stand-in), as a readable file-like object. Command is started when
+    the object is created; :meth:`close` waits for it to finish.
+        :param command: Command and its arguments
+        :type command: list.
+        :raises OSError: If command can't be started
+    """
+
+    def __init__(self, command=None):
+
+        self.__command = list(command or SAR_COMMAND)
+        """Command and its arguments"""
+        self.__process = subprocess.Popen(
+            self.__command, stdout=subprocess.PIPE, env=_c_locale()
+        )
+        """Running command"""
+        self.returncode = None
+        """Exit status of the command, once it's closed"""
+
+    def read(self, size=-1):
+        return self.__process.stdout.read(size)
+
+    def readline(self):
+        return self.__process.stdout.readline()
+
+    def __iter__(self):
+        # Iterating over the pipe itself would read ahead in big blocks
+        return iter(self.readline, '')
+
+    def close(self):
+        """
+        Closes the pipe and waits for the command to exit
+            :return: ``True`` if command finished successfully
+        """
+        if self.returncode is None:
+            self.__process.stdout.close()
+            self.returncode = self.__process.wait()
+
+            if self.returncode:
+                print(("Command %s exited with status %d" %
+                       (' '.join(self.__command), self.returncode)))
+
+        return self.returncode == 0
+
+
+def _c_locale():
+    """
+    Builds environment for ``sar``, with 24hr times and ISO dates
+        :return: ``Dictionary`` with environment variables
+    """
+    env = dict(os.environ)
+    env['LC_ALL'] = 'C'
+    env['S_TIME_FORMAT'] = 'ISO'
+    return env
+
+
+_WHITESPACE = ' \t\n\r\x0b\x0c'
+"""Characters stripped from both ends of SAR parts, as ``str.strip()``"""
+
+_NONSPACE_RE = re.compile('[^%s]' % (_WHITESPACE,))
+"""First non-whitespace character"""
+
+_FIND_RES = {'\n': re.compile('\n'), '\n\n': re.compile('\n\n')}
+"""Compiled separators, for searching buffers which have no ``find()``"""
+
+
+def _as_buffer(data):
+    """
+    Gets searchable view of data without copying it, where possible
+        :param data: ``str``, ``bytearray``, ``buffer``, ``mmap`` or other \
+            object with buffer interface
+        :return: ``str`` or ``buffer`` over the data; ``memoryview`` has \
+            no old-style buffer interface in Python 2, so it gets copied
+    """
+    if type(data) is str or type(data) is buffer:
+        return data
+    if type(data) is memoryview:
+        return data.tobytes()
+    return buffer(data)
+
+
+def _finder(data):
+    """
+    Gets ``find(sub, start, end)`` for the data: its own for ``str``, a
+    regular expression search (which works on buffers) otherwise
+    """
+    if type(data) is str:
+        return data.find
+
+    def find(sub, start, end):
+        match = _FIND_RES[sub].search(data, start, end)
+        return match.start() if match else -1
+
+    return find
+
+
+class BufferPart(object):
+    """
+    Part of SAR output held in a buffer, as offsets into it; lines are
+    copied out of the buffer only when they are read.
+        :param data: ``str`` or ``buffer`` with SAR output
+        :param start: Offset where the part starts
+        :type start: int.
+        :param end: Offset where the part ends
+        :type end: int.
+        :param find: ``find(sub, start, end)`` for the data
+    """
+
+    __slots__ = ('data', 'start', 'end', 'find')
+
+    def __init__(self, data, start, end, find):
+
+        self.data = data
+        self.start = start
+        self.end = end
+        self.find = find
+
+    def first_line(self):
+        """
+        Copies out first line of the part
+            :return: str.
+        """
+        eolpos = self.find('\n', self.start, self.end)
+        if eolpos < 0:
+            eolpos = self.end
+        return self.data[self.start:eolpos]
+
+    def lines(self):
+        """
+        Copies out lines of the part, one at a time
+            :return: generator of str.
+        """
+        data = self.data
+        find = self.find
+        pos = self.start
+        end = self.end
+
+        eolpos = find('\n', pos, end)
+        while eolpos > -1:
+            yield data[pos:eolpos]
+            pos = eolpos + 1
+            eolpos = find('\n', pos, end)
+
+        yield data[pos:end]
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __str__(self):
+        return self.data[self.start:self.end]
+
+
+def split_buffer(data):
+    """
+    Splits SAR output held in memory into parts separated by empty lines,
+    the way :meth:`sar.parser.Parser._split_file` does, without copying
+    any of it: parts are offsets into the data, stripped of whitespace.
+        :param data: ``str``, ``bytearray``, ``buffer``, ``mmap``, \
+            ``memoryview`` or other object with buffer interface
+        :return: ``List`` of :class:`BufferPart`
+    """
+    data = _as_buffer(data)
+    find = _finder(data)
+    parts = []
+    size = len(data)
+    start = 0
+
+    while start < size:
+        dlpos = find('\n\n', start, size)
+        end = dlpos if dlpos > -1 else size
+
+        # Strip the part without copying it
+        match = _NONSPACE_RE.search(data, start, end)
+        if match is None:
+            partstart = partend = end
+        else:
+            partstart = match.start()
+            partend = end
+            while data[partend - 1] in _WHITESPACE:
+                partend -= 1
+
+        parts.append(BufferPart(data, partstart, partend, find))
+
+        if dlpos < 0:
+            break
+        start = dlpos + 2
+
+    return parts
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+"""
+:mod:`sar.table` is a module containing columnar container for parsed SAR
+section data.
+
+Instead of one dictionary per timestamp (and per CPU), every field of a
+section is kept in one contiguous :mod:`array` column, next to an integer
+time column (seconds since midnight). Per-instance data of the ``CPU``,
+``NET`` and ``DISK`` sections gets its own set of columns per CPU id,
+interface or device (all called CPU id below).
+"""
+
+from sar import INSTANCE_SECTIONS
+from array import array
+import datetime
+
+MISSING = float('nan')
+"""Value stored for fields a row doesn't have (e.g. ``svctm`` or
+``rkB/s`` in output of older sysstat versions)"""
+
+
+def _present(column):
+    """
+    Filters missing (``NaN``) values out of a column
+        :return: ``List`` of values
+    """
+    if column.typecode != 'd':
+        return column
+    return [value for value in column if value == value]
+
+
+def time_to_seconds(full_time):
+    """
+    Converts 24hr ``HH:MM:SS`` time into seconds since midnight
+        :param full_time: Time as used in ``Dictionary``-style SAR data
+        :type full_time: str.
+        :return: int.
+    """
+    return (int(full_time[0:2]) * 3600 + int(full_time[3:5]) * 60 +
+            int(full_time[6:8]))
+
+
+def seconds_to_time(seconds):
+    """
+    Converts seconds since midnight into 24hr ``HH:MM:SS`` time
+        :param seconds: Seconds since midnight
+        :type seconds: int.
+        :return: str.
+    """
+    return '%02d:%02d:%02d' % (seconds // 3600, (seconds // 60) % 60,
+                               seconds % 60)
+
+
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%y', '%m/%d/%Y')
+"""Formats of dates in SAR file headers (ISO, and US locale ones)"""
+
+
+def date_to_ordinal(date):
+    """
+    Converts date of a SAR file into proleptic Gregorian ordinal of the
+    day (as ``datetime.date.toordinal()``), so dates in any of the
+    header formats can be ordered and compared
+        :param date: Date as in SAR file header (``YYYY-MM-DD``, \\
+            ``MM/DD/YY`` or ``MM/DD/YYYY``)
+        :type date: str.
+        :return: int. or ``None`` if date can't be parsed
+    """
+    for dateformat in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(date, dateformat).toordinal()
+        except (ValueError, TypeError):
+            pass
+    return None
+
+
+class SarTable(object):
+    """
+    Columnar data of a single SAR section.
+        :param section: Name of the section (key of ``ALL_PATTERNS``)
+        :type section: str.
+    """
+
+    def __init__(self, section):
+
+        self.section = section
+        """Name of the section"""
+        self.__times = {}
+        """CPU id (``None`` for single-row sections) => time column"""
+        self.__columns = {}
+        """CPU id (``None`` for single-row sections) => field => column"""
+
+    @classmethod
+    def from_dict(cls, section, section_info):
+        """
+        Builds table out of ``Dictionary``-style data of one section
+            :param section: Name of the section
+            :type section: str.
+            :param section_info: Section data, as from \\
+                :meth:`sar.parser.Parser.get_sar_info`
+            :type section_info: dict.
+            :return: :class:`SarTable`
+        """
+        table = cls(section)
+
+        for full_time in sorted(section_info):
+            seconds = time_to_seconds(full_time)
+            row = section_info[full_time]
+
+            if section in INSTANCE_SECTIONS:
+                for cpuid in sorted(row):
+                    table.append(seconds, cpuid, row[cpuid])
+            else:
+                table.append(seconds, None, row)
+
+        return table
+
+    @classmethod
+    def from_columns(cls, section, times, columns):
+        """
+        Builds table out of ready columns, without copying them
+            :param section: Name of the section
+            :type section: str.
+            :param times: CPU id (``None`` for single-row sections) => \\
+                time column
+            :type times: dict.
+            :param columns: CPU id => field => column
+            :type columns: dict.
+            :return: :class:`SarTable`
+        """
+        table = cls(section)
+        table.__times = times
+        table.__columns = columns
+        return table
+
+    def append(self, seconds, cpuid, values):
+        """
+        Appends one row to the table. Fields the row doesn't have are
+        stored as :data:`MISSING` (their column becomes a float one).
+            :param seconds: Time of the row, in seconds since midnight
+            :type seconds: int.
+            :param cpuid: CPU id of the row, ``None`` for single-row sections
+            :type cpuid: str.
+            :param values: Field name => value
+            :type values: dict.
+        """
+        try:
+            columns = self.__columns[cpuid]
+        except KeyError:
+            self.__times[cpuid] = array('l')
+            columns = self.__columns[cpuid] = {}
+
+        times = self.__times[cpuid]
+
+        for field in values:
+            if field not in columns:
+                # Field first seen now, earlier rows don't have it
+                if times:
+                    columns[field] = array('d', [MISSING] * len(times))
+                elif isinstance(values[field], float):
+                    columns[field] = array('d')
+                else:
+                    columns[field] = array('l')
+
+        times.append(seconds)
+        for field in columns:
+            column = columns[field]
+            try:
+                column.append(values[field])
+            except KeyError:
+                if column.typecode != 'd':
+                    column = columns[field] = array('d', column)
+                column.append(MISSING)
+
+    def cpuids(self):
+        """
+        Lists CPU ids present in the table
+            :return: ``List`` of CPU ids, ``[None]`` for single-row sections
+        """
+        return list(self.__columns.keys())
+
+    def fields(self, cpuid=None):
+        """
+        Lists fields of the table
+            :return: ``List`` of field names
+        """
+        try:
+            return list(self.__columns[self.__key(cpuid)].keys())
+        except KeyError:
+            return []
+
+    def times(self, cpuid=None):
+        """
+        Returns time column
+            :param cpuid: CPU id, for ``CPU`` section only
+            :type cpuid: str.
+            :return: ``array`` of seconds since midnight
+        """
+        return self.__times[self.__key(cpuid)]
+
+    def column(self, field, cpuid=None):
+        """
+        Returns single field's column. Wrap it with ``numpy.frombuffer()``
+        for NumPy operations without copying.
+            :param field: Name of the field (e.g. ``usr``, ``memused``)
+            :type field: str.
+            :param cpuid: CPU id, for ``CPU`` section only (``all`` \\
+                if not given)
+            :type cpuid: str.
+            :return: ``array`` of values
+        """
+        return self.__columns[self.__key(cpuid)][field]
+
+    def min(self, field, cpuid=None):
+        """
+        Minimum of the field's values, missing ones left out
+            :return: ``None`` for empty column
+        """
+        column = _present(self.column(field, cpuid))
+        return min(column) if column else None
+
+    def max(self, field, cpuid=None):
+        """
+        Maximum of the field's values, missing ones left out
+            :return: ``None`` for empty column
+        """
+        column = _present(self.column(field, cpuid))
+        return max(column) if column else None
+
+    def mean(self, field, cpuid=None):
+        """
+        Arithmetic mean of the field's values, missing ones left out
+            :return: ``None`` for empty column
+        """
+        column = _present(self.column(field, cpuid))
+        return (float(sum(column)) / len(column)) if column else None
+
+    def to_dict(self):
+        """
+        Converts table back to ``Dictionary``-style section data
+            :return: ``Dictionary``-style data, as from \\
+                :meth:`sar.parser.Parser.get_sar_info`
+        """
+        return_dict = {}
+
+        for cpuid in self.__columns:
+            columns = self.__columns[cpuid]
+            times = self.__times[cpuid]
+
+            for i in range(len(times)):
+                full_time = seconds_to_time(times[i])
+                row = return_dict.setdefault(full_time, {})
+                if cpuid is not None:
+                    row = row.setdefault(cpuid, {})
+                for field in columns:
+                    value = columns[field][i]
+                    # Missing values (NaN) are left out, as in the input
+                    if value == value:
+                        row[field] = value
+
+        return return_dict
+
+    def __len__(self):
+        return sum(len(times) for times in self.__times.values())
+
+    def __key(self, cpuid):
+        """
+        Resolves CPU id to look up, ``all`` being the default for ``CPU``
+        """
+        if cpuid is None and self.section == 'CPU':
+            return 'all'
+        return cpuid
@@ -0,0 +1,424 @@
+/*
+ * Writes the binary sysstat datafiles (saDD) used by tests/test_binary.py.
+ *
+ * sysstat itself isn't available where these fixtures were made, so they
+ * are written from C declarations of the datafile structures (format
+ * magic 0x2175) instead of by sadc. They don't share any code with
+ * sar/binary.py: offsets and sizes come from the C compiler.
+ *
+ *   sa20-11.7  sysstat 11.7 layout: file header without timezone, 5
+ *              counters per stats_io, 16 per stats_memory, a comment
+ *   sa14-12.x  sysstat 12.x layout: file header with timezone and an
+ *              extra structure, discard counters in stats_io,
+ *              availablekb in stats_memory, an activity with a
+ *              per-record item count, and a restart of the box with
+ *              4 CPUs instead of 2
+ *
+ * Counters advance by round numbers every 10 minutes, so the values sar
+ * shows for them can be worked out by hand (see sa*.json).
+ *
+ *   $ cc -o mksa mksa.c && ./mksa
+ */
+
+#include <stdio.h>
+#include <string.h>
+
+#define SYSSTAT_MAGIC	0xd596
+#define FORMAT_MAGIC	0x2175
+#define UTSNAME_LEN	65
+#define TZNAME_LEN	64
+#define MAX_COMMENT_LEN	64
+
+#define R_STATS		1
+#define R_RESTART	2
+#define R_COMMENT	4
+
+#define A_CPU		1
+#define A_PCSW		2
+#define A_IO		6
+#define A_MEMORY	7
+#define A_QUEUE		9
+#define A_NET_DEV	13
+
+typedef unsigned long long ull;
+
+struct file_magic {
+	unsigned short sysstat_magic;
+	unsigned short format_magic;
+	unsigned char sysstat_extraversion;
+	unsigned char sysstat_patchlevel;
+	unsigned char sysstat_sublevel;
+	unsigned char sysstat_version;
+	unsigned int header_size;
+	unsigned int upgraded;
+	unsigned int hdr_types_nr[3];
+	int pad[12];
+};
+
+struct file_header_11 {
+	ull sa_ust_time;
+	ull sa_hz;
+	unsigned int sa_cpu_nr;
+	unsigned int sa_act_nr;
+	int sa_year;
+	unsigned int act_types_nr[3];
+	unsigned int rec_types_nr[3];
+	unsigned int act_size;
+	unsigned int rec_size;
+	unsigned int extra_next;
+	unsigned char sa_day;
+	unsigned char sa_month;
+	char sa_sizeof_long;
+	char sa_sysname[UTSNAME_LEN];
+	char sa_nodename[UTSNAME_LEN];
+	char sa_release[UTSNAME_LEN];
+	char sa_machine[UTSNAME_LEN];
+};
+
+struct file_header_12 {
+	struct file_header_11 base;
+	char sa_tzname[TZNAME_LEN];
+};
+
+struct extra_desc {
+	unsigned int extra_nr;
+	unsigned int extra_size;
+	unsigned int extra_next;
+	unsigned int extra_types_nr[3];
+};
+
+struct file_activity {
+	unsigned int id;
+	unsigned int magic;
+	int nr;
+	int nr2;
+	int has_nr;
+	int size;
+	unsigned int types_nr[3];
+};
+
+struct record_header {
+	ull uptime_cs;
+	ull ust_time;
+	unsigned int extra_next;
+	unsigned char record_type;
+	unsigned char hour;
+	unsigned char minute;
+	unsigned char second;
+};
+
+struct stats_cpu {
+	ull cpu_user, cpu_nice, cpu_sys, cpu_idle, cpu_iowait, cpu_steal,
+	    cpu_hardirq, cpu_softirq, cpu_guest, cpu_guest_nice;
+};
+
+struct stats_pcsw {
+	ull context_switch;
+	unsigned long processes;
+};
+
+struct stats_io_11 {
+	ull dk_drive, dk_drive_rio, dk_drive_wio, dk_drive_rblk,
+	    dk_drive_wblk;
+};
+
+struct stats_io_12 {
+	struct stats_io_11 base;
+	ull dk_drive_dio, dk_drive_dblk;
+};
+
+struct stats_memory_11 {
+	ull frmkb, bufkb, camkb, tlmkb, frskb, tlskb, caskb, comkb,
+	    activekb, inactkb, dirtykb, anonpgkb, slabkb, kstackkb, pgtblkb,
+	    vmusedkb;
+};
+
+struct stats_memory_12 {
+	struct stats_memory_11 base;
+	ull availablekb;
+};
+
+struct stats_queue {
+	ull nr_running, procs_blocked;
+	unsigned long load_avg_1, load_avg_5, load_avg_15;
+	unsigned long nr_threads;
+};
+
+struct stats_net_dev {
+	ull rx_packets, tx_packets, rx_bytes, tx_bytes;
+	char interface[16];
+};
+
+#define MAX_CPUS 5
+
+/* Cumulative counters of the box */
+static struct stats_cpu cpu[MAX_CPUS];
+static struct stats_pcsw pcsw;
+static struct stats_io_12 io;
+static struct stats_memory_12 mem;
+static ull uptime_cs;
+
+static void add_cpu(int i, ull user, ull nice, ull sys, ull idle,
+		    ull iowait, ull hardirq, ull softirq, ull guest)
+{
+	cpu[i].cpu_user += user;
+	cpu[i].cpu_nice += nice;
+	cpu[i].cpu_sys += sys;
+	cpu[i].cpu_idle += idle;
+	cpu[i].cpu_iowait += iowait;
+	cpu[i].cpu_hardirq += hardirq;
+	cpu[i].cpu_softirq += softirq;
+	cpu[i].cpu_guest += guest;
+}
+
+/* cpu[0] ("all") is the sum of CPU 0..n-1 (cpu[1..n]) */
+static void sum_all(int cpus)
+{
+	int i;
+
+	memset(&cpu[0], 0, sizeof(cpu[0]));
+	for (i = 1; i <= cpus; i++) {
+		cpu[0].cpu_user += cpu[i].cpu_user;
+		cpu[0].cpu_nice += cpu[i].cpu_nice;
+		cpu[0].cpu_sys += cpu[i].cpu_sys;
+		cpu[0].cpu_idle += cpu[i].cpu_idle;
+		cpu[0].cpu_iowait += cpu[i].cpu_iowait;
+		cpu[0].cpu_hardirq += cpu[i].cpu_hardirq;
+		cpu[0].cpu_softirq += cpu[i].cpu_softirq;
+		cpu[0].cpu_guest += cpu[i].cpu_guest;
+	}
+}
+
+/* One 10 minute interval */
+static void advance(int cpus, int second_half)
+{
+	uptime_cs += 60000;
+
+	if (second_half)
+		add_cpu(1, 300, 0, 100, 450, 100, 20, 30, 100);
+	else
+		add_cpu(1, 300, 0, 100, 500, 100, 0, 0, 0);
+	add_cpu(2, 100, 50, 50, 750, 50, 0, 0, 0);
+	if (cpus > 2) {
+		add_cpu(3, 500, 0, 0, 500, 0, 0, 0, 0);
+		add_cpu(4, 0, 0, 0, 1000, 0, 0, 0, 0);
+	}
+
+	sum_all(cpus);
+
+	pcsw.context_switch += 60000;
+	pcsw.processes += 300;
+
+	io.base.dk_drive += 1200;
+	io.base.dk_drive_rio += 600;
+	io.base.dk_drive_wio += 600;
+	io.base.dk_drive_rblk += 6000;
+	io.base.dk_drive_wblk += 12000;
+	io.dk_drive_dio += 10;
+	io.dk_drive_dblk += 80;
+
+	mem.base.frmkb = second_half ? 100000 : 200000;
+}
+
+static void boot(int cpus)
+{
+	int i;
+
+	memset(cpu, 0, sizeof(cpu));
+	for (i = 1; i <= cpus; i++) {
+		cpu[i].cpu_user = 1000 * i;
+		cpu[i].cpu_idle = 50000 * i;
+	}
+	sum_all(cpus);
+	uptime_cs = 100;
+	pcsw.context_switch = 123456;
+	pcsw.processes = 2000;
+	memset(&io, 0, sizeof(io));
+	io.base.dk_drive = 5000;
+
+	memset(&mem, 0, sizeof(mem));
+	mem.base.frmkb = 300000;
+	mem.base.bufkb = 50000;
+	mem.base.camkb = 250000;
+	mem.base.tlmkb = 1000000;
+	mem.base.frskb = 150000;
+	mem.base.tlskb = 200000;
+	mem.base.slabkb = 100000;
+	mem.availablekb = 600000;
+}
+
+static void write_record(FILE *f, int type, int hour, int minute,
+			 int second)
+{
+	struct record_header rec;
+
+	memset(&rec, 0, sizeof(rec));
+	rec.uptime_cs = uptime_cs;
+	rec.ust_time = 1571529600ULL + hour * 3600 + minute * 60 + second;
+	rec.record_type = type;
+	rec.hour = hour;
+	rec.minute = minute;
+	rec.second = second;
+	fwrite(&rec, sizeof(rec), 1, f);
+}
+
+static void write_stats(FILE *f, int v12, int cpus, int hour, int minute,
+			int second)
+{
+	struct stats_queue queue;
+	struct stats_net_dev net[2];
+	int nr;
+
+	write_record(f, R_STATS, hour, minute, second);
+
+	fwrite(cpu, sizeof(cpu[0]), cpus + 1, f);
+	fwrite(&pcsw, sizeof(pcsw), 1, f);
+	if (v12)
+		fwrite(&io, sizeof(io), 1, f);
+	else
+		fwrite(&io.base, sizeof(io.base), 1, f);
+	if (v12)
+		fwrite(&mem, sizeof(mem), 1, f);
+	else
+		fwrite(&mem.base, sizeof(mem.base), 1, f);
+
+	memset(&queue, 0xab, sizeof(queue));
+	fwrite(&queue, sizeof(queue), 1, f);
+
+	if (v12) {
+		/* Number of interfaces is written before them */
+		nr = minute % 20 ? 1 : 2;
+		memset(net, 0xcd, sizeof(net));
+		fwrite(&nr, sizeof(nr), 1, f);
+		fwrite(net, sizeof(net[0]), nr, f);
+	}
+}
+
+static void write_activity(FILE *f, unsigned int id, int nr, int has_nr,
+			   int size)
+{
+	struct file_activity act;
+
+	memset(&act, 0, sizeof(act));
+	act.id = id;
+	act.magic = 0x8a00 + id;
+	act.nr = nr;
+	act.nr2 = 1;
+	act.has_nr = has_nr;
+	act.size = size;
+	act.types_nr[0] = size / 8;
+	fwrite(&act, sizeof(act), 1, f);
+}
+
+static void write_headers(FILE *f, int v12, int cpus, int year, int month,
+			  int day)
+{
+	struct file_magic magic;
+	struct file_header_12 hdr;
+	struct extra_desc extra;
+	char extra_data[16];
+
+	memset(&magic, 0, sizeof(magic));
+	magic.sysstat_magic = SYSSTAT_MAGIC;
+	magic.format_magic = FORMAT_MAGIC;
+	magic.sysstat_version = v12 ? 12 : 11;
+	magic.sysstat_sublevel = v12 ? 6 : 7;
+	magic.sysstat_patchlevel = v12 ? 1 : 4;
+	magic.header_size = v12 ? sizeof(struct file_header_12)
+				: sizeof(struct file_header_11);
+	magic.hdr_types_nr[0] = 2;
+	magic.hdr_types_nr[1] = 0;
+	magic.hdr_types_nr[2] = 12;
+	fwrite(&magic, sizeof(magic), 1, f);
+
+	memset(&hdr, 0, sizeof(hdr));
+	hdr.base.sa_ust_time = 1571529600ULL;
+	hdr.base.sa_hz = 100;
+	hdr.base.sa_cpu_nr = cpus + 1;
+	hdr.base.sa_act_nr = v12 ? 6 : 5;
+	hdr.base.sa_year = year - 1900;
+	hdr.base.act_size = sizeof(struct file_activity);
+	hdr.base.rec_size = sizeof(struct record_header);
+	hdr.base.extra_next = v12;
+	hdr.base.sa_day = day;
+	hdr.base.sa_month = month - 1;
+	hdr.base.sa_sizeof_long = sizeof(long);
+	strcpy(hdr.base.sa_sysname, "Linux");
+	strcpy(hdr.base.sa_nodename, "fixture");
+	strcpy(hdr.base.sa_release, v12 ? "5.10.0" : "4.15.0");
+	strcpy(hdr.base.sa_machine, "x86_64");
+	strcpy(hdr.sa_tzname, "UTC");
+	fwrite(&hdr, magic.header_size, 1, f);
+
+	if (v12) {
+		memset(&extra, 0, sizeof(extra));
+		extra.extra_nr = 1;
+		extra.extra_size = sizeof(extra_data);
+		memset(extra_data, 0xee, sizeof(extra_data));
+		fwrite(&extra, sizeof(extra), 1, f);
+		fwrite(extra_data, sizeof(extra_data), 1, f);
+	}
+
+	write_activity(f, A_CPU, cpus + 1, 0, sizeof(struct stats_cpu));
+	write_activity(f, A_PCSW, 1, 0, sizeof(struct stats_pcsw));
+	write_activity(f, A_IO, 1, 0, v12 ? sizeof(struct stats_io_12)
+					  : sizeof(struct stats_io_11));
+	write_activity(f, A_MEMORY, 1, 0,
+		       v12 ? sizeof(struct stats_memory_12)
+			   : sizeof(struct stats_memory_11));
+	write_activity(f, A_QUEUE, 1, 0, sizeof(struct stats_queue));
+	if (v12)
+		write_activity(f, A_NET_DEV, 2, 1,
+			       sizeof(struct stats_net_dev));
+}
+
+static void write_11(void)
+{
+	FILE *f = fopen("sa20-11.7", "wb");
+	char comment[MAX_COMMENT_LEN];
+
+	write_headers(f, 0, 2, 2019, 10, 20);
+	boot(2);
+	write_stats(f, 0, 2, 0, 0, 1);
+	advance(2, 0);
+	write_stats(f, 0, 2, 0, 10, 1);
+
+	write_record(f, R_COMMENT, 0, 15, 0);
+	memset(comment, 0, sizeof(comment));
+	strcpy(comment, "fixture comment");
+	fwrite(comment, sizeof(comment), 1, f);
+
+	advance(2, 1);
+	write_stats(f, 0, 2, 0, 20, 1);
+	fclose(f);
+}
+
+static void write_12(void)
+{
+	FILE *f = fopen("sa14-12.x", "wb");
+	unsigned int cpu_nr = 5;
+
+	write_headers(f, 1, 2, 2021, 3, 14);
+	boot(2);
+	write_stats(f, 1, 2, 0, 0, 1);
+	advance(2, 0);
+	write_stats(f, 1, 2, 0, 10, 1);
+
+	/* Box comes back with 4 CPUs */
+	boot(4);
+	write_record(f, R_RESTART, 0, 15, 0);
+	fwrite(&cpu_nr, sizeof(cpu_nr), 1, f);
+	write_stats(f, 1, 4, 0, 15, 1);
+	advance(4, 0);
+	write_stats(f, 1, 4, 0, 25, 1);
+	advance(4, 1);
+	write_stats(f, 1, 4, 0, 35, 1);
+	fclose(f);
+}
+
+int main(void)
+{
+	write_11();
+	write_12();
+	return 0;
+}
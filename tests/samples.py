@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Small SAR ASCII outputs for tests, with values which are easy to check:
+``%user`` of CPU ``all`` is the day number (counted from 1) plus the hour
+divided by 100, ``kbmemused`` is the day number times 1000 plus the hour.
+"""
+
+import os
+import tempfile
+
+CPU_HEADER = ('CPU', '%user', '%nice', '%system', '%iowait', '%steal',
+              '%idle')
+MEM_HEADER = ('kbmemfree', 'kbmemused', '%memused', 'kbbuffers',
+              'kbcached', 'kbcommit', '%commit')
+
+
+def format_time(hour, ampm=False):
+    """
+    Formats full hour as sar does
+    """
+    if not ampm:
+        return '%02d:00:01' % (hour,)
+    return '%02d:00:01 %s' % ((hour % 12) or 12, 'AM' if hour < 12 else 'PM')
+
+
+def sar_day(date, number=1, hours=range(1, 24), ampm=False):
+    """
+    Builds SAR output of one day (``sar -u -P ALL -r``) with 2 CPUs
+        :param date: Date as in the header (``2013-11-20``, ``11/20/2013``)
+        :type date: str.
+        :param number: Day number, values are derived from it
+        :type number: int.
+        :param hours: Hours with a row (at HH:00:01)
+        :param ampm: 12hr AM/PM timestamps
+        :type ampm: bool.
+        :return: str.
+    """
+    lines = ['Linux 3.10.0 (host1) \t%s \t_x86_64_\t(2 CPU)' % (date,), '']
+
+    lines.append('%s %s' % (format_time(0, ampm), ' '.join(CPU_HEADER)))
+    for hour in hours:
+        user = number + hour / 100.0
+        for cpuid in ('all', '0', '1'):
+            lines.append('%s %s %.2f 0.00 1.00 0.50 0.00 %.2f' % (
+                format_time(hour, ampm), cpuid, user, 98.5 - user
+            ))
+    lines.append('')
+
+    lines.append('%s %s' % (format_time(0, ampm), ' '.join(MEM_HEADER)))
+    for hour in hours:
+        lines.append('%s 50000 %d 40.00 100 200 500 10.0' % (
+            format_time(hour, ampm), number * 1000 + hour
+        ))
+    lines.append('')
+
+    return '\n'.join(lines) + '\n'
+
+
+def write_file(content, suffix=''):
+    """
+    Writes content into a temporary file
+        :return: Name of the file, to be removed by the caller
+    """
+    fhandle, filename = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fhandle, 'w') as sar_file:
+        sar_file.write(content)
+    return filename
+
+
+def write_combo(dates, ampm=False):
+    """
+    Writes combined SAR output of days with given dates, numbered from 1
+        :return: Name of the file, to be removed by the caller
+    """
+    return write_file(''.join(
+        sar_day(date, number + 1, ampm=ampm)
+        for number, date in enumerate(dates)
+    ))
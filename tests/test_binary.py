@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Tests for :mod:`sar.binary`, over binary sysstat datafiles in
+``tests/data`` (see ``tests/data/mksa.c``) and the values ``sar`` shows
+for them (``.json`` next to each file)
+"""
+
+from sar.binary import BinaryParser
+import json
+import os
+import struct
+import tempfile
+import unittest
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def _expected(name):
+    with open(os.path.join(DATA, name + '.json')) as json_file:
+        return json.load(json_file)
+
+
+class BinaryParserTest(unittest.TestCase):
+
+    def check_fixture(self, name):
+        expected = _expected(name)
+        parser = BinaryParser(os.path.join(DATA, name))
+
+        self.assertTrue(parser.load_file())
+        self.assertEqual(parser.get_filedate(), expected.pop('date'))
+        self.assertEqual(parser.get_sar_info(), expected)
+
+    def test_sysstat_11_7(self):
+        self.check_fixture('sa20-11.7')
+
+    def test_sysstat_12(self):
+        # Restart with 4 CPUs instead of 2 in the middle of the file
+        self.check_fixture('sa14-12.x')
+
+    def test_not_sysstat_file(self):
+        parser = BinaryParser(os.path.join(DATA, 'sa20-11.7.json'))
+        self.assertFalse(parser.load_file())
+
+    def test_unsupported_format(self):
+        with open(os.path.join(DATA, 'sa20-11.7'), 'rb') as sa_file:
+            data = sa_file.read()
+
+        fhandle, path = tempfile.mkstemp()
+        with os.fdopen(fhandle, 'wb') as sa_file:
+            sa_file.write(data[:2] + struct.pack('<H', 0x2171) + data[4:])
+        try:
+            self.assertFalse(BinaryParser(path).load_file())
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Tests for :mod:`sar.cache`
+"""
+
+from sar.cache import Cache
+import sar
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.sarfile = os.path.join(self.directory, 'sar20')
+        with open(self.sarfile, 'w') as sar_file:
+            sar_file.write('Linux 3.10.0 (host)\t2013-11-20\n')
+        self.cache = Cache(os.path.join(self.directory, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_put_get(self):
+        data = {'CPU': {'00:10:01': {'usr': 1.5}}}
+        self.assertTrue(self.cache.put(self.sarfile, data))
+        self.assertEqual(self.cache.get(self.sarfile), data)
+
+    def test_failed_put_leaves_no_temp_file(self):
+        self.assertFalse(self.cache.put(self.sarfile, {'CPU': object()}))
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'cache')),
+                         [])
+        self.assertEqual(self.cache.get(self.sarfile), None)
+
+    def test_data_format_change_misses(self):
+        data = {'CPU': {'00:10:01': {'usr': 1.5}}}
+        self.assertTrue(self.cache.put(self.sarfile, data))
+
+        data_format = sar.DATA_FORMAT
+        sar.DATA_FORMAT += 1
+        try:
+            self.assertEqual(self.cache.get(self.sarfile), None)
+        finally:
+            sar.DATA_FORMAT = data_format
+
+        self.assertEqual(self.cache.get(self.sarfile), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
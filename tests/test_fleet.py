@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Tests for :mod:`sar.fleet`
+"""
+
+from sar import fleet as sarfleet
+from tests import samples
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+
+def raising_ingest(path):
+    # Stands in for a worker failing outside of the parser
+    if path.endswith('sar02'):
+        raise RuntimeError('worker broke')
+    return sarfleet._ingest_file.original(path)
+
+
+def dying_ingest(path):
+    # Stands in for a worker killed while parsing
+    if path.endswith('sar02'):
+        os._exit(1)
+    return sarfleet._ingest_file.original(path)
+
+
+def slow_ingest(path):
+    # Stands in for a file taking a while to parse, after its start
+    # was reported
+    outcome = sarfleet._ingest_file.original(path)
+    time.sleep(1.5)
+    return outcome
+
+
+class FleetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for host in ('h1', 'h2'):
+            os.mkdir(os.path.join(self.directory, host))
+            for day in (1, 2):
+                path = os.path.join(self.directory, host, 'sar%02d' % (day,))
+                with open(path, 'w') as sar_file:
+                    sar_file.write(samples.sar_day(
+                        '2013-11-%02d' % (day,), day, hours=[1, 2]
+                    ))
+        self.original = sarfleet._ingest_file
+
+    def tearDown(self):
+        sarfleet._ingest_file = self.original
+        shutil.rmtree(self.directory)
+
+    def patch(self, ingest):
+        ingest.original = self.original
+        sarfleet._ingest_file = ingest
+
+    def test_ingest(self):
+        fleet = sarfleet.Fleet(self.directory, workers=2)
+        results = sorted((host, date) for host, date, result in
+                         fleet.ingest())
+
+        self.assertEqual(results, [('h1', '2013-11-01'), ('h1', '2013-11-02'),
+                                   ('h2', '2013-11-01'), ('h2', '2013-11-02')])
+        self.assertEqual(fleet.errors, [])
+
+    def test_worker_error_is_recorded(self):
+        self.patch(raising_ingest)
+        fleet = sarfleet.Fleet(self.directory, workers=2, max_pending=2)
+        results = list(fleet.ingest())
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(sorted(error.host for error in fleet.errors),
+                         ['h1', 'h2'])
+        self.assertTrue('worker broke' in fleet.errors[0].message)
+
+    def test_dead_worker_times_out(self):
+        self.patch(dying_ingest)
+        fleet = sarfleet.Fleet(self.directory, workers=2, timeout=2)
+        results = list(fleet.ingest())
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(len(fleet.errors), 2)
+        self.assertTrue(fleet.errors[0].path.endswith('sar02'))
+
+    def test_queued_files_dont_time_out(self):
+        self.patch(slow_ingest)
+        paths = sarfleet.Fleet(self.directory).files()[:3]
+        fleet = sarfleet.Fleet(paths, workers=1, max_pending=2, timeout=2)
+        results = list(fleet.ingest())
+
+        self.assertEqual(fleet.errors, [])
+        self.assertEqual(len(results), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Tests for :mod:`sar.multiparser`
+"""
+
+from sar.multiparser import Multiparser
+from tests import samples
+import os
+import unittest
+
+US_DATES = ['12/30/2013', '12/31/2013', '01/01/2014', '01/02/2014']
+
+
+class RangeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.filename = samples.write_combo(US_DATES, ampm=True)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_range_across_year_in_us_dates(self):
+        multi = Multiparser(self.filename)
+        info = multi.get_range('2013-12-31 22:00:00', '2014-01-01 02:00:00')
+        multi.close()
+
+        self.assertEqual(sorted(info), ['01/01/2014', '12/31/2013'])
+        self.assertEqual(sorted(info['12/31/2013']['CPU']),
+                         ['22:00:01', '23:00:01'])
+        self.assertEqual(sorted(info['01/01/2014']['CPU']), ['01:00:01'])
+        self.assertEqual(info['01/01/2014']['MEM']['01:00:01']['memused'],
+                         3001)
+
+    def test_range_index_follows_reloaded_file(self):
+        multi = Multiparser(self.filename)
+        self.assertTrue(multi.load_file())
+        multi.get_range('2014-01-01 00:00:00', '2014-01-01 23:59:59')
+
+        # Day is prepended, so offsets of all the others move
+        with open(self.filename) as sar_file:
+            content = sar_file.read()
+        with open(self.filename, 'w') as sar_file:
+            sar_file.write(samples.sar_day('12/29/2013', 7, ampm=True) +
+                           content)
+
+        self.assertTrue(multi.load_file())
+        info = multi.get_range('2014-01-01 00:00:00', '2014-01-01 23:59:59')
+        multi.close()
+
+        self.assertEqual(sorted(info), ['01/01/2014'])
+        self.assertEqual(len(info['01/01/2014']['CPU']), 23)
+        self.assertEqual(info['01/01/2014']['MEM']['05:00:01']['memused'],
+                         3005)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Tests for :mod:`sar.rollup`
+"""
+
+from sar.multiparser import Multiparser
+from sar.parser import Parser
+from sar.rollup import parse_window, rollup, rollup_days
+from sar.table import SarTable
+from tests import samples
+import os
+import unittest
+
+
+def _mem(memused):
+    return {'MEM': dict(
+        (full_time, {'memused': value}) for full_time, value in memused
+    )}
+
+
+class RollupTest(unittest.TestCase):
+
+    def test_parse_window(self):
+        self.assertEqual(parse_window('5min'), 300)
+        self.assertEqual(parse_window('1h'), 3600)
+        self.assertEqual(parse_window(30), 30)
+        self.assertRaises(ValueError, parse_window, '5 weeks')
+
+    def test_rollup(self):
+        rolled = rollup(_mem([('00:01:00', 1), ('00:04:00', 3),
+                              ('00:06:00', 10)]), '5min', ('min', 'mean'))
+        self.assertEqual(rolled, {'MEM': {
+            '00:00:00': {'memused': {'min': 1, 'mean': 2.0}},
+            '00:05:00': {'memused': {'min': 10, 'mean': 10.0}},
+        }})
+
+    def test_rollup_tables(self):
+        table = SarTable('CPU')
+        table.append(60, '0', {'usr': 1.0, 'idle': 99.0})
+        table.append(60, '1', {'usr': 3.0})
+        table.append(120, '0', {'usr': 2.0, 'idle': 98.0})
+        table.append(420, '0', {'usr': 5.0, 'idle': 95.0})
+
+        rolled = rollup({'CPU': table}, '5min', ('max', 'count', 'p50'))
+        self.assertEqual(rolled, {'CPU': {
+            '00:00:00': {
+                '0': {'usr': {'max': 2.0, 'count': 2, 'p50': 1.0},
+                      'idle': {'max': 99.0, 'count': 2, 'p50': 98.0}},
+                '1': {'usr': {'max': 3.0, 'count': 1, 'p50': 3.0}},
+            },
+            '00:05:00': {
+                '0': {'usr': {'max': 5.0, 'count': 1, 'p50': 5.0},
+                      'idle': {'max': 95.0, 'count': 1, 'p50': 95.0}},
+            },
+        }})
+
+    def test_rollup_unordered_rows(self):
+        rolled = rollup(_mem([('00:07:00', 7), ('00:01:00', 1),
+                              ('00:06:00', 6)]), '5min', ('min', 'max'))
+        table = SarTable('MEM')
+        for seconds, value in ((420, 7), (60, 1), (360, 6)):
+            table.append(seconds, None, {'memused': value})
+
+        self.assertEqual(rollup({'MEM': table}, '5min', ('min', 'max')),
+                         rolled)
+        self.assertEqual(rolled['MEM']['00:05:00'],
+                         {'memused': {'min': 6, 'max': 7}})
+
+    def test_days_across_year_in_us_dates(self):
+        sarinfos = {
+            '12/31/2013': _mem([('23:00:00', 1), ('23:30:00', 2)]),
+            '01/01/2014': _mem([('00:30:00', 3), ('03:00:00', 4)]),
+        }
+        rolled = rollup_days(sarinfos, '5h', ('count', 'max'))
+
+        # Window 20:00 - 01:00 starts on the last day of the year
+        self.assertEqual(rolled, {
+            '12/31/2013': {'MEM': {
+                '20:00:00': {'memused': {'count': 3, 'max': 3}}
+            }},
+            '01/01/2014': {'MEM': {
+                '01:00:00': {'memused': {'count': 1, 'max': 4}}
+            }},
+        })
+
+    def test_days_unknown_date(self):
+        self.assertRaises(ValueError, rollup_days,
+                          {'yesterday': _mem([('00:00:00', 1)])})
+
+
+class ParserRollupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.filename = samples.write_file(samples.sar_day('2013-11-20'))
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_from_columns(self):
+        rolled = Parser(self.filename).rollup('1h', ('min', 'max'))
+
+        self.assertEqual(rolled['MEM']['05:00:00']['memused'],
+                         {'min': 1005, 'max': 1005})
+        self.assertEqual(rolled['CPU']['05:00:00']['all']['usr'],
+                         {'min': 1.05, 'max': 1.05})
+
+    def test_same_as_parsed(self):
+        sarparser = Parser(self.filename)
+        columnar = sarparser.rollup()
+
+        self.assertEqual(rollup(sarparser.get_sar_info()), columnar)
+
+
+class MultiparserRollupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.filename = samples.write_combo(
+            ['12/31/2013', '01/01/2014'], ampm=True
+        )
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_loads_on_demand(self):
+        multi = Multiparser(self.filename)
+        rolled = multi.rollup('1d', ('min', 'max'))
+        multi.close()
+
+        self.assertEqual(sorted(rolled), ['01/01/2014', '12/31/2013'])
+        self.assertEqual(
+            rolled['01/01/2014']['MEM']['00:00:00']['memused'],
+            {'min': 2001, 'max': 2023}
+        )
+
+    def test_missing_file(self):
+        self.assertFalse(Multiparser(self.filename + '.gone').rollup())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Tests for :mod:`sar.table`
+"""
+
+from sar.table import SarTable
+import math
+import unittest
+
+
+class SarTableTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        section_info = {
+            '00:10:01': {'all': {'usr': 1.5, 'sys': 0.5},
+                         '0': {'usr': 2.5, 'sys': 1.0}},
+            '00:20:01': {'all': {'usr': 3.5, 'sys': 0.25},
+                         '0': {'usr': 4.5, 'sys': 2.0}},
+        }
+        table = SarTable.from_dict('CPU', section_info)
+        self.assertEqual(len(table), 4)
+        self.assertEqual(list(table.column('usr')), [1.5, 3.5])
+        self.assertEqual(table.to_dict(), section_info)
+
+    def test_partial_rows(self):
+        # Older sysstat versions don't print all the columns
+        table = SarTable('IO')
+        table.append(600, None, {'tps': 10, 'rtps': 4, 'svctm': 1.5})
+        table.append(1200, None, {'tps': 20, 'rtps': 6})
+        table.append(1800, None, {'tps': 30, 'rtps': 8, 'rkB/s': 2.0})
+
+        self.assertEqual(list(table.column('tps')), [10, 20, 30])
+        svctm = table.column('svctm')
+        self.assertEqual(svctm[0], 1.5)
+        self.assertTrue(math.isnan(svctm[1]) and math.isnan(svctm[2]))
+        self.assertTrue(math.isnan(table.column('rkB/s')[0]))
+
+        self.assertEqual(table.mean('svctm'), 1.5)
+        self.assertEqual(table.max('rkB/s'), 2.0)
+        self.assertEqual(table.to_dict(), {
+            '00:10:00': {'tps': 10, 'rtps': 4, 'svctm': 1.5},
+            '00:20:00': {'tps': 20, 'rtps': 6},
+            '00:30:00': {'tps': 30, 'rtps': 8, 'rkB/s': 2.0},
+        })
+
+    def test_partial_row_of_integer_field(self):
+        table = SarTable('TASK')
+        table.append(600, None, {'proc': 1.0, 'runq': 3})
+        table.append(1200, None, {'proc': 2.0})
+
+        self.assertEqual(table.column('runq').typecode, 'd')
+        self.assertEqual(table.mean('runq'), 3.0)
+        self.assertEqual(table.to_dict()['00:20:00'], {'proc': 2.0})
+
+
+if __name__ == '__main__':
+    unittest.main()